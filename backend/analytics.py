@@ -0,0 +1,129 @@
+"""Compteurs de clics pré-agrégés par offre et par tranche de temps.
+
+Chaque lot de clics incrémente, pour chaque offre, un document par
+granularité (minute, heure, jour) dans ``click_rollups``. Une requête sur un
+intervalle quelconque est découpée en au plus cinq segments alignés (minutes
+de bord, heures de bord, jours pleins) : elle lit quelques centaines de
+compteurs au maximum, jamais les documents bruts de ``clicks``.
+"""
+from collections import Counter
+from datetime import timedelta
+
+from pymongo import UpdateOne
+
+GRANULARITIES = {
+    "minute": timedelta(minutes=1),
+    "hour": timedelta(hours=1),
+    "day": timedelta(days=1),
+}
+
+# Nombre maximal de tranches renvoyées par une série temporelle
+MAX_SERIES_BUCKETS = 10000
+
+# Derniers lots de clics appliqués à un document (offre ou tranche), pour ne pas les rejouer
+BATCH_MARKERS_FIELD = "click_batches"
+BATCH_MARKERS_KEPT = 256
+
+
+def batch_marker(batch_id):
+    """``$push`` du marqueur d'un lot, en ne gardant que les ``BATCH_MARKERS_KEPT`` plus récents."""
+    return {BATCH_MARKERS_FIELD: {"$each": [batch_id], "$slice": -BATCH_MARKERS_KEPT}}
+
+
+def naive_local(ts):
+    """Heure locale sans fuseau, celle des tranches (``datetime.now()``) ; ``ts`` naïf est gardé tel quel."""
+    if ts is None or ts.tzinfo is None:
+        return ts
+    return ts.astimezone().replace(tzinfo=None)
+
+
+def floor_bucket(ts, granularity):
+    if granularity == "minute":
+        return ts.replace(second=0, microsecond=0)
+    if granularity == "hour":
+        return ts.replace(minute=0, second=0, microsecond=0)
+    return ts.replace(hour=0, minute=0, second=0, microsecond=0)
+
+
+def ceil_bucket(ts, granularity):
+    floored = floor_bucket(ts, granularity)
+    return floored if floored == ts else floored + GRANULARITIES[granularity]
+
+
+def rollup_operations(clicks, batch_id=None):
+    """``$inc`` upsertés par (offre, granularité, tranche) pour un lot de clics.
+
+    Avec ``batch_id``, chaque ``$inc`` est gardé par le marqueur du lot
+    (``BATCH_MARKERS_FIELD``) : un lot rejoué ne compte pas deux fois (voir
+    ``batching.bulk_write_once``).
+    """
+    counts = Counter(
+        (click["offer_id"], granularity, floor_bucket(click["timestamp"], granularity))
+        for click in clicks
+        for granularity in GRANULARITIES
+    )
+    operations = []
+    for (offer_id, granularity, bucket), count in counts.items():
+        query = {"offer_id": offer_id, "granularity": granularity, "bucket": bucket}
+        update = {"$inc": {"count": count}}
+        if batch_id is not None:
+            query[BATCH_MARKERS_FIELD] = {"$ne": batch_id}
+            update["$push"] = batch_marker(batch_id)
+        operations.append(UpdateOne(query, update, upsert=True))
+    return operations
+
+
+def cover_range(start, end, levels=("day", "hour", "minute")):
+    """Découpe [start, end[ en segments (granularité, début, fin) alignés, du plus grossier au plus fin."""
+    if start >= end:
+        return []
+    granularity = levels[0]
+    if len(levels) == 1:
+        return [(granularity, start, end)]
+    inner_start = ceil_bucket(start, granularity)
+    inner_end = floor_bucket(end, granularity)
+    if inner_start >= inner_end:
+        return cover_range(start, end, levels[1:])
+    return (
+        cover_range(start, inner_start, levels[1:])
+        + [(granularity, inner_start, inner_end)]
+        + cover_range(inner_end, end, levels[1:])
+    )
+
+
+def _segment_filter(granularity, start, end, offer_id=None):
+    query = {"granularity": granularity, "bucket": {"$gte": start, "$lt": end}}
+    if offer_id:
+        query["offer_id"] = offer_id
+    return query
+
+
+async def range_totals(collection, start, end, offer_id=None):
+    """Clics par offre sur [start, end[ (à la minute près ; la minute de fin en cours est incluse)."""
+    segments = cover_range(floor_bucket(start, "minute"), ceil_bucket(end, "minute"))
+    if not segments:
+        return {}
+    pipeline = [
+        {"$match": {"$or": [_segment_filter(g, a, b, offer_id) for g, a, b in segments]}},
+        {"$group": {"_id": "$offer_id", "clicks": {"$sum": "$count"}}},
+    ]
+    rows = await collection.aggregate(pipeline).to_list(length=None)
+    return {row["_id"]: row["clicks"] for row in rows}
+
+
+async def timeseries(collection, start, end, granularity, offer_id=None):
+    """Série [{bucket, total, offers: {id: clics}}] des tranches non vides de [start, end[."""
+    start = floor_bucket(start, granularity)
+    end = ceil_bucket(end, granularity)
+    if (end - start) / GRANULARITIES[granularity] > MAX_SERIES_BUCKETS:
+        raise ValueError("Intervalle trop large pour cette granularité")
+    docs = await collection.find(
+        _segment_filter(granularity, start, end, offer_id),
+        projection={"_id": 0, "bucket": 1, "offer_id": 1, "count": 1},
+    ).sort("bucket", 1).to_list(length=None)
+    series = {}
+    for doc in docs:
+        point = series.setdefault(doc["bucket"], {"bucket": doc["bucket"], "total": 0, "offers": {}})
+        point["offers"][doc["offer_id"]] = doc["count"]
+        point["total"] += doc["count"]
+    return list(series.values())
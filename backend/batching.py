@@ -0,0 +1,215 @@
+"""Tampon asynchrone borné vidé par lots en tâche de fond.
+
+Les routes déposent des éléments avec ``submit`` (sans attendre la base) ; une
+tâche unique les regroupe jusqu'à ``max_batch_size`` éléments ou ``linger_seconds``
+d'attente, puis appelle ``_flush`` une fois par lot.
+
+Quand le tampon est plein, la politique ``drop`` rejette l'élément (compté dans
+les métriques) et ``block`` fait attendre l'appelant de ``enqueue`` qu'une place
+se libère.
+
+Un lot dont l'écriture échoue sur une erreur transitoire de Mongo (connexion
+perdue, délai dépassé, élection) est retenté avec une attente doublée à chaque
+essai, tant que le processus tourne : le tampon se remplit pendant la panne au
+lieu de perdre des éléments déjà acceptés. À l'arrêt, le lot est abandonné après
+``STOP_FLUSH_RETRIES`` essais ; une autre erreur l'abandonne aussitôt
+(``_dropped_batch``). ``_flush``
+doit donc pouvoir être rejoué sur un lot déjà partiellement écrit
+(``insert_many_once``, ``bulk_write_once``).
+"""
+import asyncio
+import logging
+import time
+
+from bson import ObjectId
+from pymongo.errors import AutoReconnect, BulkWriteError, NetworkTimeout
+
+logger = logging.getLogger(__name__)
+
+# Sentinelle de fin déposée par stop()
+_STOP = object()
+
+# NetworkTimeout hérite d'AutoReconnect (comme NotPrimaryError et ServerSelectionTimeoutError)
+TRANSIENT_ERRORS = (AutoReconnect, NetworkTimeout)
+STOP_FLUSH_RETRIES = 5
+FLUSH_RETRY_MAX_SECONDS = 30.0
+DUPLICATE_KEY = 11000
+
+
+def assign_ids(docs):
+    """Fixe le ``_id`` de chaque document une fois pour toutes : un lot rejoué réinsère les mêmes ``_id``."""
+    for doc in docs:
+        doc.setdefault("_id", ObjectId())
+    return docs
+
+
+def _duplicate_indexes(error):
+    """Positions des opérations refusées pour clé dupliquée ; relève toute autre erreur."""
+    details = error.details
+    if details.get("writeConcernErrors") or any(
+        failure["code"] != DUPLICATE_KEY for failure in details.get("writeErrors", ())
+    ):
+        raise error
+    return [failure["index"] for failure in details.get("writeErrors", ())]
+
+
+async def insert_many_once(collection, docs):
+    """``insert_many`` rejouable : les documents déjà insérés (même ``_id``) sont ignorés."""
+    try:
+        await collection.insert_many(docs, ordered=False)
+    except BulkWriteError as error:
+        _duplicate_indexes(error)
+
+
+async def bulk_write_once(collection, operations):
+    """``bulk_write`` d'upserts gardés par un marqueur de lot (``{"marqueur": {"$ne": lot}}``).
+
+    Un upsert refusé pour clé dupliquée a trouvé le document déjà marqué, ou
+    perdu la course à la création contre un autre worker : il est rejoué une
+    fois, et un second refus signifie que le lot y est déjà appliqué.
+    """
+    for _ in range(2):
+        try:
+            await collection.bulk_write(operations, ordered=False)
+            return
+        except BulkWriteError as error:
+            operations = [operations[index] for index in _duplicate_indexes(error)]
+
+
+OVERFLOW_POLICIES = ("drop", "block")
+
+
+class BatchWorker:
+    def __init__(self, max_batch_size=500, linger_seconds=0.25, queue_size=10000, overflow_policy="drop"):
+        if overflow_policy not in OVERFLOW_POLICIES:
+            raise ValueError(f"Politique de débordement inconnue : {overflow_policy}")
+        self.max_batch_size = max_batch_size
+        self.linger_seconds = linger_seconds
+        self.overflow_policy = overflow_policy
+        self._queue = asyncio.Queue(maxsize=queue_size)
+        self._task = None
+        self._stopping = False
+        self._submitted = 0
+        self._dropped = 0
+        self._batches = 0
+        self._written = 0
+        self._failed_batches = 0
+        self._retries = 0
+        self._last_batch_size = 0
+
+    @property
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def metrics(self):
+        return {
+            "queue_depth": self._queue.qsize(),
+            "queue_capacity": self._queue.maxsize,
+            "overflow_policy": self.overflow_policy,
+            "submitted": self._submitted,
+            "dropped": self._dropped,
+            "batches": self._batches,
+            "written": self._written,
+            "failed_batches": self._failed_batches,
+            "retries": self._retries,
+            "last_batch_size": self._last_batch_size,
+            "avg_batch_size": round(self._written / self._batches, 1) if self._batches else 0.0,
+        }
+
+    def start(self):
+        if self._task is None:
+            self._stopping = False
+            self._task = asyncio.create_task(self._run())
+
+    def submit(self, item):
+        """Ajoute un élément sans bloquer ; False si le tampon est plein ou arrêté."""
+        if self._stopping:
+            self._dropped += 1
+            return False
+        try:
+            self._queue.put_nowait(item)
+        except asyncio.QueueFull:
+            self._dropped += 1
+            return False
+        self._submitted += 1
+        return True
+
+    async def enqueue(self, item):
+        """Ajoute un élément selon la politique de débordement ; False s'il a été rejeté."""
+        if self.overflow_policy == "drop" or self._stopping:
+            return self.submit(item)
+        await self._queue.put(item)
+        self._submitted += 1
+        return True
+
+    async def stop(self):
+        """Vide le tampon (dernier lot compris) puis arrête la tâche."""
+        if self._task is None:
+            return
+        self._stopping = True
+        await self._queue.put(_STOP)
+        await self._task
+        self._task = None
+
+    async def _run(self):
+        while True:
+            item = await self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            stop = await self._fill(batch)
+            await self._safe_flush(batch)
+            if stop:
+                return
+
+    async def _fill(self, batch):
+        """Complète le lot jusqu'à la taille max ou l'expiration du délai ; True si arrêt demandé."""
+        deadline = time.monotonic() + self.linger_seconds
+        while len(batch) < self.max_batch_size:
+            try:
+                item = self._queue.get_nowait()
+            except asyncio.QueueEmpty:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+            if item is _STOP:
+                return True
+            batch.append(item)
+        return False
+
+    async def _safe_flush(self, batch):
+        self._last_batch_size = len(batch)
+        attempt = 0
+        while True:
+            try:
+                await self._flush(batch)
+                self._batches += 1
+                self._written += len(batch)
+                return
+            except TRANSIENT_ERRORS:
+                attempt += 1
+                if self._stopping and attempt >= STOP_FLUSH_RETRIES:
+                    self._drop_batch(batch)
+                    return
+                self._retries += 1
+                logger.warning("%s: échec transitoire d'un lot de %d éléments (essai %d), nouvel essai",
+                               type(self).__name__, len(batch), attempt, exc_info=True)
+                await asyncio.sleep(min(0.1 * 2 ** attempt, FLUSH_RETRY_MAX_SECONDS))
+            except Exception:
+                self._drop_batch(batch)
+                return
+
+    def _drop_batch(self, batch):
+        self._failed_batches += 1
+        logger.exception("%s: échec d'écriture d'un lot de %d éléments", type(self).__name__, len(batch))
+        self._dropped_batch(batch)
+
+    def _dropped_batch(self, batch):
+        """Appelé quand un lot est abandonné (état en mémoire à resynchroniser, par exemple)."""
+
+    async def _flush(self, batch):
+        raise NotImplementedError
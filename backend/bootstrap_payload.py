@@ -0,0 +1,65 @@
+"""Réponse précalculée de GET /api/bootstrap (offres + file des calls).
+
+Le corps JSON est assemblé une seule fois par changement d'offres ou de
+calls (les compteurs de clics suivent le rafraîchissement différé du
+catalogue), puis compressé en gzip et en brotli (si le module ``brotli`` est
+installé). Les requêtes suivantes renvoient directement l'un de ces
+tampons : ni sérialisation ni compression par requête.
+"""
+import gzip
+import hashlib
+
+import orjson
+
+try:
+    import brotli
+except ImportError:  # Dépendance optionnelle : on se contente de gzip
+    brotli = None
+
+GZIP_LEVEL = 9
+BROTLI_QUALITY = 9
+
+
+def accepted_encodings(accept_encoding):
+    """Encodages acceptés par le client (q=0 exclu), en minuscules."""
+    accepted = set()
+    for part in (accept_encoding or "").split(","):
+        coding, _, params = part.strip().partition(";")
+        params = params.replace(" ", "")
+        if coding and params not in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            accepted.add(coding.lower())
+    return accepted
+
+
+class BootstrapPayload:
+    def __init__(self, offer_catalog, calls_hub):
+        self.offer_catalog = offer_catalog
+        self.calls_hub = calls_hub
+        self._key = None
+        self._variants = {}
+        self._etag = None
+
+    async def _refresh(self):
+        offers_body, offers_etag = await self.offer_catalog.payload()
+        await self.calls_hub.ensure_loaded()
+        key = (offers_etag, self.calls_hub.last_event_id)
+        if key == self._key:
+            return
+        # Le JSON des offres est déjà sérialisé par le catalogue : on le réutilise tel quel
+        calls_body = orjson.dumps(self.calls_hub.snapshot())
+        body = b'{"offers":' + offers_body + b',"calls":' + calls_body + b"}"
+        variants = {"identity": body, "gzip": gzip.compress(body, compresslevel=GZIP_LEVEL)}
+        if brotli is not None:
+            variants["br"] = brotli.compress(body, quality=BROTLI_QUALITY)
+        self._variants = variants
+        self._etag = hashlib.sha1(body).hexdigest()
+        self._key = key
+
+    async def get(self, accept_encoding=None):
+        """(corps, Content-Encoding ou None, ETag) pour l'encodage préféré du client."""
+        await self._refresh()
+        accepted = accepted_encodings(accept_encoding)
+        for coding in ("br", "gzip"):
+            if coding in self._variants and (coding in accepted or "*" in accepted):
+                return self._variants[coding], coding, f'"{self._etag}-{coding}"'
+        return self._variants["identity"], None, f'"{self._etag}"'
@@ -0,0 +1,48 @@
+"""Ordre explicite de la file des calls.
+
+Chaque call porte un ``rank`` flottant indexé. Les nouveaux calls sont placés
+``RANK_STEP`` après le dernier ; un déplacement prend le milieu de ses deux
+voisins, si bien qu'une insertion, une suppression ou un déplacement ne touche
+que le document concerné. Quand l'écart entre deux voisins devient trop petit,
+la file est renumérotée une fois (cas rare). Les ranks sont calculés en mémoire
+par ``calls_queue`` ; ce module garde le tri de référence et la reprise des
+anciens documents.
+"""
+from pymongo import UpdateOne
+
+RANK_STEP = 1024.0
+MIN_RANK_GAP = 1e-6
+
+# Tri de référence de la file : l'id (connu de tous les workers, comme en mémoire)
+# départage deux ranks égaux attribués au même moment par deux workers
+CALLS_SORT = [("rank", 1), ("id", 1)]
+
+
+async def next_rank(collection):
+    """Rank à donner à un call ajouté en fin de file."""
+    last = await collection.find_one({}, projection={"rank": 1}, sort=[("rank", -1)])
+    return (last["rank"] if last and last.get("rank") is not None else 0.0) + RANK_STEP
+
+
+def rank_between(previous_rank, following_rank):
+    """Rank entre deux voisins (None : pas de voisin de ce côté) ; None si l'écart est épuisé."""
+    if previous_rank is None and following_rank is None:
+        return RANK_STEP
+    if previous_rank is None:
+        return following_rank - RANK_STEP
+    if following_rank is None:
+        return previous_rank + RANK_STEP
+    if following_rank - previous_rank > MIN_RANK_GAP:
+        return (previous_rank + following_rank) / 2
+    return None
+
+
+async def ensure_ranks(collection):
+    """Donne un rank aux calls créés avant l'introduction du champ (ordre created_at)."""
+    missing = await collection.find({"rank": {"$exists": False}}, projection={"_id": 1}).sort("created_at", 1).to_list(length=None)
+    if not missing:
+        return
+    start = await next_rank(collection)
+    await collection.bulk_write(
+        [UpdateOne({"_id": doc["_id"]}, {"$set": {"rank": start + i * RANK_STEP}}) for i, doc in enumerate(missing)]
+    )
@@ -0,0 +1,319 @@
+"""File des calls en mémoire, source de vérité du processus.
+
+La file est une liste ordonnée de ``CallRecord`` (``__slots__``) doublée d'un
+index par id : GET /api/calls, le flux SSE et /api/bootstrap la lisent sans
+toucher Mongo. Chaque modification est appliquée en mémoire, puis ses
+opérations Mongo sont déposées dans un journal écrit en différé (lots
+``bulk_write`` ordonnés, via ``BatchWorker``).
+
+Les opérations du journal sont des affectations (upsert d'un call, ``$set`` du
+rank, suppression par id) : rejouer un lot partiellement appliqué aboutit au
+même état. Un lot en échec transitoire est donc retenté jusqu'à ce qu'il passe
+(``BatchWorker`` ; le journal se remplit pendant une panne de Mongo, puis les
+modifications sont refusées par ``JournalFull``). Un lot refusé pour une autre
+raison est réécrit opération par opération : celles que Mongo refuse sont
+abandonnées, puis la file est relue depuis ``calls`` dès que le journal est
+vide (``on_resync`` diffuse la file relue). Mongo reste la copie durable ; au
+démarrage, la file est reconstruite depuis ``calls``.
+
+Deux workers peuvent donner le même rank à deux calls ajoutés en même temps :
+l'id départage les ranks égaux, en mémoire (``sort_key``) comme dans Mongo
+(``CALLS_SORT``), si bien que tous les workers voient le même ordre.
+
+Les ranks suivent ``calls_order`` (pas de RANK_STEP, milieu des voisins pour un
+déplacement, renumérotation si l'écart est épuisé). Chaque modification renvoie
+les ranks qu'elle a fixés : les autres workers les appliquent à leur propre
+copie (``apply_remote``) sans rien journaliser.
+"""
+import asyncio
+import logging
+import uuid
+from datetime import datetime
+
+from pymongo import DeleteMany, DeleteOne, UpdateOne
+
+from batching import TRANSIENT_ERRORS, BatchWorker
+from calls_order import CALLS_SORT, RANK_STEP, rank_between
+
+logger = logging.getLogger(__name__)
+
+
+class JournalFull(RuntimeError):
+    """Le journal d'écriture est plein : la modification est refusée avant d'être appliquée."""
+
+
+def sort_key(record):
+    return record.rank, record.id
+
+
+class CallRecord:
+    __slots__ = ("id", "slot", "username", "rank", "created_at")
+
+    def __init__(self, id, slot, username, rank, created_at=None):
+        self.id = id
+        self.slot = slot
+        self.username = username
+        self.rank = rank
+        self.created_at = created_at
+
+    def to_event(self):
+        """Forme publique, identique à celle de GET /api/calls."""
+        return {"id": self.id, "slot": self.slot, "user": self.username}
+
+    def upsert(self):
+        return UpdateOne(
+            {"id": self.id},
+            {
+                "$set": {"slot": self.slot, "username": self.username, "rank": self.rank},
+                "$setOnInsert": {"created_at": self.created_at or datetime.now()},
+            },
+            upsert=True,
+        )
+
+
+class CallsQueue(BatchWorker):
+    def __init__(self, collection, on_resync=None, **kwargs):
+        kwargs.setdefault("max_batch_size", 200)
+        kwargs.setdefault("linger_seconds", 0.05)
+        super().__init__(**kwargs)
+        self.collection = collection
+        self.on_resync = on_resync
+        self._records = None
+        self._by_id = {}
+        self._snapshot = None
+        self._load_lock = asyncio.Lock()
+        self._resync_pending = False
+        self._rejected = 0
+
+    def __len__(self):
+        return len(self._records or ())
+
+    def __contains__(self, call_id):
+        return call_id in self._by_id
+
+    async def ensure_loaded(self):
+        """Reconstruit la file depuis Mongo une seule fois pour tout le processus."""
+        if self._records is None:
+            async with self._load_lock:
+                if self._records is None:
+                    await self.reload()
+
+    async def reload(self):
+        self._replace_records(await self._load())
+
+    async def _load(self):
+        docs = await self.collection.find(
+            {}, projection={"_id": 0, "id": 1, "slot": 1, "username": 1, "rank": 1, "created_at": 1}
+        ).sort(CALLS_SORT).to_list(length=None)
+        return [
+            CallRecord(doc["id"], doc["slot"], doc["username"], doc.get("rank", 0.0), doc.get("created_at"))
+            for doc in docs
+        ]
+
+    def metrics(self):
+        return {**super().metrics(), "rejected_operations": self._rejected}
+
+    def snapshot(self):
+        """Liste publique des calls (recalculée seulement après une modification)."""
+        if self._snapshot is None:
+            self._snapshot = [record.to_event() for record in self._records or ()]
+        return list(self._snapshot)
+
+    def _replace_records(self, records):
+        self._records = records
+        self._by_id = {record.id: record for record in records}
+        self._snapshot = None
+
+    def _journal(self, operations):
+        for operation in operations:
+            self.submit(operation)
+        self._snapshot = None
+
+    def reserve(self, count):
+        """Lève ``JournalFull`` si ``count`` opérations ne tiennent pas dans le journal.
+
+        Vérifié avant toute modification : une modification refusée n'a rien changé en mémoire.
+        """
+        if self._stopping or self.queue_depth + count > self._queue.maxsize:
+            raise JournalFull("Journal des calls plein")
+
+    async def _flush(self, batch):
+        try:
+            await self.collection.bulk_write(batch, ordered=True)
+        except TRANSIENT_ERRORS:
+            raise
+        except Exception:
+            logger.warning("Journal des calls : lot refusé, écriture opération par opération", exc_info=True)
+            await self._write_each(batch)
+        if self._resync_pending:
+            await self._resync()
+
+    async def _write_each(self, batch):
+        for operation in batch:
+            try:
+                await self.collection.bulk_write([operation], ordered=True)
+            except TRANSIENT_ERRORS:
+                raise
+            except Exception:
+                # Opération refusée par Mongo (document trop grand…) : la mémoire ne correspond plus
+                self._rejected += 1
+                self._resync_pending = True
+                logger.exception("Journal des calls : opération abandonnée")
+
+    async def _resync(self):
+        """Relit la file depuis Mongo une fois le journal vide (sinon après un lot suivant)."""
+        if self.queue_depth:
+            return
+        submitted = self._submitted
+        records = await self._load()
+        # Une modification pendant la lecture n'est pas encore dans Mongo : on attendra son lot
+        if submitted != self._submitted or self._records is None:
+            return
+        self._resync_pending = False
+        self._replace_records(records)
+        logger.warning("Journal des calls : file relue depuis Mongo (%d calls)", len(records))
+        if self.on_resync is not None:
+            self.on_resync(records)
+
+    def _dropped_batch(self, batch):
+        # Lot abandonné (arrêt, relecture impossible) : la file sera relue depuis Mongo
+        self._resync_pending = True
+
+    def add(self, slot, username):
+        self.reserve(1)
+        rank = rank_between(self._records[-1].rank if self._records else None, None)
+        record = CallRecord(str(uuid.uuid4()), slot, username, rank, datetime.now())
+        self._records.append(record)
+        self._by_id[record.id] = record
+        self._journal([record.upsert()])
+        return record
+
+    def delete(self, call_id):
+        """Supprime un call ; None s'il n'existe pas."""
+        record = self._by_id.get(call_id)
+        if record is not None:
+            self.reserve(1)
+            self._remove(record)
+        return record
+
+    def delete_at(self, index):
+        """Supprime le call à la position ``index`` (compatibilité) ; None si hors de la file."""
+        if not 0 <= index < len(self):
+            return None
+        self.reserve(1)
+        record = self._records[index]
+        self._remove(record)
+        return record
+
+    def _remove(self, record):
+        self._records.remove(record)
+        del self._by_id[record.id]
+        self._journal([DeleteOne({"id": record.id})])
+
+    def move(self, call_id, after_id):
+        """Place ``call_id`` juste après ``after_id`` (en tête si None) ; ranks modifiés.
+
+        Les deux ids doivent exister et être différents.
+        """
+        record = self._by_id[call_id]
+        old_position = self._records.index(record)
+        del self._records[old_position]
+        position = self._records.index(self._by_id[after_id]) + 1 if after_id is not None else 0
+        self._records.insert(position, record)
+        rank = rank_between(
+            self._records[position - 1].rank if position > 0 else None,
+            self._records[position + 1].rank if position + 1 < len(self._records) else None,
+        )
+        try:
+            # Une opération, ou une par call si la file doit être renumérotée
+            self.reserve(1 if rank is not None else len(self._records))
+        except JournalFull:
+            self._records.remove(record)
+            self._records.insert(old_position, record)
+            raise
+        if rank is not None:
+            record.rank = rank
+            changed = [record]
+        else:
+            # Écart épuisé : renumérotation complète, dans le même lot du journal
+            for i, other in enumerate(self._records):
+                other.rank = (i + 1) * RANK_STEP
+            changed = self._records
+        self._journal([UpdateOne({"id": other.id}, {"$set": {"rank": other.rank}}) for other in changed])
+        return {other.id: other.rank for other in changed}
+
+    def apply_moves(self, moves):
+        """Applique des déplacements ``(id, after_id)`` ; renvoie ``(id, after_id, ranks)`` appliqués."""
+        applied = []
+        for call_id, after_id in moves:
+            if call_id not in self or call_id == after_id or (after_id is not None and after_id not in self):
+                continue
+            applied.append((call_id, after_id, self.move(call_id, after_id)))
+        return applied
+
+    def replace(self, items):
+        """Remplace la file par ``items`` (dicts slot/username, id facultatif) ; renvoie les records.
+
+        Les ids existants gardent leur date de création ; un id inconnu ou absent
+        donne un nouveau call (id généré) ; les calls absents sont supprimés. Lève
+        ``ValueError`` si un id apparaît deux fois.
+        """
+        ids = [item["id"] for item in items if item.get("id")]
+        if len(ids) != len(set(ids)):
+            raise ValueError("Un même call apparaît plusieurs fois")
+        self.reserve(len(items) + 1)
+        records = []
+        for position, item in enumerate(items):
+            existing = self._by_id.get(item.get("id"))
+            records.append(CallRecord(
+                existing.id if existing is not None else str(uuid.uuid4()),
+                item["slot"],
+                item["username"],
+                (position + 1) * RANK_STEP,
+                existing.created_at if existing is not None else datetime.now(),
+            ))
+        self._replace_records(records)
+        self._journal([record.upsert() for record in records]
+                      + [DeleteMany({"id": {"$nin": [record.id for record in records]}})])
+        return records
+
+    def reset(self):
+        self.reserve(1)
+        self._replace_records([])
+        self._journal([DeleteMany({})])
+
+    def apply_remote(self, event_type, data, ranks):
+        """Reporte la modification d'un autre worker (déjà journalisée par lui).
+
+        Renvoie False si la file la reflétait déjà (call ajouté déjà chargé depuis Mongo).
+        """
+        if self._records is None:
+            return True
+        if event_type == "reset":
+            self._replace_records([])
+            return True
+        if event_type == "reorder":
+            self._replace_records([
+                CallRecord(call["id"], call["slot"], call["user"], ranks.get(call["id"], 0.0))
+                for call in data["calls"]
+            ])
+            return True
+        applied = True
+        if event_type == "add":
+            call = data["call"]
+            if call["id"] in self._by_id:
+                applied = False
+            else:
+                record = CallRecord(call["id"], call["slot"], call["user"], ranks.get(call["id"], 0.0))
+                self._records.append(record)
+                self._by_id[record.id] = record
+        elif event_type == "delete":
+            record = self._by_id.pop(data["id"], None)
+            if record is not None:
+                self._records.remove(record)
+        for call_id, rank in ranks.items():
+            if call_id in self._by_id:
+                self._by_id[call_id].rank = rank
+        self._records.sort(key=sort_key)
+        self._snapshot = None
+        return applied
@@ -0,0 +1,123 @@
+"""Diffusion Server-Sent Events de la file des calls.
+
+Un seul ``CallsHub`` par processus diffuse les modifications de la file en
+mémoire (``calls_queue.CallsQueue``) publiées par les routes (add, delete,
+move, reorder, reset) ; les instantanés viennent de cette même file. Les N
+spectateurs connectés ne coûtent donc aucune lecture en base, quel que soit N.
+
+Chaque événement reçoit un identifiant ``<époque>:<numéro>`` (l'époque change à
+chaque démarrage du processus) ; les derniers événements sont
+conservés pour qu'un navigateur qui se reconnecte avec ``Last-Event-ID`` reçoive
+uniquement ce qu'il a manqué. S'il est trop en retard, il reçoit un nouvel
+instantané complet.
+"""
+import asyncio
+import uuid
+from collections import deque
+
+import orjson
+
+# Sentinelle déposée dans la file d'un abonné trop lent pour le déconnecter
+_OVERFLOW = object()
+
+
+def format_sse(event_type, data, event_id=None):
+    lines = []
+    if event_id is not None:
+        lines.append(f"id: {event_id}")
+    lines.append(f"event: {event_type}")
+    header = "".join(line + "\n" for line in lines).encode("utf-8")
+    return header + b"data: " + orjson.dumps(data) + b"\n\n"
+
+
+class CallsHub:
+    def __init__(self, calls, history_size=256, subscriber_queue_size=64, heartbeat_interval=15.0):
+        self.calls = calls
+        self.heartbeat_interval = heartbeat_interval
+        self.subscriber_queue_size = subscriber_queue_size
+        self._history = deque(maxlen=history_size)
+        self._subscribers = set()
+        self._seq = 0
+        self._epoch = uuid.uuid4().hex[:8]
+
+    @property
+    def last_event_id(self):
+        return self._event_id(self._seq)
+
+    @property
+    def subscriber_count(self):
+        return len(self._subscribers)
+
+    async def ensure_loaded(self):
+        await self.calls.ensure_loaded()
+
+    async def reload(self):
+        """Relit la file depuis Mongo (autre worker, messages perdus) et la pousse aux abonnés."""
+        await self.calls.reload()
+        self.publish("reorder", {"calls": self.snapshot()})
+
+    def _event_id(self, seq):
+        return f"{self._epoch}:{seq}"
+
+    def _parse_event_id(self, event_id):
+        """Numéro de séquence d'un Last-Event-ID émis par ce processus, sinon None."""
+        epoch, _, seq = (event_id or "").partition(":")
+        if epoch != self._epoch or not seq.isdigit():
+            return None
+        return int(seq)
+
+    def snapshot(self):
+        return self.calls.snapshot()
+
+    def publish(self, event_type, data):
+        """Diffuse à tous les abonnés un événement déjà appliqué à la file."""
+        self._seq += 1
+        message = format_sse(event_type, data, self._event_id(self._seq))
+        self._history.append((self._seq, message))
+        for queue in list(self._subscribers):
+            try:
+                queue.put_nowait(message)
+            except asyncio.QueueFull:
+                # Contre-pression : on coupe l'abonné lent plutôt que de bufferiser sans
+                # limite ; il se reconnectera avec Last-Event-ID.
+                self._subscribers.discard(queue)
+                while not queue.empty():
+                    queue.get_nowait()
+                queue.put_nowait(_OVERFLOW)
+
+    def _missed_since(self, last_seq):
+        """Événements postérieurs à last_seq, ou None s'ils ne sont plus en mémoire."""
+        if last_seq is None or last_seq > self._seq:
+            return None
+        if last_seq == self._seq:
+            return []
+        if not self._history or self._history[0][0] > last_seq + 1:
+            return None
+        return [message for seq, message in self._history if seq > last_seq]
+
+    async def stream(self, last_event_id=None):
+        """Générateur SSE : rattrapage ou instantané, puis événements et heartbeats."""
+        await self.ensure_loaded()
+        queue = asyncio.Queue(maxsize=self.subscriber_queue_size)
+        # Pas d'await entre la lecture de l'état et l'abonnement : aucun événement perdu
+        missed = self._missed_since(self._parse_event_id(last_event_id))
+        if missed is None:
+            initial = [format_sse("snapshot", {"calls": self.snapshot()}, self.last_event_id)]
+        else:
+            initial = missed
+        self._subscribers.add(queue)
+        try:
+            yield b"retry: 3000\n\n"
+            for message in initial:
+                yield message
+            while True:
+                try:
+                    message = await asyncio.wait_for(queue.get(), timeout=self.heartbeat_interval)
+                except asyncio.TimeoutError:
+                    yield b": ping\n\n"
+                    continue
+                if message is _OVERFLOW:
+                    return
+                yield message
+        finally:
+            self._subscribers.discard(queue)
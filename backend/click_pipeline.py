@@ -0,0 +1,71 @@
+"""Ingestion des clics par lots.
+
+Un lot de clics devient un ``insert_many`` dans ``clicks``, un ``bulk_write``
+de ``$inc`` agrégés par offre dans ``offers`` et un ``bulk_write`` des compteurs
+par tranche de temps dans ``click_rollups``, au lieu de trois allers-retours
+Mongo par clic. Les IP du lot alimentent aussi les sketches de visiteurs uniques.
+
+Un lot interrompu par une erreur transitoire est rejoué (``BatchWorker``) sans
+compter deux fois : les étapes terminées ne sont pas refaites, et chaque étape
+se rejoue sans effet si elle avait abouti malgré l'erreur (``_id`` fixés avant
+l'insertion, ``$inc`` gardés par l'id du lot, fusion HyperLogLog idempotente).
+"""
+from collections import Counter
+
+from pymongo import UpdateOne
+
+from analytics import BATCH_MARKERS_FIELD, batch_marker, rollup_operations
+from batching import BatchWorker, assign_ids, bulk_write_once, insert_many_once
+from compact_schema import LEGACY
+from visitor_sketches import merge_sketches, sketches_for_clicks
+
+
+class ClickPipeline(BatchWorker):
+    def __init__(self, clicks_collection, offers_collection, rollups_collection, sketches_collection,
+                 on_flushed=None, on_dropped=None, clicks_schema=LEGACY, **kwargs):
+        super().__init__(**kwargs)
+        self.on_flushed = on_flushed
+        self.on_dropped = on_dropped
+        self.clicks_schema = clicks_schema
+        self.clicks_collection = clicks_collection
+        self.offers_collection = offers_collection
+        self.rollups_collection = rollups_collection
+        self.sketches_collection = sketches_collection
+        self._batch = None
+        self._done = set()  # étapes terminées du lot en cours
+
+    async def _flush(self, batch):
+        if batch is not self._batch:
+            self._batch, self._done = batch, set()
+        # L'id du premier clic identifie le lot, d'un essai à l'autre
+        batch_id = batch[0]["id"]
+        per_offer = Counter(click["offer_id"] for click in batch)
+        await self._step("clicks", lambda: insert_many_once(
+            self.clicks_collection, [self.clicks_schema.encode(click) for click in assign_ids(batch)]))
+        await self._step("offers", lambda: self.offers_collection.bulk_write(
+            [
+                UpdateOne(
+                    {"id": offer_id, BATCH_MARKERS_FIELD: {"$ne": batch_id}},
+                    {"$inc": {"clicks": count}, "$push": batch_marker(batch_id)},
+                )
+                for offer_id, count in per_offer.items()
+            ],
+            ordered=False,
+        ))
+        await self._step("rollups", lambda: bulk_write_once(
+            self.rollups_collection, rollup_operations(batch, batch_id)))
+        await self._step("sketches", lambda: merge_sketches(self.sketches_collection, sketches_for_clicks(batch)))
+        self._batch = None
+        if self.on_flushed is not None:
+            self.on_flushed(per_offer)
+
+    def _dropped_batch(self, batch):
+        # Les compteurs en mémoire comptaient déjà ces clics : ils sont relus depuis Mongo
+        self._batch = None
+        if self.on_dropped is not None:
+            self.on_dropped(batch)
+
+    async def _step(self, name, write):
+        if name not in self._done:
+            await write()
+            self._done.add(name)
@@ -0,0 +1,151 @@
+"""Représentation compacte des documents ``clicks`` et ``logs``.
+
+Au format historique, chaque document répète des noms de champs longs, des
+UUID en texte (36 octets) et des IP en texte. Le format compact stocke :
+- les UUID en binaire (``Binary`` sous-type 4, 16 octets) ;
+- les IPv4/IPv6 empaquetées (4 ou 16 octets) ;
+- des noms de champs d'une ou deux lettres.
+
+Le ``DocumentSchema`` d'une collection traduit dans les deux sens : ``encode``
+à l'écriture, ``decode`` à la lecture (les routes gardent leur JSON), et
+``filter`` / ``sort`` / ``projection`` pour les requêtes. Le décodage laisse
+passer les documents encore au format historique, et une valeur qui ne
+s'empaquette pas sans perte (id non UUID, IP invalide) reste en texte.
+
+Le format et les noms de collections viennent de l'environnement :
+``STORAGE_FORMAT`` (``legacy`` ou ``compact``), ``CLICKS_COLLECTION`` et
+``LOGS_COLLECTION`` (voir ``migrate_storage.py``).
+"""
+import ipaddress
+import os
+import uuid
+
+from bson.binary import UUID_SUBTYPE, Binary
+
+
+def pack_uuid(value):
+    if isinstance(value, str):
+        try:
+            parsed = uuid.UUID(value)
+        except ValueError:
+            return value
+        if str(parsed) == value:
+            return Binary.from_uuid(parsed)
+    return value
+
+
+def unpack_uuid(value):
+    if isinstance(value, Binary) and value.subtype == UUID_SUBTYPE:
+        return str(value.as_uuid())
+    return value
+
+
+def pack_ip(value):
+    if isinstance(value, str):
+        try:
+            address = ipaddress.ip_address(value)
+        except ValueError:
+            return value
+        if str(address) == value:
+            return address.packed
+    return value
+
+
+def unpack_ip(value):
+    # Binary de sous-type 0 : pymongo le relit en ``bytes``
+    if isinstance(value, bytes) and len(value) in (4, 16):
+        return str(ipaddress.ip_address(value))
+    return value
+
+
+class DocumentSchema:
+    def __init__(self, fields=None, codecs=None):
+        self.fields = fields or {}  # nom logique -> nom stocké
+        self.codecs = codecs or {}  # nom logique -> (encode, decode)
+        self._logical = {stored: name for name, stored in self.fields.items()}
+
+    @property
+    def compact(self):
+        return bool(self.fields)
+
+    def field(self, name):
+        return self.fields.get(name, name)
+
+    def _encode_value(self, name, value):
+        codec = self.codecs.get(name)
+        return codec[0](value) if codec else value
+
+    def encode(self, doc):
+        if not self.fields:
+            return doc
+        return {self.field(name): self._encode_value(name, value) for name, value in doc.items()}
+
+    def decode(self, doc):
+        if not self.fields:
+            return doc
+        decoded = {}
+        for key, value in doc.items():
+            name = self._logical.get(key, key)
+            codec = self.codecs.get(name)
+            decoded[name] = codec[1](value) if codec else value
+        return decoded
+
+    def filter(self, query):
+        """Filtre exprimé en noms logiques -> filtre sur les champs stockés."""
+        if not self.fields:
+            return query
+        translated = {}
+        for key, value in query.items():
+            if key in ("$and", "$or", "$nor"):
+                translated[key] = [self.filter(clause) for clause in value]
+                continue
+            if key in self.codecs:
+                if isinstance(value, dict):
+                    value = {
+                        operator: [self._encode_value(key, item) for item in operand]
+                        if isinstance(operand, list) else self._encode_value(key, operand)
+                        for operator, operand in value.items()
+                    }
+                else:
+                    value = self._encode_value(key, value)
+            translated[self.field(key)] = value
+        return translated
+
+    def sort(self, spec):
+        return [(self.field(name), direction) for name, direction in spec]
+
+    def projection(self, projection):
+        return {self.field(name): value for name, value in projection.items()}
+
+
+LEGACY = DocumentSchema()
+
+CLICKS_COMPACT = DocumentSchema(
+    {"id": "i", "offer_id": "o", "user_ip": "ip", "timestamp": "t"},
+    {"id": (pack_uuid, unpack_uuid), "offer_id": (pack_uuid, unpack_uuid), "user_ip": (pack_ip, unpack_ip)},
+)
+
+LOGS_COMPACT = DocumentSchema(
+    {"id": "i", "timestamp": "t", "action": "a", "slot": "s", "username": "u", "ip": "ip"},
+    {"id": (pack_uuid, unpack_uuid), "ip": (pack_ip, unpack_ip)},
+)
+
+
+class StorageSettings:
+    def __init__(self, storage_format="legacy", clicks_collection="clicks", logs_collection="logs"):
+        if storage_format not in ("legacy", "compact"):
+            raise ValueError(f"STORAGE_FORMAT invalide : {storage_format} (legacy, compact)")
+        self.storage_format = storage_format
+        self.clicks_collection = clicks_collection
+        self.logs_collection = logs_collection
+        compact = storage_format == "compact"
+        self.clicks_schema = CLICKS_COMPACT if compact else LEGACY
+        self.logs_schema = LOGS_COMPACT if compact else LEGACY
+
+
+def storage_settings():
+    return StorageSettings(
+        os.environ.get("STORAGE_FORMAT", "legacy"),
+        os.environ.get("CLICKS_COLLECTION", "clicks"),
+        os.environ.get("LOGS_COLLECTION", "logs"),
+    )
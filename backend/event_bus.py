@@ -0,0 +1,132 @@
+"""Bus d'événements entre workers, sur une collection Mongo plafonnée.
+
+Chaque worker garde des états en mémoire (catalogue d'offres, hub SSE des
+calls). Quand l'un d'eux modifie ces données, il publie un message dans la
+collection plafonnée ``bus_events`` ; les autres la suivent avec un curseur
+« tailable » et appliquent le message à leur propre copie. Contrairement à un
+change stream, ce mécanisme fonctionne aussi sur un mongod autonome, sans
+replica set.
+
+Les publications passent par un ``BatchWorker`` (insert_many ordonné) pour ne
+pas ajouter d'aller-retour Mongo aux requêtes. Si un worker a manqué des
+messages (collection recyclée pendant une coupure), les abonnés ``resync`` sont
+appelés pour tout recharger depuis la base.
+
+Au démarrage, ``mark`` retient la position du bus avant le chargement des états
+en mémoire ; ``start`` suit ensuite le bus à partir de cette position. Un
+message publié pendant le chargement est donc appliqué, au lieu d'être sauté :
+les abonnés doivent accepter un message déjà reflété par l'état chargé.
+"""
+import asyncio
+import logging
+import os
+import uuid
+from datetime import datetime
+
+from pymongo import CursorType
+from pymongo.errors import CollectionInvalid
+
+from batching import BatchWorker
+
+logger = logging.getLogger(__name__)
+
+RESYNC_TOPIC = "resync"
+
+# Position non retenue : le suivi commence au dernier message au moment de start()
+_UNMARKED = object()
+
+
+class EventBus(BatchWorker):
+    def __init__(self, collection, capped_size_bytes=1024 * 1024, **kwargs):
+        kwargs.setdefault("max_batch_size", 100)
+        kwargs.setdefault("linger_seconds", 0.01)
+        super().__init__(**kwargs)
+        self.collection = collection
+        self.capped_size_bytes = capped_size_bytes
+        self.origin = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._handlers = {}
+        self._tail_task = None
+        self._start_id = _UNMARKED
+
+    def subscribe(self, topic, handler):
+        """Enregistre ``handler(payload)`` (fonction ou coroutine) pour les messages des autres workers."""
+        self._handlers.setdefault(topic, []).append(handler)
+
+    def publish(self, topic, payload):
+        return self.submit({
+            "topic": topic,
+            "origin": self.origin,
+            "payload": payload,
+            "ts": datetime.now(),
+        })
+
+    async def setup(self):
+        """Crée la collection plafonnée si besoin (un curseur tailable exige au moins un document)."""
+        database = self.collection.database
+        try:
+            await database.create_collection(self.collection.name, capped=True, size=self.capped_size_bytes)
+        except CollectionInvalid:
+            pass
+        if await self.collection.find_one() is None:
+            await self.collection.insert_one({"topic": "init", "origin": self.origin, "ts": datetime.now()})
+
+    async def mark(self):
+        """Retient la position courante du bus ; ``start`` reprendra juste après (appelé avant le chargement)."""
+        self._start_id = await self._latest_id()
+
+    def start(self):
+        super().start()
+        if self._tail_task is None:
+            self._tail_task = asyncio.create_task(self._tail())
+
+    async def stop(self):
+        if self._tail_task is not None:
+            self._tail_task.cancel()
+            try:
+                await self._tail_task
+            except asyncio.CancelledError:
+                pass
+            self._tail_task = None
+        await super().stop()
+
+    async def _flush(self, batch):
+        await self.collection.insert_many(batch, ordered=True)
+
+    async def _latest_id(self):
+        docs = await self.collection.find({}, projection={"_id": 1}).sort("$natural", -1).limit(1).to_list(length=1)
+        return docs[0]["_id"] if docs else None
+
+    async def _dispatch(self, topic, payload):
+        for handler in self._handlers.get(topic, []):
+            try:
+                result = handler(payload)
+                if asyncio.iscoroutine(result):
+                    await result
+            except Exception:
+                logger.exception("Bus : échec du traitement d'un message %s", topic)
+
+    async def _tail(self):
+        last_id = self._start_id if self._start_id is not _UNMARKED else await self._latest_id()
+        while True:
+            try:
+                if last_id is not None and await self.collection.find_one({"_id": last_id}, projection={"_id": 1}) is None:
+                    # Le dernier message vu a été recyclé : des événements ont pu être perdus
+                    await self._dispatch(RESYNC_TOPIC, {})
+                    last_id = await self._latest_id()
+                # Ordre naturel = ordre d'insertion ; on saute tout jusqu'au dernier message traité
+                cursor = self.collection.find({}, cursor_type=CursorType.TAILABLE_AWAIT)
+                caught_up = last_id is None
+                while cursor.alive:
+                    async for doc in cursor:
+                        if not caught_up:
+                            caught_up = doc["_id"] == last_id
+                            continue
+                        last_id = doc["_id"]
+                        if doc.get("origin") != self.origin and doc["topic"] in self._handlers:
+                            await self._dispatch(doc["topic"], doc.get("payload") or {})
+                    await asyncio.sleep(0.1)
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Bus : curseur interrompu, reprise")
+            await asyncio.sleep(1)
@@ -0,0 +1,145 @@
+"""Préchauffage en tâche de fond et sondes de vie (/healthz) et de disponibilité (/readyz).
+
+Le processus accepte les connexions dès son lancement : le préchauffage
+(index, offres par défaut, file des calls, catalogue…) tourne
+en fond pendant que /healthz répond déjà 200 sans toucher Mongo. Tant qu'il
+n'est pas terminé, ``ReadinessGate`` renvoie 503 (``Retry-After``) pour les
+autres routes et /readyz aussi : un orchestrateur distingue « processus
+lancé » de « base joignable, caches chargés ».
+
+Les étapes sont nommées et exécutées dans l'ordre. Si l'une échoue (Mongo
+injoignable au démarrage), seules les étapes restantes sont rejouées, avec une
+attente doublée à chaque essai (plafonnée à ``retry_max_seconds``). Les étapes
+de fond (``background_steps``), utiles mais pas indispensables pour servir
+(amorçage de l'autocomplétion, par exemple), s'exécutent de la même façon une
+fois le processus prêt.
+"""
+import asyncio
+import inspect
+import logging
+import time
+
+import orjson
+
+logger = logging.getLogger(__name__)
+
+PROCESS_STARTED = time.monotonic()
+
+
+class Readiness:
+    def __init__(self, ping_timeout_seconds=1.0, retry_max_seconds=30.0):
+        self.ping_timeout_seconds = ping_timeout_seconds
+        self.retry_max_seconds = retry_max_seconds
+        self.ready = False
+        self.steps = []
+        self.background_steps = []
+        self.durations = {}  # étape terminée -> durée (s)
+        self.attempts = 0
+        self.last_error = None
+        self.warmup_seconds = None
+        self.last_ping_ms = None
+        self._task = None
+
+    def start(self, steps, background_steps=()):
+        """Lance le préchauffage : listes ``(nom, fonction)`` (synchrone ou coroutine).
+
+        ``steps`` conditionnent la disponibilité ; ``background_steps`` suivent, processus déjà prêt.
+        """
+        if self._task is None:
+            self.steps = list(steps)
+            self.background_steps = list(background_steps)
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        start = time.perf_counter()
+        await self._complete(self.steps)
+        self.warmup_seconds = round(time.perf_counter() - start, 3)
+        self.ready = True
+        logger.info("Prêt : préchauffage en %.3f s, %.3f s après l'import",
+                    self.warmup_seconds, time.monotonic() - PROCESS_STARTED)
+        await self._complete(self.background_steps)
+
+    async def _complete(self, steps):
+        if not steps:
+            return
+        delay = 0.5
+        while True:
+            self.attempts += 1
+            try:
+                await self._run_pending(steps)
+                self.last_error = None
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as error:
+                self.last_error = repr(error)
+                logger.warning("Préchauffage : échec (essai %d), nouvel essai dans %.1f s",
+                               self.attempts, delay, exc_info=True)
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.retry_max_seconds)
+
+    async def _run_pending(self, steps):
+        for name, step in steps:
+            if name in self.durations:
+                continue
+            step_start = time.perf_counter()
+            try:
+                result = step()
+                if inspect.isawaitable(result):
+                    await result
+            except Exception as error:
+                raise RuntimeError(f"étape {name} : {error!r}") from error
+            self.durations[name] = round(time.perf_counter() - step_start, 3)
+
+    async def ping(self, database):
+        """Durée d'un ``ping`` Mongo en millisecondes (lève une exception après ``ping_timeout_seconds``)."""
+        start = time.perf_counter()
+        await asyncio.wait_for(database.command("ping"), self.ping_timeout_seconds)
+        self.last_ping_ms = round((time.perf_counter() - start) * 1000, 3)
+        return self.last_ping_ms
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "uptime_seconds": round(time.monotonic() - PROCESS_STARTED, 3),
+            "warmup_seconds": self.warmup_seconds,
+            "steps": self.durations,
+            "pending": [name for name, _ in self.steps if name not in self.durations],
+            "background_pending": [name for name, _ in self.background_steps if name not in self.durations],
+            "attempts": self.attempts,
+            "last_error": self.last_error,
+        }
+
+
+class ReadinessGate:
+    """Middleware ASGI : 503 sur toutes les routes sauf ``open_paths`` tant que le préchauffage n'est pas fini."""
+
+    def __init__(self, app, readiness, open_paths=("/healthz", "/readyz", "/metrics")):
+        self.app = app
+        self.readiness = readiness
+        self.open_paths = frozenset(open_paths)
+        self._body = orjson.dumps({"detail": "Démarrage en cours, réessayez"})
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self.readiness.ready or scope["path"] in self.open_paths:
+            await self.app(scope, receive, send)
+            return
+        await send({
+            "type": "http.response.start",
+            "status": 503,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(self._body)).encode()),
+                (b"retry-after", b"1"),
+            ],
+        })
+        await send({"type": "http.response.body", "body": self._body})
@@ -0,0 +1,211 @@
+"""Index Mongo requis par l'application et vérification des plans de requête.
+
+``ensure_indexes`` est appelé au démarrage : il crée les index déclarés dans
+``index_specs()`` et ajuste les options TTL si la configuration a changé.
+``explain_hot_queries`` exécute ``explain()`` sur les requêtes fréquentes et
+signale celles qui retombent sur un COLLSCAN.
+
+Les noms de champs et de collections de ``clicks`` et ``logs`` suivent la
+configuration de stockage (``compact_schema.storage_settings``). Sur une
+collection time-series, la rétention passe par l'option de collection
+``expireAfterSeconds`` au lieu d'un index TTL.
+
+En ligne de commande (depuis ``backend/``) :
+
+    python indexes.py --ensure --explain
+
+Le code de sortie vaut 1 si une requête fréquente fait un COLLSCAN.
+"""
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from datetime import datetime, timedelta
+
+from pymongo.errors import OperationFailure
+
+from calls_order import CALLS_SORT
+from compact_schema import storage_settings
+from logs_query import LOGS_SORT
+
+logger = logging.getLogger(__name__)
+
+SECONDS_PER_DAY = 86400
+
+
+def _ttl_seconds(variable, archive_variable=None):
+    """Durée de rétention (jours, variable d'environnement) en secondes, ou None si désactivée.
+
+    Si l'archivage (``archive_variable``, voir ``retention.py``) est actif, il
+    prend en charge la suppression : pas de TTL, qui effacerait sans archiver.
+    """
+    if archive_variable and float(os.environ.get(archive_variable, "0") or 0) > 0:
+        return None
+    days = float(os.environ.get(variable, "0") or 0)
+    return int(days * SECONDS_PER_DAY) if days > 0 else None
+
+
+class IndexSpec:
+    def __init__(self, keys, name, unique=False, expire_after_seconds=None, ttl=False):
+        self.keys = keys
+        self.name = name
+        self.unique = unique
+        self.expire_after_seconds = expire_after_seconds
+        self.ttl = ttl
+
+    def options(self):
+        options = {"name": self.name}
+        if self.unique:
+            options["unique"] = True
+        if self.expire_after_seconds is not None:
+            options["expireAfterSeconds"] = self.expire_after_seconds
+        return options
+
+
+def index_specs(storage=None):
+    """Index déclarés par collection (les TTL dépendent de LOGS_TTL_DAYS / CLICKS_TTL_DAYS)."""
+    storage = storage or storage_settings()
+    logs, clicks = storage.logs_schema, storage.clicks_schema
+    logs_sort = logs.sort(LOGS_SORT)
+    return {
+        "offers": [
+            IndexSpec([("id", 1)], "offers_id_unique", unique=True),
+        ],
+        "calls": [
+            IndexSpec(CALLS_SORT, "calls_rank"),
+            IndexSpec([("id", 1)], "calls_id_unique", unique=True),
+        ],
+        storage.logs_collection: [
+            IndexSpec([(logs.field("timestamp"), -1)], "logs_timestamp",
+                      expire_after_seconds=_ttl_seconds("LOGS_TTL_DAYS", "LOGS_ARCHIVE_AFTER_DAYS"), ttl=True),
+            IndexSpec(logs_sort, "logs_keyset"),
+            IndexSpec([(logs.field("action"), 1)] + logs_sort, "logs_action_keyset"),
+        ],
+        storage.clicks_collection: [
+            IndexSpec([(clicks.field("timestamp"), -1)], "clicks_timestamp",
+                      expire_after_seconds=_ttl_seconds("CLICKS_TTL_DAYS", "CLICKS_ARCHIVE_AFTER_DAYS"), ttl=True),
+        ],
+        "click_rollups": [
+            IndexSpec([("granularity", 1), ("bucket", 1), ("offer_id", 1)], "click_rollups_bucket_unique", unique=True),
+        ],
+        "visitor_sketches": [
+            IndexSpec([("granularity", 1), ("bucket", 1), ("offer_id", 1)], "visitor_sketches_bucket_unique", unique=True),
+        ],
+    }
+
+
+async def _ensure_index(collection, spec, existing):
+    current = existing.get(spec.name)
+    if current is not None and list(current["key"]) != list(spec.keys):
+        # Même nom, clés différentes (tri modifié) : l'index est reconstruit
+        await collection.drop_index(spec.name)
+        current = None
+    if current is not None:
+        current_ttl = current.get("expireAfterSeconds")
+        if current_ttl == spec.expire_after_seconds:
+            return
+        if current_ttl is not None and spec.expire_after_seconds is not None:
+            # Seule la durée du TTL change : collMod suffit, sans reconstruire l'index
+            await collection.database.command(
+                "collMod", collection.name,
+                index={"name": spec.name, "expireAfterSeconds": spec.expire_after_seconds},
+            )
+            return
+        await collection.drop_index(spec.name)
+    await collection.create_index(spec.keys, **spec.options())
+
+
+async def _set_collection_ttl(collection, spec):
+    # Time-series : pas d'index TTL, l'expiration est une option de la collection
+    await collection.database.command(
+        "collMod", collection.name,
+        expireAfterSeconds=spec.expire_after_seconds if spec.expire_after_seconds is not None else "off",
+    )
+
+
+async def ensure_indexes(db, specs=None):
+    """Crée ou met à jour les index déclarés ; une erreur sur un index n'arrête pas le démarrage."""
+    timeseries = set(await db.list_collection_names(filter={"type": "timeseries"}))
+    for collection_name, collection_specs in (specs or index_specs()).items():
+        collection = db[collection_name]
+        existing = await collection.index_information()
+        for spec in collection_specs:
+            try:
+                if spec.ttl and collection_name in timeseries:
+                    await _set_collection_ttl(collection, spec)
+                    continue
+                await _ensure_index(collection, spec, existing)
+            except OperationFailure as error:
+                logger.error("Index %s.%s non créé : %s", collection_name, spec.name, error)
+
+
+def hot_queries(db, storage=None):
+    """Requêtes fréquentes de l'application : (nom, collection, curseur à expliquer)."""
+    storage = storage or storage_settings()
+    logs_schema, logs = storage.logs_schema, db[storage.logs_collection]
+    logs_sort = logs_schema.sort(LOGS_SORT)
+    return [
+        ("offer par id", "offers", db.offers.find({"id": "explain"})),
+        ("file des calls", "calls", db.calls.find().sort(CALLS_SORT)),
+        ("call par id", "calls", db.calls.find({"id": "explain"})),
+        ("derniers logs", logs.name, logs.find().sort(logs_sort).limit(100)),
+        ("logs par action", logs.name,
+         logs.find(logs_schema.filter({"action": "call_created"})).sort(logs_sort).limit(100)),
+        ("clics par heure", "click_rollups", db.click_rollups.find({
+            "granularity": "hour",
+            "bucket": {"$gte": datetime.now() - timedelta(days=1), "$lt": datetime.now()},
+        })),
+    ]
+
+
+def _plan_stages(plan):
+    """Liste à plat des étapes d'un plan d'exécution (classique ou SBE)."""
+    if not isinstance(plan, dict):
+        return []
+    stages = [plan["stage"]] if "stage" in plan else []
+    for key in ("inputStage", "queryPlan"):
+        stages += _plan_stages(plan.get(key))
+    for child in plan.get("inputStages", []):
+        stages += _plan_stages(child)
+    return stages
+
+
+async def explain_hot_queries(db, storage=None):
+    report = []
+    for name, collection_name, cursor in hot_queries(db, storage):
+        explanation = await cursor.explain()
+        stages = _plan_stages(explanation.get("queryPlanner", {}).get("winningPlan", {}))
+        report.append({
+            "query": name,
+            "collection": collection_name,
+            "stages": stages,
+            "collscan": "COLLSCAN" in stages,
+        })
+    return report
+
+
+async def _main(args):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017/"))
+    db = client[os.environ.get("BENCH_DB_NAME", "casino_calls_db")]
+    try:
+        if args.ensure:
+            await ensure_indexes(db)
+        if not args.explain:
+            return 0
+        report = await explain_hot_queries(db)
+        for entry in report:
+            flag = "COLLSCAN" if entry["collscan"] else "ok"
+            print(f"{flag:<9} {entry['collection']:<8} {entry['query']:<16} {' > '.join(entry['stages'])}")
+        return 1 if any(entry["collscan"] for entry in report) else 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Index Mongo et plans des requêtes fréquentes")
+    parser.add_argument("--ensure", action="store_true", help="créer / mettre à jour les index")
+    parser.add_argument("--explain", action="store_true", help="expliquer les requêtes fréquentes")
+    sys.exit(asyncio.run(_main(parser.parse_args())))
@@ -0,0 +1,192 @@
+"""Classements « top K » des slots les plus demandés et des pseudos les plus actifs.
+
+Chaque classement est un résumé Space-Saving de ``capacity`` compteurs : une
+clé déjà suivie est incrémentée ; une clé nouvelle remplace la moins comptée
+et hérite de son compte (noté en ``error``). Toute clé dont la fréquence réelle
+dépasse ``N / capacity`` est présente, avec un compte compris entre
+``count - error`` et ``count``. La mémoire ne dépend que de ``capacity``.
+
+Trois fenêtres, sans jamais lire la collection ``logs`` :
+
+- ``hour`` : un résumé par minute sur ``window_minutes`` minutes, agrégés
+  incrémentalement (voir ``Leaderboard``) ;
+- ``session`` : depuis le dernier POST /api/calls/reset (ou le démarrage) ;
+- ``all`` : depuis le démarrage, les slots étant amorcés par les comptes que
+  ``SlotIndex.seed_from_logs`` a relus (fenêtre ``SLOT_INDEX_SEED_DAYS``).
+"""
+import heapq
+import time
+from operator import itemgetter
+
+WINDOWS = ("hour", "session", "all")
+
+
+class SpaceSaving:
+    __slots__ = ("capacity", "counts", "errors", "total")
+
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.total = 0
+
+    def __len__(self):
+        return len(self.counts)
+
+    def add(self, key, count=1):
+        self.total += count
+        if key in self.counts:
+            self.counts[key] += count
+            return
+        if len(self.counts) < self.capacity:
+            self.counts[key] = count
+            self.errors[key] = 0
+            return
+        # Parcours O(capacity) des compteurs, seulement pour une clé non suivie
+        evicted = min(self.counts, key=self.counts.__getitem__)
+        floor = self.counts.pop(evicted)
+        del self.errors[evicted]
+        self.counts[key] = floor + count
+        self.errors[key] = floor
+
+    def _floor(self):
+        # Majorant du compte d'une clé absente : le plus petit compteur si le résumé est plein
+        return min(self.counts.values()) if len(self.counts) >= self.capacity else 0
+
+    def copy(self):
+        summary = SpaceSaving(self.capacity)
+        summary.counts = dict(self.counts)
+        summary.errors = dict(self.errors)
+        summary.total = self.total
+        return summary
+
+    def merge(self, other):
+        """Ajoute ``other`` (résumés fusionnables : les bornes ``count - error`` / ``count`` sont conservées).
+
+        Une clé absente d'un résumé plein y compte pour son plus petit compteur
+        (en ``count`` et en ``error``) ; seules les ``capacity`` plus fortes sont gardées.
+        """
+        floor, other_floor = self._floor(), other._floor()
+        counts, errors = {}, {}
+        for key in self.counts.keys() | other.counts.keys():
+            counts[key] = self.counts.get(key, floor) + other.counts.get(key, other_floor)
+            errors[key] = self.errors.get(key, floor) + other.errors.get(key, other_floor)
+        kept = heapq.nlargest(self.capacity, counts, key=counts.__getitem__)
+        self.counts = {key: counts[key] for key in kept}
+        self.errors = {key: errors[key] for key in kept}
+        self.total += other.total
+
+    def top(self, limit):
+        ranked = sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))[:limit]
+        return [{"name": key, "count": count, "error": self.errors[key]} for key, count in ranked]
+
+
+def _copy(pair):
+    return tuple(summary.copy() for summary in pair)
+
+
+def _merge(pair, other):
+    for summary, other_summary in zip(pair, other):
+        summary.merge(other_summary)
+    return pair
+
+
+class Leaderboard:
+    """Classements des trois fenêtres.
+
+    La fenêtre ``hour`` est une file de minutes écoulées agrégée par deux piles
+    (« two-stacks » des fenêtres glissantes) : une minute close est fusionnée
+    une fois dans l'agrégat de la pile arrière ; la pile avant garde, pour
+    chaque minute, la fusion de celle-ci et des suivantes, si bien que la plus
+    ancienne sort sans rien recalculer. Quand la pile avant est vide, elle est
+    reconstruite depuis la pile arrière (``window_minutes`` fusions, une fois
+    par fenêtre). Une lecture fusionne au plus trois résumés par classement.
+    """
+
+    def __init__(self, capacity=100, window_minutes=60, clock=time.time):
+        self.capacity = capacity
+        self.window_minutes = window_minutes
+        self.clock = clock
+        self._current_minute = None
+        self._current = self._pair()
+        self._back = []  # (minute, résumés de la minute), de la plus ancienne à la plus récente
+        self._back_total = self._pair()  # fusion de la pile arrière
+        self._front = []  # (minute, fusion de cette minute et des suivantes), la plus ancienne en dernier
+        self._session = self._pair()
+        self._all = self._pair()
+
+    def _pair(self):
+        return SpaceSaving(self.capacity), SpaceSaving(self.capacity)
+
+    def _advance(self, now):
+        """Ferme la minute en cours si l'horloge a avancé, puis retire les minutes sorties de la fenêtre."""
+        minute = int(now // 60)
+        if self._current_minute is None:
+            self._current_minute = minute
+        if minute > self._current_minute:
+            if self._current[0].total:
+                self._back.append((self._current_minute, self._current))
+                _merge(self._back_total, self._current)
+            self._current_minute = minute
+            self._current = self._pair()
+        oldest = self._current_minute - self.window_minutes
+        while True:
+            if not self._front and self._back:
+                self._flip()
+            if not self._front or self._front[-1][0] > oldest:
+                return
+            self._front.pop()
+
+    def _flip(self):
+        total = self._pair()
+        for minute, pair in reversed(self._back):
+            total = _merge(_copy(total), pair)
+            self._front.append((minute, total))
+        self._back = []
+        self._back_total = self._pair()
+
+    def record(self, slot, username, now=None):
+        """Compte un call (slot canonique, pseudo) dans les trois fenêtres.
+
+        Une heure antérieure à la minute en cours compte dans la minute en cours.
+        """
+        self._advance(self.clock() if now is None else now)
+        username = username.strip()
+        for slots, users in (self._current, self._session, self._all):
+            slots.add(slot)
+            if username:
+                users.add(username)
+
+    def seed_slots(self, counts):
+        """Amorce le classement ``all`` des slots avec des comptes ``(slot, count)`` déjà agrégés."""
+        slots = self._all[0]
+        # Seules les ``capacity`` plus fortes entrées peuvent rester dans le résumé
+        for slot, count in heapq.nlargest(self.capacity, counts, key=itemgetter(1)):
+            slots.add(slot, count)
+
+    def reset_session(self):
+        self._session = self._pair()
+
+    def _hour(self, now):
+        self._advance(now)
+        pair = _copy(self._current)
+        _merge(pair, self._back_total)
+        if self._front:
+            _merge(pair, self._front[-1][1])
+        return pair
+
+    def top(self, window="hour", limit=10, now=None):
+        if window not in WINDOWS:
+            raise ValueError(f"Fenêtre invalide : {window} ({', '.join(WINDOWS)})")
+        if window == "session":
+            slots, users = self._session
+        elif window == "all":
+            slots, users = self._all
+        else:
+            slots, users = self._hour(self.clock() if now is None else now)
+        return {
+            "window": window,
+            "calls": slots.total,
+            "slots": slots.top(limit),
+            "users": users.top(limit),
+        }
@@ -0,0 +1,19 @@
+"""Écriture des logs d'audit en tâche de fond.
+
+Les routes déposent leurs enregistrements dans un tampon borné ; ils sont
+écrits par lots avec ``insert_many``. Un log n'ajoute donc plus d'aller-retour
+Mongo au temps de réponse de la requête qui le produit.
+"""
+from batching import BatchWorker, assign_ids, insert_many_once
+from compact_schema import LEGACY
+
+
+class LogWriter(BatchWorker):
+    def __init__(self, collection, schema=LEGACY, **kwargs):
+        super().__init__(**kwargs)
+        self.collection = collection
+        self.schema = schema
+
+    async def _flush(self, batch):
+        # _id fixés au premier essai : un lot rejoué n'insère pas de doublons
+        await insert_many_once(self.collection, [self.schema.encode(log) for log in assign_ids(batch)])
@@ -0,0 +1,98 @@
+"""Pagination par curseur et export en flux de la collection ``logs``.
+
+Les pages sont parcourues du plus récent au plus ancien sur la clé
+(timestamp, _id) : le curseur opaque renvoyé au client encode le dernier
+couple vu, et la page suivante reprend strictement après lui, sans ``skip``.
+L'export itère le curseur Mongo par lots et produit les lignes au fil de
+l'eau : la mémoire reste constante quelle que soit la taille de la collection.
+"""
+import base64
+import csv
+import io
+import json
+from datetime import datetime
+
+from bson import ObjectId
+from bson.errors import InvalidId
+
+from compact_schema import LEGACY
+
+LOGS_SORT = [("timestamp", -1), ("_id", -1)]
+# Champs renvoyés par l'API (le _id sert uniquement au curseur)
+LOGS_PROJECTION = {"_id": 1, "id": 1, "timestamp": 1, "ip": 1, "slot": 1, "username": 1, "action": 1}
+EXPORT_FIELDS = ["id", "timestamp", "action", "slot", "username", "ip"]
+EXPORT_BATCH_SIZE = 1000
+
+
+def encode_cursor(doc):
+    raw = f"{doc['timestamp'].isoformat()}|{doc['_id']}"
+    return base64.urlsafe_b64encode(raw.encode("ascii")).decode("ascii")
+
+
+def decode_cursor(cursor):
+    """(timestamp, _id) encodés dans le curseur ; ValueError s'il est invalide."""
+    try:
+        timestamp, _, object_id = base64.urlsafe_b64decode(cursor.encode("ascii")).decode("ascii").partition("|")
+        return datetime.fromisoformat(timestamp), ObjectId(object_id)
+    except (ValueError, InvalidId, UnicodeError) as error:
+        raise ValueError("Curseur invalide") from error
+
+
+def build_filter(action=None, slot=None, username=None, ip=None, cursor=None):
+    clauses = [
+        {field: value}
+        for field, value in (("action", action), ("slot", slot), ("username", username), ("ip", ip))
+        if value
+    ]
+    if cursor:
+        timestamp, object_id = decode_cursor(cursor)
+        clauses.append({"$or": [
+            {"timestamp": {"$lt": timestamp}},
+            {"timestamp": timestamp, "_id": {"$lt": object_id}},
+        ]})
+    if not clauses:
+        return {}
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+def _find(collection, query, schema, projection=None):
+    """Curseur trié (LOGS_SORT) ; ``query`` est en noms logiques, traduits par ``schema``."""
+    if projection is not None:
+        projection = schema.projection(projection)
+    return collection.find(schema.filter(query), projection=projection).sort(schema.sort(LOGS_SORT))
+
+
+async def fetch_page(collection, query, limit, schema=LEGACY):
+    """Une page de logs et le curseur de la suivante (None s'il n'y en a plus)."""
+    docs = await _find(collection, query, schema, LOGS_PROJECTION).limit(limit + 1).to_list(length=limit + 1)
+    docs = [schema.decode(doc) for doc in docs]
+    next_cursor = encode_cursor(docs[limit - 1]) if len(docs) > limit else None
+    return docs[:limit], next_cursor
+
+
+def _export_row(doc):
+    row = {}
+    for field in EXPORT_FIELDS:
+        value = doc.get(field)
+        row[field] = value.isoformat() if isinstance(value, datetime) else value
+    return row
+
+
+async def export_ndjson(collection, query, schema=LEGACY):
+    cursor = _find(collection, query, schema).batch_size(EXPORT_BATCH_SIZE)
+    async for doc in cursor:
+        yield (json.dumps(_export_row(schema.decode(doc)), ensure_ascii=False) + "\n").encode("utf-8")
+
+
+async def export_csv(collection, query, schema=LEGACY):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_FIELDS)
+    writer.writeheader()
+    cursor = _find(collection, query, schema).batch_size(EXPORT_BATCH_SIZE)
+    async for doc in cursor:
+        writer.writerow(_export_row(schema.decode(doc)))
+        if buffer.tell() >= 64 * 1024:
+            yield buffer.getvalue().encode("utf-8")
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue().encode("utf-8")
@@ -0,0 +1,258 @@
+"""Métriques au format texte Prometheus, sans dépendance externe.
+
+- ``MetricsMiddleware`` : latence par route (jusqu'à l'envoi des en-têtes, ce
+  qui reste pertinent pour les flux SSE), statuts et requêtes en cours ;
+- ``MongoCommandMetrics`` : durée des commandes Mongo par commande et par
+  collection, via ``pymongo.monitoring.CommandListener`` ;
+- ``MongoPoolMetrics`` : connexions ouvertes et empruntées par serveur, via
+  ``pymongo.monitoring.ConnectionPoolListener``.
+
+Chaque observation coûte une recherche par bissection et quelques
+incréments : assez léger pour rester actif en production.
+"""
+import threading
+import time
+from bisect import bisect_left
+
+from pymongo import monitoring
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_labels(labelnames, values, extra=()):
+    pairs = list(zip(labelnames, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+    return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+
+
+def _format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def header(self):
+        return [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self._values = {}
+
+    def inc(self, labels=(), amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        lines = self.header()
+        for labels, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(value)}")
+        return lines
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def dec(self, labels=(), amount=1):
+        self.inc(labels, -amount)
+
+    def set(self, value, labels=()):
+        with self._lock:
+            self._values[labels] = value
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+
+    def observe(self, value, labels=()):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            series[0][index] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = self.header()
+        for labels, (counts, total, count) in sorted(self._series.items()):
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+                cumulative += bucket_count
+                le = (("le", _format_value(bound)),)
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {count}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def counter(self, *args, **kwargs):
+        return self.register(Counter(*args, **kwargs))
+
+    def gauge(self, *args, **kwargs):
+        return self.register(Gauge(*args, **kwargs))
+
+    def histogram(self, *args, **kwargs):
+        return self.register(Histogram(*args, **kwargs))
+
+    def render(self):
+        lines = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """Middleware ASGI : latence jusqu'aux en-têtes, statuts et requêtes en cours par route."""
+
+    def __init__(self, app, registry):
+        self.app = app
+        self.latency = registry.histogram(
+            "http_request_duration_seconds", "Latence jusqu'à l'envoi des en-têtes", ("method", "route"))
+        self.responses = registry.counter(
+            "http_responses_total", "Réponses HTTP par statut", ("method", "route", "status"))
+        self.in_flight = registry.gauge(
+            "http_requests_in_flight", "Requêtes (et flux) en cours", ("method",))
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        method = scope["method"]
+        start = time.perf_counter()
+        status = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status[0] = message["status"]
+                route = scope.get("route")
+                path = route.path if route is not None else "unmatched"
+                self.latency.observe(time.perf_counter() - start, (method, path))
+            await send(message)
+
+        self.in_flight.inc((method,))
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            self.in_flight.dec((method,))
+            route = scope.get("route")
+            path = route.path if route is not None else "unmatched"
+            self.responses.inc((method, path, str(status[0])))
+
+
+class MongoCommandMetrics(monitoring.CommandListener):
+    """Durée et échecs des commandes Mongo par commande et par collection."""
+
+    def __init__(self, registry):
+        self.duration = registry.histogram(
+            "mongo_command_duration_seconds", "Durée des commandes Mongo", ("command", "collection"))
+        self.failures = registry.counter(
+            "mongo_command_failures_total", "Commandes Mongo en échec", ("command", "collection"))
+        self._collections = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        self._collections[(event.connection_id, event.request_id)] = (
+            collection if isinstance(collection, str) else ""
+        )
+
+    def _labels(self, event):
+        return event.command_name, self._collections.pop((event.connection_id, event.request_id), "")
+
+    def succeeded(self, event):
+        self.duration.observe(event.duration_micros / 1e6, self._labels(event))
+
+    def failed(self, event):
+        labels = self._labels(event)
+        self.duration.observe(event.duration_micros / 1e6, labels)
+        self.failures.inc(labels)
+
+
+class MongoPoolMetrics(monitoring.ConnectionPoolListener):
+    """Connexions ouvertes, empruntées et emprunts en échec par serveur Mongo."""
+
+    def __init__(self, registry):
+        self.open = registry.gauge("mongo_pool_connections", "Connexions ouvertes par serveur", ("address",))
+        self.checked_out = registry.gauge(
+            "mongo_pool_checked_out", "Connexions empruntées par serveur", ("address",))
+        self.checkout_failures = registry.counter(
+            "mongo_pool_checkout_failures_total", "Emprunts de connexion en échec", ("address",))
+        self.clears = registry.counter("mongo_pool_clears_total", "Pools vidés (serveur perdu)", ("address",))
+
+    @staticmethod
+    def _labels(event):
+        host, port = event.address
+        return (f"{host}:{port}",)
+
+    def stats(self):
+        """État des pools par serveur, pour les sondes /healthz et /readyz."""
+        pools = {}
+        for key, metric in (("open", self.open), ("checked_out", self.checked_out),
+                            ("checkout_failures", self.checkout_failures), ("clears", self.clears)):
+            with metric._lock:
+                values = dict(metric._values)
+            for (address,), value in values.items():
+                pools.setdefault(address, {"open": 0, "checked_out": 0, "checkout_failures": 0, "clears": 0})
+                pools[address][key] = value
+        return pools
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        self.clears.inc(self._labels(event))
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        self.open.inc(self._labels(event))
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        self.open.dec(self._labels(event))
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        self.checkout_failures.inc(self._labels(event))
+
+    def connection_checked_out(self, event):
+        self.checked_out.inc(self._labels(event))
+
+    def connection_checked_in(self, event):
+        self.checked_out.dec(self._labels(event))
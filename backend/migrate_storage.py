@@ -0,0 +1,167 @@
+"""Migration de ``clicks`` et ``logs`` vers le format compact, et rapport de taille.
+
+La migration copie chaque collection source vers une collection cible
+(``clicks_compact`` et ``logs_compact`` par défaut) en encodant les documents
+avec ``compact_schema`` ; les ``_id`` sont conservés et la source n'est pas
+modifiée (retour arrière : remettre l'ancienne configuration). Relancer la
+commande relit la source et ne copie que les documents absents de la cible
+(comparaison des ``_id`` lot par lot) : on l'exécute une première fois à chaud,
+on bascule le serveur, puis une seconde fois pour rattraper les documents
+écrits entre-temps. Les ObjectId venant de plusieurs workers ou machines ne
+sont pas croissants : reprendre après le plus grand ``_id`` copié en sauterait.
+
+Avec ``--timeseries``, les cibles sont créées en collections time-series
+(champ temps ``t``, métadonnée : l'offre pour les clics, l'action pour les
+logs ; MongoDB 5.0+), la rétention passant alors par ``expireAfterSeconds``.
+
+Depuis ``backend/`` :
+
+    python migrate_storage.py --report
+    python migrate_storage.py --migrate [--timeseries] [--batch-size 1000]
+
+Puis démarrer le serveur avec STORAGE_FORMAT=compact,
+CLICKS_COLLECTION=clicks_compact et LOGS_COLLECTION=logs_compact.
+"""
+import argparse
+import asyncio
+import os
+import sys
+
+from pymongo.errors import CollectionInvalid
+
+from compact_schema import StorageSettings
+from indexes import _ttl_seconds, ensure_indexes, index_specs
+
+# collection source -> (variables TTL et d'archivage, champ logique de métadonnée time-series)
+MIGRATED = {
+    "clicks": (("CLICKS_TTL_DAYS", "CLICKS_ARCHIVE_AFTER_DAYS"), "offer_id"),
+    "logs": (("LOGS_TTL_DAYS", "LOGS_ARCHIVE_AFTER_DAYS"), "action"),
+}
+
+
+async def collection_size(db, name):
+    """Nombre de documents et tailles (octets) d'une collection, None si elle n'existe pas."""
+    if name not in await db.list_collection_names(filter={"name": name}):
+        return None
+    stats = await db.command("collStats", name)
+    count = stats.get("count")
+    if count is None:  # time-series : pas de compteur dans collStats
+        count = await db[name].count_documents({})
+    return {
+        "count": count,
+        "size": stats.get("size", 0),
+        "storage_size": stats.get("storageSize", 0),
+        "index_size": stats.get("totalIndexSize", 0),
+    }
+
+
+async def storage_report(db, names):
+    return {name: await collection_size(db, name) for name in names}
+
+
+def print_report(report):
+    print(f"{'collection':<20} {'docs':>10} {'données':>12} {'disque':>12} {'index':>12} {'octets/doc':>10}")
+    for name, stats in report.items():
+        if stats is None:
+            print(f"{name:<20} {'absente':>10}")
+            continue
+        per_doc = stats["size"] / stats["count"] if stats["count"] else 0
+        print(f"{name:<20} {stats['count']:>10} {stats['size']:>12} {stats['storage_size']:>12} "
+              f"{stats['index_size']:>12} {per_doc:>10.1f}")
+
+
+async def _create_target(db, target, schema, ttl_variables, meta_field, timeseries):
+    options = {}
+    if timeseries:
+        options["timeseries"] = {
+            "timeField": schema.field("timestamp"),
+            "metaField": schema.field(meta_field),
+            "granularity": "seconds",
+        }
+        ttl = _ttl_seconds(*ttl_variables)
+        if ttl is not None:
+            options["expireAfterSeconds"] = ttl
+    try:
+        await db.create_collection(target, **options)
+    except CollectionInvalid:
+        pass  # Déjà créée par un passage précédent
+
+
+async def _copy_missing(target, schema, batch):
+    """Insère les documents du lot absents de ``target`` ; renvoie leur nombre."""
+    query = {"_id": {"$in": [doc["_id"] for doc in batch]}}
+    time_field = schema.field("timestamp")
+    times = [doc[time_field] for doc in batch if doc.get(time_field) is not None]
+    if len(times) == len(batch):
+        # Une cible time-series n'a pas d'index sur _id : la plage de temps restreint les buckets lus
+        query[time_field] = {"$gte": min(times), "$lte": max(times)}
+    present = {doc["_id"] for doc in await target.find(query, projection={"_id": 1}).to_list(length=None)}
+    missing = [doc for doc in batch if doc["_id"] not in present]
+    if missing:
+        await target.insert_many(missing, ordered=False)
+    return len(missing)
+
+
+async def copy_collection(source, target, schema, batch_size):
+    """Copie dans ``target`` (encodés par ``schema``) les documents de ``source`` qu'elle n'a pas encore."""
+    total = await source.count_documents({})
+    scanned = copied = 0
+    batch = []
+    async for doc in source.find({}).batch_size(batch_size):
+        # Un document déjà compact (migration interrompue) est relu puis réencodé à l'identique
+        batch.append(schema.encode(schema.decode(doc)))
+        if len(batch) >= batch_size:
+            copied += await _copy_missing(target, schema, batch)
+            scanned += len(batch)
+            batch = []
+            print(f"  {source.name} -> {target.name} : {scanned}/{total} lus, {copied} copiés", flush=True)
+    if batch:
+        copied += await _copy_missing(target, schema, batch)
+    return copied
+
+
+async def migrate(db, suffix, batch_size, timeseries):
+    compact = StorageSettings("compact", "clicks" + suffix, "logs" + suffix)
+    targets = {"clicks": compact.clicks_collection, "logs": compact.logs_collection}
+    schemas = {"clicks": compact.clicks_schema, "logs": compact.logs_schema}
+    for source, (ttl_variables, meta_field) in MIGRATED.items():
+        await _create_target(db, targets[source], schemas[source], ttl_variables, meta_field, timeseries)
+        copied = await copy_collection(db[source], db[targets[source]], schemas[source], batch_size)
+        print(f"{source} -> {targets[source]} : {copied} documents copiés")
+    await ensure_indexes(db, {name: specs for name, specs in index_specs(compact).items()
+                              if name in targets.values()})
+    return targets
+
+
+async def _main(args):
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    client = AsyncIOMotorClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017/"))
+    db = client[os.environ.get("BENCH_DB_NAME", "casino_calls_db")]
+    targets = {name: name + args.suffix for name in MIGRATED}
+    try:
+        if args.migrate:
+            before = await storage_report(db, list(MIGRATED))
+            await migrate(db, args.suffix, args.batch_size, args.timeseries)
+            print("\nAvant :")
+            print_report(before)
+            print("Après :")
+            print_report(await storage_report(db, list(targets.values())))
+            print("\nBasculer le serveur : STORAGE_FORMAT=compact "
+                  + " ".join(f"{name.upper()}_COLLECTION={target}" for name, target in targets.items()))
+        else:
+            print_report(await storage_report(db, list(MIGRATED) + list(targets.values())))
+        return 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Migration de clicks/logs vers le format compact")
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument("--migrate", action="store_true", help="copier vers les collections compactes")
+    action.add_argument("--report", action="store_true", help="tailles des collections sources et cibles")
+    parser.add_argument("--suffix", default="_compact", help="suffixe des collections cibles")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--timeseries", action="store_true", help="cibles en collections time-series")
+    sys.exit(asyncio.run(_main(parser.parse_args())))
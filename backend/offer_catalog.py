@@ -0,0 +1,168 @@
+"""Cache en mémoire du catalogue d'offres.
+
+Les offres sont lues une fois depuis Mongo puis gardées en mémoire avec leur
+sérialisation JSON et un ETag. Les routes d'écriture y reportent leur
+modification (``upsert`` / ``remove``) sans relire la collection ;
+GET /api/offers ne touche ni Mongo ni l'encodeur JSON tant que rien ne change.
+Un index inversé des tags (``TagIndex``) répond aux requêtes filtrées.
+
+Les clics sont comptés en mémoire aussitôt, mais le JSON et son ETag (et donc
+/api/bootstrap, qui les réutilise) ne sont régénérés pour eux qu'au plus une
+fois toutes les ``clicks_refresh_seconds`` : une rafale de clics ne coûte pas
+une sérialisation par requête ni n'annule les 304.
+"""
+import asyncio
+import hashlib
+import time
+
+import orjson
+
+from analytics import BATCH_MARKERS_FIELD
+from tag_index import TagIndex
+
+# Tris disponibles pour les requêtes filtrées : clé et ordre décroissant
+OFFER_SORTS = {
+    "clicks": lambda offer: offer.get("clicks", 0),
+    "recent": lambda offer: offer.get("created_at") or 0,
+}
+
+# Champs internes des documents d'offre, jamais renvoyés par l'API
+OFFER_PROJECTION = {BATCH_MARKERS_FIELD: 0}
+
+
+def _convert(doc):
+    if "_id" in doc:
+        if "id" not in doc:  # Seulement si pas d'id personnalisé
+            doc["id"] = str(doc["_id"])
+        del doc["_id"]
+    return doc
+
+
+def etag_matches(if_none_match, etag):
+    """Vrai si l'en-tête If-None-Match désigne l'ETag courant."""
+    if not if_none_match or not etag:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    return "*" in candidates or any(
+        candidate.removeprefix("W/") == etag for candidate in candidates
+    )
+
+
+class OfferCatalog:
+    def __init__(self, collection, clicks_refresh_seconds=5.0, clock=time.monotonic):
+        self.collection = collection
+        self.clicks_refresh_seconds = clicks_refresh_seconds
+        self.clock = clock
+        self._offers = None
+        self._ids = frozenset()
+        self._links = {}
+        self._tags = TagIndex()
+        self._body = None
+        self._etag = None
+        self._body_at = 0.0
+        self._clicks_pending = False  # clics comptés depuis la dernière sérialisation
+        self._version = 0
+        self._lock = asyncio.Lock()
+
+    async def offers(self):
+        """Liste des offres (documents déjà convertis, sans _id)."""
+        if self._offers is None:
+            async with self._lock:
+                while self._offers is None:
+                    version = self._version
+                    docs = await self.collection.find(projection=OFFER_PROJECTION).to_list(length=None)
+                    # Une invalidation pendant la lecture : le résultat est peut-être périmé
+                    if version == self._version:
+                        self._set_offers([_convert(doc) for doc in docs])
+        return self._offers
+
+    def _set_offers(self, offers):
+        self._offers = offers
+        self._ids = frozenset(offer["id"] for offer in offers)
+        self._links = {offer["id"]: offer.get("link") for offer in offers}
+        self._tags = TagIndex(offers)
+        self._body = None
+        self._etag = None
+
+    async def query(self, tags=(), match="all", sort=None):
+        """Offres filtrées par tags (``all`` : toutes, ``any`` : au moins une), triées si demandé."""
+        if sort is not None and sort not in OFFER_SORTS:
+            raise ValueError(f"Tri invalide : {sort} (clicks, recent)")
+        await self.offers()
+        offers = self._tags.match(tags, match)
+        if sort is not None:
+            offers.sort(key=OFFER_SORTS[sort], reverse=True)
+        return offers
+
+    async def has_offer(self, offer_id):
+        """Validation d'un id d'offre contre l'ensemble en mémoire."""
+        await self.offers()
+        return offer_id in self._ids
+
+    async def link_for(self, offer_id):
+        """Lien de l'offre depuis la table en mémoire (None si l'offre n'existe pas)."""
+        await self.offers()
+        return self._links.get(offer_id)
+
+    async def payload(self):
+        """Corps JSON sérialisé et son ETag, recalculés après un changement (clics : au plus toutes les N s)."""
+        offers = await self.offers()
+        now = self.clock()
+        if self._body is None or (self._clicks_pending and now - self._body_at >= self.clicks_refresh_seconds):
+            # orjson sérialise directement les datetime (même format ISO que l'encodeur de FastAPI)
+            body = orjson.dumps(offers)
+            self._body = body
+            self._etag = '"%s"' % hashlib.sha1(body).hexdigest()
+            self._body_at = now
+            self._clicks_pending = False
+        return self._body, self._etag
+
+    def invalidate(self):
+        """Relecture complète au prochain accès (écriture d'un autre worker, resynchronisation)."""
+        self._version += 1
+        self._offers = None
+        self._body = None
+        self._etag = None
+
+    def upsert(self, offer):
+        """Reporte la création ou la modification d'une offre (document sans _id).
+
+        Les clics d'une offre déjà connue sont ceux de la mémoire : ils comptent
+        aussi les clics encore en tampon, absents du document relu dans Mongo.
+        """
+        # Une lecture en cours pourrait manquer cette écriture : elle sera refaite
+        self._version += 1
+        if self._offers is None:
+            return
+        position = next((i for i, existing in enumerate(self._offers) if existing["id"] == offer["id"]), None)
+        if position is None:
+            self._offers.append(offer)
+            self._ids = self._ids | {offer["id"]}
+        else:
+            offer = {**offer, "clicks": self._offers[position].get("clicks", 0)}
+            self._offers[position] = offer
+        self._links[offer["id"]] = offer.get("link")
+        self._tags.add(offer)
+        self._body = None
+        self._etag = None
+
+    def remove(self, offer_id):
+        self._version += 1
+        if self._offers is None or offer_id not in self._ids:
+            return
+        self._offers = [offer for offer in self._offers if offer["id"] != offer_id]
+        self._ids = self._ids - {offer_id}
+        self._links.pop(offer_id, None)
+        self._tags.remove(offer_id)
+        self._body = None
+        self._etag = None
+
+    def apply_clicks(self, offer_id, count=1):
+        """Reporte un $inc de clics sans relire Mongo ; le JSON suivra au prochain rafraîchissement."""
+        if self._offers is None:
+            return
+        for offer in self._offers:
+            if offer.get("id") == offer_id:
+                offer["clicks"] = offer.get("clicks", 0) + count
+                self._clicks_pending = True
+                return
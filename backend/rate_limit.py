@@ -0,0 +1,126 @@
+"""Limitation de débit par IP et suppression des doublons, en mémoire bornée.
+
+``TokenBucketLimiter`` garde un seau de jetons par clé (l'IP du client) ;
+``DuplicateFilter`` retient la dernière occurrence d'une clé (par exemple
+pseudo + slot) sur une fenêtre glissante. Les deux stockent au plus
+``max_keys`` entrées et évincent la moins récemment utilisée.
+
+Derrière l'ingress, l'adresse de la connexion est celle du proxy : ``ClientAddress``
+lit alors ``X-Forwarded-For`` de droite à gauche, tant que les sauts sont des
+proxies de confiance (``TRUSTED_PROXIES``). Un client qui se connecte
+directement ne peut donc pas choisir son adresse en envoyant l'en-tête.
+"""
+import ipaddress
+import math
+import time
+from collections import OrderedDict
+
+from fastapi import HTTPException, Request
+
+
+class LRUDict(OrderedDict):
+    """Dictionnaire borné : au-delà de ``max_keys``, la clé la moins récemment utilisée est évincée."""
+
+    def __init__(self, max_keys):
+        super().__init__()
+        self.max_keys = max_keys
+
+    def touch(self, key, value):
+        self[key] = value
+        self.move_to_end(key)
+        while len(self) > self.max_keys:
+            self.popitem(last=False)
+
+
+class TokenBucketLimiter:
+    def __init__(self, rate_per_second, burst, max_keys=50000, clock=time.monotonic):
+        self.rate = rate_per_second
+        self.burst = burst
+        self.clock = clock
+        self._buckets = LRUDict(max_keys)
+
+    def acquire(self, key):
+        """(autorisé, secondes avant le prochain jeton)."""
+        now = self.clock()
+        tokens, updated = self._buckets.get(key, (self.burst, now))
+        tokens = min(self.burst, tokens + (now - updated) * self.rate)
+        if tokens >= 1:
+            self._buckets.touch(key, (tokens - 1, now))
+            return True, 0.0
+        self._buckets.touch(key, (tokens, now))
+        return False, (1 - tokens) / self.rate
+
+
+class DuplicateFilter:
+    def __init__(self, window_seconds, max_keys=50000, clock=time.monotonic):
+        self.window = window_seconds
+        self.clock = clock
+        self._seen = LRUDict(max_keys)
+
+    def check(self, key):
+        """Secondes restantes si ``key`` a déjà été vue dans la fenêtre, sinon 0 (et la clé est retenue)."""
+        now = self.clock()
+        last = self._seen.get(key)
+        if last is not None and now - last < self.window:
+            return self.window - (now - last)
+        self._seen.touch(key, now)
+        return 0.0
+
+
+def parse_networks(value):
+    """Réseaux depuis une liste séparée par des virgules (adresses ou notation CIDR)."""
+    return tuple(ipaddress.ip_network(part.strip(), strict=False) for part in value.split(",") if part.strip())
+
+
+class ClientAddress:
+    def __init__(self, trusted_proxies=()):
+        self.trusted_proxies = tuple(trusted_proxies)
+
+    def _trusted(self, host):
+        try:
+            address = ipaddress.ip_address(host)
+        except ValueError:
+            return False
+        return any(address in network for network in self.trusted_proxies)
+
+    def __call__(self, request):
+        """IP du client : le premier saut de ``X-Forwarded-For`` (depuis la droite) hors des proxies de confiance."""
+        host = request.client.host if request.client else "unknown"
+        if not self._trusted(host):
+            return host
+        hops = [hop.strip() for value in request.headers.getlist("x-forwarded-for") for hop in value.split(",")]
+        for hop in reversed(hops):
+            if not hop:
+                continue
+            host = hop
+            if not self._trusted(hop):
+                break
+        return host
+
+
+def _too_many(detail, retry_after):
+    return HTTPException(
+        status_code=429,
+        detail=detail,
+        headers={"Retry-After": str(max(1, math.ceil(retry_after)))},
+    )
+
+
+def rate_limit(limiter, client_address):
+    """Dépendance FastAPI appliquant ``limiter`` à l'IP du client (None : pas de limite)."""
+    async def dependency(request: Request):
+        if limiter is None:
+            return
+        allowed, retry_after = limiter.acquire(client_address(request))
+        if not allowed:
+            raise _too_many("Trop de requêtes, réessayez plus tard", retry_after)
+    return dependency
+
+
+def reject_duplicate(duplicates, key):
+    """Lève une 429 si ``key`` a déjà été soumise dans la fenêtre du filtre."""
+    if duplicates is None:
+        return
+    remaining = duplicates.check(key)
+    if remaining:
+        raise _too_many("Ce call a déjà été envoyé récemment", remaining)
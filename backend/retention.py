@@ -0,0 +1,305 @@
+"""Rétention des collections ``logs`` et ``clicks`` : archivage puis suppression.
+
+Pour chaque politique, les documents plus vieux que ``retain_days`` sont lus
+par lots (du plus ancien au plus récent), écrits sur disque local dans des
+archives partitionnées par date, puis supprimés par ``_id``. La suppression
+n'a lieu qu'une fois le lot écrit et synchronisé (fichier et répertoire, quel que
+soit le format) : après une interruption, un
+lot peut être archivé deux fois, jamais perdu.
+
+Une collection time-series (``migrate_storage.py --timeseries``) n'accepte pas
+de suppression filtrée sur ``_id`` : le lot y est supprimé par plage de temps
+(jusqu'à son dernier timestamp, dont tous les documents sont archivés), ce que
+MongoDB n'autorise qu'à partir de 7.0. Avant, la politique est refusée
+(``RetentionUnsupported``, rapportée dans le statut) : la collection expire
+alors par son ``expireAfterSeconds``, sans archive.
+
+Arborescence : ``<archive_dir>/<collection>/<AAAA-MM-JJ>/<run>.ndjson.gz``
+(un membre gzip ajouté par lot) ou ``<run>-<lot>.parquet`` (pandas + pyarrow,
+dépendance optionnelle).
+
+Configuration par l'environnement (``retention_from_env``) :
+``LOGS_ARCHIVE_AFTER_DAYS`` / ``CLICKS_ARCHIVE_AFTER_DAYS`` (0 : désactivé),
+``ARCHIVE_FORMAT`` (ndjson, parquet), ``ARCHIVE_DIR``, ``ARCHIVE_BATCH_SIZE``,
+``ARCHIVE_INTERVAL_MINUTES``. Une collection archivée n'a plus d'index TTL
+(voir ``indexes.py``) : sinon Mongo supprimerait les documents sans archive.
+
+Le serveur lance la tâche en fond ; un bail dans ``meta`` garantit qu'un seul
+worker archive à la fois. En ligne de commande (depuis ``backend/``) :
+
+    python retention.py
+"""
+import asyncio
+import gzip
+import logging
+import os
+import sys
+import time
+import uuid
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+import orjson
+from pymongo.errors import DuplicateKeyError
+
+from compact_schema import storage_settings
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_FORMATS = ("ndjson", "parquet")
+LOCK_ID = "retention_lock"
+# Première version acceptant des suppressions quelconques sur une collection time-series
+TIMESERIES_DELETE_MIN_VERSION = 7
+
+
+class RetentionUnsupported(RuntimeError):
+    """Politique inapplicable à sa collection (time-series sur un MongoDB trop ancien)."""
+
+
+class RetentionPolicy:
+    def __init__(self, collection, retain_days, schema, archive_format="ndjson"):
+        if archive_format not in ARCHIVE_FORMATS:
+            raise ValueError(f"Format d'archive inconnu : {archive_format} (ndjson, parquet)")
+        self.collection = collection
+        self.retain_days = retain_days
+        self.schema = schema
+        self.archive_format = archive_format
+        self.timeseries = None  # déterminé au premier passage
+
+
+def _archive_days(variable):
+    days = float(os.environ.get(variable, "0") or 0)
+    return days if days > 0 else None
+
+
+def _fsync_directory(path):
+    # L'entrée d'un fichier créé n'est durable qu'une fois son répertoire synchronisé
+    fd = os.open(os.path.dirname(path), os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _write_ndjson(path, docs):
+    with open(path, "ab") as raw:
+        # Un membre gzip par lot : les lecteurs gzip enchaînent les membres
+        with gzip.GzipFile(fileobj=raw, mode="ab") as archive:
+            for doc in docs:
+                archive.write(orjson.dumps(doc, default=str) + b"\n")
+        raw.flush()
+        os.fsync(raw.fileno())
+    _fsync_directory(path)
+
+
+def _write_parquet(path, docs):
+    import pandas
+
+    frame = pandas.DataFrame.from_records([{**doc, "_id": str(doc["_id"])} for doc in docs])
+    with open(path, "wb") as raw:
+        frame.to_parquet(raw, index=False)
+        raw.flush()
+        os.fsync(raw.fileno())
+    _fsync_directory(path)
+
+
+async def _is_timeseries(collection):
+    names = await collection.database.list_collection_names(filter={"name": collection.name, "type": "timeseries"})
+    return collection.name in names
+
+
+class Retention:
+    def __init__(self, policies, archive_dir, meta_collection=None, batch_size=1000,
+                 interval_seconds=3600.0):
+        if any(policy.archive_format == "parquet" for policy in policies):
+            try:
+                import pandas  # noqa: F401
+                import pyarrow  # noqa: F401
+            except ImportError as error:
+                raise RuntimeError("Archives Parquet : installer pandas et pyarrow") from error
+        self.policies = policies
+        self.archive_dir = archive_dir
+        self.meta_collection = meta_collection
+        self.batch_size = batch_size
+        self.interval_seconds = interval_seconds
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._task = None
+        self._progress = {}
+        self._last_run = None
+
+    def status(self):
+        return {
+            "policies": {policy.collection.name: policy.retain_days for policy in self.policies},
+            "archive_dir": self.archive_dir,
+            "progress": self._progress,
+            "last_run": self._last_run,
+        }
+
+    def start(self):
+        if self._task is None and self.policies:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _acquire_lease(self):
+        """Bail d'un intervalle dans ``meta`` : un seul worker archive à la fois."""
+        if self.meta_collection is None:
+            return True
+        now = datetime.now()
+        try:
+            await self.meta_collection.find_one_and_update(
+                {"_id": LOCK_ID, "$or": [{"expires_at": {"$lt": now}}, {"owner": self.owner}]},
+                {"$set": {"owner": self.owner, "expires_at": now + timedelta(seconds=self.interval_seconds)}},
+                upsert=True,
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def _run(self):
+        while True:
+            try:
+                if await self._acquire_lease():
+                    await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception:
+                logger.exception("Rétention : échec du passage")
+            await asyncio.sleep(self.interval_seconds)
+
+    async def run_once(self, now=None):
+        """Archive et supprime les documents expirés de chaque politique ; renvoie le rapport."""
+        now = now or datetime.now()
+        run_id = f"{now:%Y%m%dT%H%M%S}-{self.owner}"
+        report = {}
+        for policy in self.policies:
+            try:
+                await self._check(policy)
+            except RetentionUnsupported as error:
+                logger.error("Rétention %s : %s", policy.collection.name, error)
+                report[policy.collection.name] = {"error": str(error)}
+                continue
+            report[policy.collection.name] = await self._apply(policy, now - timedelta(days=policy.retain_days), run_id)
+        self._last_run = {"at": now, "report": report}
+        return report
+
+    async def _check(self, policy):
+        """Détecte une collection time-series ; lève ``RetentionUnsupported`` si MongoDB ne peut pas la purger."""
+        if policy.timeseries is None:
+            policy.timeseries = await _is_timeseries(policy.collection)
+        if policy.timeseries:
+            info = await policy.collection.database.command("buildInfo")
+            version = info.get("version", "?")
+            if info.get("versionArray", [0])[0] < TIMESERIES_DELETE_MIN_VERSION:
+                raise RetentionUnsupported(
+                    f"collection time-series, MongoDB {version} n'y supprime que par metaField (7.0 requis) ; "
+                    "désactiver son archivage pour qu'elle expire par expireAfterSeconds"
+                )
+
+    async def _apply(self, policy, cutoff, run_id):
+        collection, schema = policy.collection, policy.schema
+        query = schema.filter({"timestamp": {"$lt": cutoff}})
+        stats = {"cutoff": cutoff, "archived": 0, "deleted": 0, "files": set(), "docs_per_second": 0.0}
+        self._progress[collection.name] = stats
+        start = time.perf_counter()
+        batch_number = 0
+        while True:
+            docs = await collection.find(query).sort(schema.sort([("timestamp", 1)])).limit(self.batch_size).to_list(length=self.batch_size)
+            if not docs:
+                break
+            if policy.timeseries:
+                # Suppression par plage : le lot doit contenir tous les documents de son dernier timestamp
+                time_field = schema.field("timestamp")
+                upper = docs[-1][time_field]
+                if len(docs) == self.batch_size:
+                    docs = [doc for doc in docs if doc[time_field] < upper]
+                    docs += await collection.find({time_field: upper}).to_list(length=None)
+                delete_filter = {time_field: {"$lte": upper}}
+            else:
+                delete_filter = {"_id": {"$in": [doc["_id"] for doc in docs]}}
+            partitions = defaultdict(list)
+            for doc in docs:
+                decoded = schema.decode(doc)
+                partitions[decoded["timestamp"].strftime("%Y-%m-%d")].append(decoded)
+            for day, day_docs in partitions.items():
+                path = self._archive_path(collection.name, day, run_id, batch_number, policy.archive_format)
+                writer = _write_parquet if policy.archive_format == "parquet" else _write_ndjson
+                await asyncio.to_thread(writer, path, day_docs)
+                stats["files"].add(path)
+            result = await collection.delete_many(delete_filter)
+            batch_number += 1
+            stats["archived"] += len(docs)
+            stats["deleted"] += result.deleted_count
+            elapsed = time.perf_counter() - start
+            stats["docs_per_second"] = round(stats["archived"] / elapsed, 1) if elapsed else 0.0
+            logger.info("Rétention %s : %d archivés, %d supprimés (%.1f docs/s)",
+                        collection.name, stats["archived"], stats["deleted"], stats["docs_per_second"])
+        stats["files"] = sorted(stats["files"])
+        stats["elapsed_seconds"] = round(time.perf_counter() - start, 3)
+        return stats
+
+    def _archive_path(self, collection_name, day, run_id, batch_number, archive_format):
+        directory = os.path.join(self.archive_dir, collection_name, day)
+        os.makedirs(directory, exist_ok=True)
+        if archive_format == "parquet":
+            return os.path.join(directory, f"{run_id}-{batch_number:05d}.parquet")
+        return os.path.join(directory, f"{run_id}.ndjson.gz")
+
+
+def retention_from_env(db, meta_collection=None, storage=None):
+    """Tâche de rétention configurée par l'environnement (sans politique si rien n'est activé)."""
+    storage = storage or storage_settings()
+    archive_format = os.environ.get("ARCHIVE_FORMAT", "ndjson")
+    policies = []
+    for variable, name, schema in (
+        ("LOGS_ARCHIVE_AFTER_DAYS", storage.logs_collection, storage.logs_schema),
+        ("CLICKS_ARCHIVE_AFTER_DAYS", storage.clicks_collection, storage.clicks_schema),
+    ):
+        days = _archive_days(variable)
+        if days is not None:
+            policies.append(RetentionPolicy(db[name], days, schema, archive_format))
+    return Retention(
+        policies,
+        os.environ.get("ARCHIVE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "archives")),
+        meta_collection=meta_collection,
+        batch_size=int(os.environ.get("ARCHIVE_BATCH_SIZE", "1000")),
+        interval_seconds=float(os.environ.get("ARCHIVE_INTERVAL_MINUTES", "60")) * 60,
+    )
+
+
+async def _main():
+    from motor.motor_asyncio import AsyncIOMotorClient
+
+    logging.basicConfig(level=logging.INFO, format="%(message)s")
+    client = AsyncIOMotorClient(os.environ.get("MONGO_URL", "mongodb://localhost:27017/"))
+    db = client[os.environ.get("BENCH_DB_NAME", "casino_calls_db")]
+    try:
+        retention = retention_from_env(db, db.meta)
+        if not retention.policies:
+            print("Aucune politique : définir LOGS_ARCHIVE_AFTER_DAYS et/ou CLICKS_ARCHIVE_AFTER_DAYS")
+            return 1
+        if not await retention._acquire_lease():
+            print("Un autre processus archive déjà (bail actif dans meta)")
+            return 1
+        report = await retention.run_once()
+        for name, stats in report.items():
+            if "error" in stats:
+                print(f"{name:<16} refusée : {stats['error']}")
+                continue
+            print(f"{name:<16} archivés={stats['archived']} supprimés={stats['deleted']} "
+                  f"fichiers={len(stats['files'])} débit={stats['docs_per_second']} docs/s "
+                  f"durée={stats['elapsed_seconds']}s")
+        return 1 if any("error" in stats for stats in report.values()) else 0
+    finally:
+        client.close()
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(_main()))
@@ -1,16 +1,56 @@
-from fastapi import FastAPI, HTTPException, Depends, Request, Cookie
+from fastapi import FastAPI, HTTPException, Depends, Request, Cookie, Query
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from pydantic import BaseModel
-from typing import List, Optional
+from fastapi.responses import JSONResponse, ORJSONResponse, PlainTextResponse, RedirectResponse, Response, StreamingResponse
+from pydantic import BaseModel, Field
+from typing import List, Optional, Union
 import uuid
 import os
-from datetime import datetime
-from pymongo import MongoClient
+import hashlib
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from motor.motor_asyncio import AsyncIOMotorClient
 from bson import ObjectId
+from pymongo.errors import DuplicateKeyError
 import json
 
-app = FastAPI()
+from analytics import GRANULARITIES, naive_local, range_totals, timeseries
+from bootstrap_payload import BootstrapPayload
+from calls_order import ensure_ranks
+from calls_queue import CallsQueue, JournalFull
+from calls_stream import CallsHub
+from click_pipeline import ClickPipeline
+from event_bus import RESYNC_TOPIC, EventBus
+from health import Readiness, ReadinessGate
+from compact_schema import storage_settings
+from leaderboard import WINDOWS, Leaderboard
+from indexes import ensure_indexes, explain_hot_queries, index_specs
+from log_writer import LogWriter
+from metrics import MetricsMiddleware, MongoCommandMetrics, MongoPoolMetrics, Registry
+from logs_query import build_filter, export_csv, export_ndjson, fetch_page
+from offer_catalog import OFFER_PROJECTION, OfferCatalog, etag_matches
+from rate_limit import ClientAddress, DuplicateFilter, TokenBucketLimiter, parse_networks, rate_limit, reject_duplicate
+from retention import retention_from_env
+from slot_index import SlotIndex, slot_key
+from visitor_sketches import MAX_WINDOW_DAYS, days_window, unique_visitors
+
+@asynccontextmanager
+async def lifespan(app):
+    # Démarrage et arrêt définis plus bas (après les collections et les tampons d'écriture)
+    start_background()
+    try:
+        yield
+    finally:
+        await stop_background()
+
+app = FastAPI(lifespan=lifespan)
+
+# Métriques Prometheus (latence par route, commandes Mongo, tampons) exposées sur /metrics
+metrics_registry = Registry()
+
+# Préchauffage en fond : /healthz répond dès le lancement, l'API et /readyz une fois les caches chargés
+READYZ_PING_TIMEOUT_MS = int(os.environ.get('READYZ_PING_TIMEOUT_MS', '1000'))
+readiness = Readiness(ping_timeout_seconds=READYZ_PING_TIMEOUT_MS / 1000)
+app.add_middleware(ReadinessGate, readiness=readiness)
 
 # Configuration CORS
 app.add_middleware(
@@ -19,18 +59,150 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Next-Cursor"],
 )
+app.add_middleware(MetricsMiddleware, registry=metrics_registry)
 
 # Configuration MongoDB
 MONGO_URL = os.environ.get('MONGO_URL', 'mongodb://localhost:27017/')
-client = MongoClient(MONGO_URL)
-db = client.casino_calls_db
+MONGO_MAX_POOL_SIZE = int(os.environ.get('MONGO_MAX_POOL_SIZE', '100'))
+MONGO_MIN_POOL_SIZE = int(os.environ.get('MONGO_MIN_POOL_SIZE', '0'))
+MONGO_MAX_IDLE_TIME_MS = int(os.environ.get('MONGO_MAX_IDLE_TIME_MS', '60000'))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.environ.get('MONGO_SERVER_SELECTION_TIMEOUT_MS', '5000'))
+
+# Client asynchrone (motor) : aucune requête ne bloque la boucle d'événements. Aucune
+# connexion n'est ouverte à l'import : le pool se remplit au premier ping du préchauffage
+mongo_pool_metrics = MongoPoolMetrics(metrics_registry)
+client = AsyncIOMotorClient(
+    MONGO_URL,
+    connect=False,
+    maxPoolSize=MONGO_MAX_POOL_SIZE,
+    minPoolSize=MONGO_MIN_POOL_SIZE,
+    maxIdleTimeMS=MONGO_MAX_IDLE_TIME_MS,
+    serverSelectionTimeoutMS=MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    event_listeners=[MongoCommandMetrics(metrics_registry), mongo_pool_metrics],
+)
+# Base de production fixe ; BENCH_DB_NAME ne sert qu'à isoler la suite de charge (benchmarks/suite.py)
+db = client[os.environ.get('BENCH_DB_NAME', 'casino_calls_db')]
 
 # Collections
 offers_collection = db.offers
 calls_collection = db.calls
-clicks_collection = db.clicks
-logs_collection = db.logs
+# Format de stockage des clics et logs (legacy ou compact, voir migrate_storage.py)
+storage = storage_settings()
+clicks_collection = db[storage.clicks_collection]
+click_rollups_collection = db.click_rollups
+visitor_sketches_collection = db.visitor_sketches
+logs_collection = db[storage.logs_collection]
+meta_collection = db.meta
+
+# Plusieurs workers : les états en mémoire sont synchronisés par le bus d'événements
+WEB_CONCURRENCY = int(os.environ.get('WEB_CONCURRENCY', '1'))
+EVENT_BUS = os.environ.get('EVENT_BUS', 'auto')
+event_bus = EventBus(db.bus_events) if EVENT_BUS == 'on' or (EVENT_BUS == 'auto' and WEB_CONCURRENCY > 1) else None
+
+# File des calls en mémoire, persistée en différé par un journal (bulk_write par lots)
+CALLS_JOURNAL_LINGER_MS = int(os.environ.get('CALLS_JOURNAL_LINGER_MS', '50'))
+calls_queue = CallsQueue(
+    calls_collection,
+    on_resync=lambda records: _publish_resynced_calls(records),
+    linger_seconds=CALLS_JOURNAL_LINGER_MS / 1000,
+)
+
+# Diffusion SSE de la file des calls (un seul hub par processus)
+SSE_HEARTBEAT_SECONDS = float(os.environ.get('SSE_HEARTBEAT_SECONDS', '15'))
+SSE_HISTORY_SIZE = int(os.environ.get('SSE_HISTORY_SIZE', '256'))
+SSE_SUBSCRIBER_QUEUE_SIZE = int(os.environ.get('SSE_SUBSCRIBER_QUEUE_SIZE', '64'))
+calls_hub = CallsHub(
+    calls_queue,
+    history_size=SSE_HISTORY_SIZE,
+    subscriber_queue_size=SSE_SUBSCRIBER_QUEUE_SIZE,
+    heartbeat_interval=SSE_HEARTBEAT_SECONDS,
+)
+
+# Cache du catalogue d'offres (invalidé par les routes d'écriture ; compteurs de clics
+# resérialisés au plus toutes les OFFER_CLICKS_REFRESH_SECONDS)
+OFFER_CLICKS_REFRESH_SECONDS = float(os.environ.get('OFFER_CLICKS_REFRESH_SECONDS', '5'))
+offer_catalog = OfferCatalog(offers_collection, clicks_refresh_seconds=OFFER_CLICKS_REFRESH_SECONDS)
+
+# Page publique : offres + calls pré-rendus et pré-compressés
+bootstrap_payload = BootstrapPayload(offer_catalog, calls_hub)
+
+# Ingestion des clics par lots (insert_many + bulk_write de $inc agrégés)
+CLICK_BATCH_MAX_SIZE = int(os.environ.get('CLICK_BATCH_MAX_SIZE', '500'))
+CLICK_BATCH_LINGER_MS = int(os.environ.get('CLICK_BATCH_LINGER_MS', '250'))
+CLICK_QUEUE_MAX_SIZE = int(os.environ.get('CLICK_QUEUE_MAX_SIZE', '10000'))
+
+def _share_click_counts(per_offer):
+    # Les autres workers reportent ces clics dans leur propre catalogue
+    if event_bus:
+        event_bus.publish("offer_clicks", {"counts": dict(per_offer)})
+
+click_pipeline = ClickPipeline(
+    clicks_collection,
+    offers_collection,
+    click_rollups_collection,
+    visitor_sketches_collection,
+    on_flushed=_share_click_counts,
+    on_dropped=lambda batch: offer_catalog.invalidate(),
+    clicks_schema=storage.clicks_schema,
+    max_batch_size=CLICK_BATCH_MAX_SIZE,
+    linger_seconds=CLICK_BATCH_LINGER_MS / 1000,
+    queue_size=CLICK_QUEUE_MAX_SIZE,
+)
+
+# Logs d'audit écrits par lots en tâche de fond (politique "drop" ou "block" si plein)
+LOG_BATCH_MAX_SIZE = int(os.environ.get('LOG_BATCH_MAX_SIZE', '200'))
+LOG_BATCH_LINGER_MS = int(os.environ.get('LOG_BATCH_LINGER_MS', '500'))
+LOG_QUEUE_MAX_SIZE = int(os.environ.get('LOG_QUEUE_MAX_SIZE', '10000'))
+LOG_WRITER_POLICY = os.environ.get('LOG_WRITER_POLICY', 'drop')
+log_writer = LogWriter(
+    logs_collection,
+    schema=storage.logs_schema,
+    max_batch_size=LOG_BATCH_MAX_SIZE,
+    linger_seconds=LOG_BATCH_LINGER_MS / 1000,
+    queue_size=LOG_QUEUE_MAX_SIZE,
+    overflow_policy=LOG_WRITER_POLICY,
+)
+
+# Archivage puis suppression des logs et clics expirés (LOGS_ARCHIVE_AFTER_DAYS, CLICKS_ARCHIVE_AFTER_DAYS)
+retention = retention_from_env(db, meta_collection, storage)
+
+# Index de préfixes des noms de slots (autocomplétion, graphie canonique)
+SLOT_INDEX_MAX_SLOTS = int(os.environ.get('SLOT_INDEX_MAX_SLOTS', '200000'))
+SLOT_SUGGEST_MAX = 50
+# Amorçage depuis les logs des N derniers jours (0 : tout l'historique), après la mise en service
+SLOT_INDEX_SEED_DAYS = float(os.environ.get('SLOT_INDEX_SEED_DAYS', '90'))
+slot_index = SlotIndex(max_slots=SLOT_INDEX_MAX_SLOTS, max_suggestions=SLOT_SUGGEST_MAX)
+
+# Classements top K des slots et pseudos (Space-Saving, mémoire bornée, sans lecture des logs)
+LEADERBOARD_CAPACITY = int(os.environ.get('LEADERBOARD_CAPACITY', '100'))
+LEADERBOARD_WINDOW_MINUTES = int(os.environ.get('LEADERBOARD_WINDOW_MINUTES', '60'))
+leaderboard = Leaderboard(capacity=LEADERBOARD_CAPACITY, window_minutes=LEADERBOARD_WINDOW_MINUTES)
+
+# IP du client derrière l'ingress : X-Forwarded-For n'est lu que si la connexion vient d'un proxy de confiance
+TRUSTED_PROXIES = os.environ.get('TRUSTED_PROXIES', '127.0.0.1,::1,10.0.0.0/8,172.16.0.0/12,192.168.0.0/16,fc00::/7')
+client_ip = ClientAddress(parse_networks(TRUSTED_PROXIES))
+
+# Limitation de débit par IP sur les routes publiques d'écriture (0 : désactivée)
+RATE_LIMIT_MAX_KEYS = int(os.environ.get('RATE_LIMIT_MAX_KEYS', '50000'))
+CALLS_RATE_PER_MINUTE = float(os.environ.get('CALLS_RATE_PER_MINUTE', '6'))
+CALLS_BURST = int(os.environ.get('CALLS_BURST', '3'))
+CLICKS_RATE_PER_MINUTE = float(os.environ.get('CLICKS_RATE_PER_MINUTE', '60'))
+CLICKS_BURST = int(os.environ.get('CLICKS_BURST', '20'))
+CALL_DUPLICATE_WINDOW_SECONDS = float(os.environ.get('CALL_DUPLICATE_WINDOW_SECONDS', '60'))
+
+def _limiter(per_minute, burst):
+    if per_minute <= 0:
+        return None
+    return TokenBucketLimiter(per_minute / 60, burst, max_keys=RATE_LIMIT_MAX_KEYS)
+
+calls_limiter = _limiter(CALLS_RATE_PER_MINUTE, CALLS_BURST)
+clicks_limiter = _limiter(CLICKS_RATE_PER_MINUTE, CLICKS_BURST)
+call_duplicates = (
+    DuplicateFilter(CALL_DUPLICATE_WINDOW_SECONDS, max_keys=RATE_LIMIT_MAX_KEYS)
+    if CALL_DUPLICATE_WINDOW_SECONDS > 0 else None
+)
 
 # Modèles Pydantic
 class OfferBase(BaseModel):
@@ -48,14 +220,33 @@ class Offer(OfferBase):
     created_at: datetime
     updated_at: datetime
 
+# Longueurs maximales des champs saisis par le public
+SLOT_MAX_LENGTH = 100
+USERNAME_MAX_LENGTH = 50
+
 class CallBase(BaseModel):
-    slot: str
-    username: str
+    slot: str = Field(max_length=SLOT_MAX_LENGTH)
+    username: str = Field(max_length=USERNAME_MAX_LENGTH)
 
 class Call(CallBase):
     id: str
     created_at: datetime
 
+class MoveCallRequest(BaseModel):
+    after_id: Optional[str] = None  # None : placer en tête de file
+
+class ReorderItem(BaseModel):
+    id: Optional[str] = None  # absent : le call est (re)créé
+    slot: str = Field(max_length=SLOT_MAX_LENGTH)
+    user: str = Field(max_length=USERNAME_MAX_LENGTH)
+
+class ReorderMove(BaseModel):
+    id: str
+    after_id: Optional[str] = None
+
+class ReorderDiff(BaseModel):
+    moves: List[ReorderMove]
+
 class LoginRequest(BaseModel):
     password: str
 
@@ -74,113 +265,256 @@ def convert_objectid_to_str(doc):
         del doc["_id"]
     return doc
 
+def invalidate_offers():
+    offer_catalog.invalidate()
+    publish_offers_changed()
+
+def publish_offers_changed():
+    # Les autres workers rechargent leur catalogue depuis Mongo
+    if event_bus:
+        event_bus.publish("offers", {})
+
+def publish_calls_event(event_type, data, ranks=None):
+    calls_hub.publish(event_type, data)
+    if event_bus:
+        # Les ranks permettent aux autres workers de placer les calls dans leur propre file
+        event_bus.publish("calls", {"type": event_type, "data": data, "ranks": ranks or {}})
+
+def _publish_resynced_calls(records):
+    # Opération refusée par Mongo : spectateurs et autres workers reprennent la file relue
+    publish_calls_event("reorder", {"calls": [record.to_event() for record in records]},
+                        {record.id: record.rank for record in records})
+
+def _apply_remote_calls(payload):
+    applied = calls_queue.apply_remote(payload["type"], payload["data"], payload.get("ranks") or {})
+    if payload["type"] == "add":
+        call = payload["data"]["call"]
+        slot_index.add(call["slot"])
+        leaderboard.record(call["slot"], call["user"])
+    elif payload["type"] == "reset":
+        leaderboard.reset_session()
+    # Call publié pendant le chargement de la file et déjà lu dans Mongo : les spectateurs l'ont
+    if applied:
+        calls_hub.publish(payload["type"], payload["data"])
+
+def _apply_remote_clicks(payload):
+    for offer_id, count in payload["counts"].items():
+        offer_catalog.apply_clicks(offer_id, count)
+
+async def _resync_from_db(payload):
+    offer_catalog.invalidate()
+    await calls_hub.reload()
+
+if event_bus:
+    event_bus.subscribe("offers", lambda payload: offer_catalog.invalidate())
+    event_bus.subscribe("offer_clicks", _apply_remote_clicks)
+    event_bus.subscribe("calls", _apply_remote_calls)
+    event_bus.subscribe(RESYNC_TOPIC, _resync_from_db)
+
 # Initialisation des données par défaut
+def default_offer_id(title):
+    # Id déterministe : deux workers (ou deux essais) upsertent le même document
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"default-offer:{title}"))
+
 async def init_default_offers():
-    if offers_collection.count_documents({}) == 0:
-        default_offers = [
-            {
-                "id": str(uuid.uuid4()),
-                "title": "Betify",
-                "bonus": "100% offert + 30 Free Spins (en Raw Money)",
-                "description": "Jusqu'à 20% de cashback tout les lundi !",
-                "color": "linear-gradient(to right, #00c851, #007e33)",
-                "logo": "https://images.pexels.com/photos/6990180/pexels-photo-6990180.jpeg?auto=compress&cs=tinysrgb&w=100&h=100&dpr=1",
-                "link": "https://bit.ly/BetifySkrymi",
-                "tags": ["Crypto", "CB", "VIP Rank"],
-                "clicks": 0,
-                "created_at": datetime.now(),
-                "updated_at": datetime.now()
-            },
-            {
-                "id": str(uuid.uuid4()),
-                "title": "Winningz",
-                "bonus": "CODE : WZMEGA - 200% de bonus jusqu'à 20 000€",
-                "description": "200 Free Spins offerts (50 par jour pendant 4 jours) + Jusqu'à 20% de cashback",
-                "color": "linear-gradient(to right, #3a86ff, #e63946)",
-                "logo": "https://images.pexels.com/photos/6990348/pexels-photo-6990348.jpeg?auto=compress&cs=tinysrgb&w=100&h=100&dpr=1",
-                "link": "https://bit.ly/SkrymiWinningz",
-                "tags": ["Crypto", "CB", "Retrait en 1h", "VIP Rank"],
-                "clicks": 0,
-                "created_at": datetime.now(),
-                "updated_at": datetime.now()
-            },
-            {
-                "id": str(uuid.uuid4()),
-                "title": "Samba Slots",
-                "bonus": "200% de BONUS jusqu'à 5'000€",
-                "description": "10% de CASHBACK INSTANTANÉ dès la création de votre compte + 50 Freespins",
-                "color": "linear-gradient(to right, #fcd34d, #fbbf24)",
-                "logo": "https://images.unsplash.com/photo-1550496635-97c10f749275?w=100&h=100&fit=crop",
-                "link": "https://bit.ly/SkrymiSamba",
-                "tags": ["Crypto", "CB", "Retrait en 1h"],
-                "clicks": 0,
-                "created_at": datetime.now(),
-                "updated_at": datetime.now()
-            },
-            {
-                "id": str(uuid.uuid4()),
-                "title": "BetBlast",
-                "bonus": "200% jusqu'à 7500€",
-                "description": "50 Free Spins sur Wanted Dead or a Wild",
-                "color": "linear-gradient(to right, #007e33, #808080)",
-                "logo": "https://images.unsplash.com/photo-1605317068450-d6878f5c8dbb?w=100&h=100&fit=crop",
-                "link": "https://bit.ly/SkrymiBetblast",
-                "tags": ["Crypto", "CB", "Retrait en 1h", "VIP Rank"],
-                "clicks": 0,
-                "created_at": datetime.now(),
-                "updated_at": datetime.now()
-            },
-            {
-                "id": str(uuid.uuid4()),
-                "title": "Fast Slots",
-                "bonus": "200% de BONUS jusqu'à 5'000€",
-                "description": "10% de CASHBACK INSTANTANÉ dès la création de votre compte + 50 Freespins",
-                "color": "linear-gradient(to right, #7f00ff, #e100ff)",
-                "logo": "https://images.unsplash.com/photo-1583512603834-01a3a1e56241?w=100&h=100&fit=crop",
-                "link": "https://bit.ly/FastSkrymi",
-                "tags": ["Crypto", "CB", "Retrait en 1h"],
-                "clicks": 0,
-                "created_at": datetime.now(),
-                "updated_at": datetime.now()
-            },
-            {
-                "id": str(uuid.uuid4()),
-                "title": "Golden Panda",
-                "bonus": "200% de BONUS jusqu'à 5'000€",
-                "description": "10% de CASHBACK INSTANTANÉ dès la création de votre compte + 50 Freespins",
-                "color": "linear-gradient(to right, #d4af37, #ffd700)",
-                "logo": "https://images.pexels.com/photos/6990180/pexels-photo-6990180.jpeg?auto=compress&cs=tinysrgb&w=100&h=100&dpr=1",
-                "link": "https://bit.ly/SkrymiGolden",
-                "tags": ["Crypto", "CB", "Retrait en 1h"],
-                "clicks": 0,
-                "created_at": datetime.now(),
-                "updated_at": datetime.now()
-            },
-            {
-                "id": str(uuid.uuid4()),
-                "title": "X7Casino",
-                "bonus": "500%",
-                "description": "50 Free Spins sur Big Bass Bonanza + 10% Cashback chaque lundi",
-                "color": "linear-gradient(to right, #e63946, #3a86ff)",
-                "logo": "https://images.pexels.com/photos/6990348/pexels-photo-6990348.jpeg?auto=compress&cs=tinysrgb&w=100&h=100&dpr=1",
-                "link": "http://bit.ly/SkrymiX7",
-                "tags": ["Crypto", "CB"],
-                "clicks": 0,
-                "created_at": datetime.now(),
-                "updated_at": datetime.now()
-            }
-        ]
-        offers_collection.insert_many(default_offers)
-
-@app.on_event("startup")
-async def startup_event():
-    await init_default_offers()
+    # Marqueur posé une fois les offres par défaut en place : une offre par défaut
+    # supprimée ensuite par l'admin n'est pas recréée au démarrage suivant
+    if await meta_collection.find_one({"_id": "default_offers_seed"}) is not None:
+        return
+    default_offers = [
+        {
+            "id": default_offer_id("Betify"),
+            "title": "Betify",
+            "bonus": "100% offert + 30 Free Spins (en Raw Money)",
+            "description": "Jusqu'à 20% de cashback tout les lundi !",
+            "color": "linear-gradient(to right, #00c851, #007e33)",
+            "logo": "https://images.pexels.com/photos/6990180/pexels-photo-6990180.jpeg?auto=compress&cs=tinysrgb&w=100&h=100&dpr=1",
+            "link": "https://bit.ly/BetifySkrymi",
+            "tags": ["Crypto", "CB", "VIP Rank"],
+            "clicks": 0,
+            "created_at": datetime.now(),
+            "updated_at": datetime.now()
+        },
+        {
+            "id": default_offer_id("Winningz"),
+            "title": "Winningz",
+            "bonus": "CODE : WZMEGA - 200% de bonus jusqu'à 20 000€",
+            "description": "200 Free Spins offerts (50 par jour pendant 4 jours) + Jusqu'à 20% de cashback",
+            "color": "linear-gradient(to right, #3a86ff, #e63946)",
+            "logo": "https://images.pexels.com/photos/6990348/pexels-photo-6990348.jpeg?auto=compress&cs=tinysrgb&w=100&h=100&dpr=1",
+            "link": "https://bit.ly/SkrymiWinningz",
+            "tags": ["Crypto", "CB", "Retrait en 1h", "VIP Rank"],
+            "clicks": 0,
+            "created_at": datetime.now(),
+            "updated_at": datetime.now()
+        },
+        {
+            "id": default_offer_id("Samba Slots"),
+            "title": "Samba Slots",
+            "bonus": "200% de BONUS jusqu'à 5'000€",
+            "description": "10% de CASHBACK INSTANTANÉ dès la création de votre compte + 50 Freespins",
+            "color": "linear-gradient(to right, #fcd34d, #fbbf24)",
+            "logo": "https://images.unsplash.com/photo-1550496635-97c10f749275?w=100&h=100&fit=crop",
+            "link": "https://bit.ly/SkrymiSamba",
+            "tags": ["Crypto", "CB", "Retrait en 1h"],
+            "clicks": 0,
+            "created_at": datetime.now(),
+            "updated_at": datetime.now()
+        },
+        {
+            "id": default_offer_id("BetBlast"),
+            "title": "BetBlast",
+            "bonus": "200% jusqu'à 7500€",
+            "description": "50 Free Spins sur Wanted Dead or a Wild",
+            "color": "linear-gradient(to right, #007e33, #808080)",
+            "logo": "https://images.unsplash.com/photo-1605317068450-d6878f5c8dbb?w=100&h=100&fit=crop",
+            "link": "https://bit.ly/SkrymiBetblast",
+            "tags": ["Crypto", "CB", "Retrait en 1h", "VIP Rank"],
+            "clicks": 0,
+            "created_at": datetime.now(),
+            "updated_at": datetime.now()
+        },
+        {
+            "id": default_offer_id("Fast Slots"),
+            "title": "Fast Slots",
+            "bonus": "200% de BONUS jusqu'à 5'000€",
+            "description": "10% de CASHBACK INSTANTANÉ dès la création de votre compte + 50 Freespins",
+            "color": "linear-gradient(to right, #7f00ff, #e100ff)",
+            "logo": "https://images.unsplash.com/photo-1583512603834-01a3a1e56241?w=100&h=100&fit=crop",
+            "link": "https://bit.ly/FastSkrymi",
+            "tags": ["Crypto", "CB", "Retrait en 1h"],
+            "clicks": 0,
+            "created_at": datetime.now(),
+            "updated_at": datetime.now()
+        },
+        {
+            "id": default_offer_id("Golden Panda"),
+            "title": "Golden Panda",
+            "bonus": "200% de BONUS jusqu'à 5'000€",
+            "description": "10% de CASHBACK INSTANTANÉ dès la création de votre compte + 50 Freespins",
+            "color": "linear-gradient(to right, #d4af37, #ffd700)",
+            "logo": "https://images.pexels.com/photos/6990180/pexels-photo-6990180.jpeg?auto=compress&cs=tinysrgb&w=100&h=100&dpr=1",
+            "link": "https://bit.ly/SkrymiGolden",
+            "tags": ["Crypto", "CB", "Retrait en 1h"],
+            "clicks": 0,
+            "created_at": datetime.now(),
+            "updated_at": datetime.now()
+        },
+        {
+            "id": default_offer_id("X7Casino"),
+            "title": "X7Casino",
+            "bonus": "500%",
+            "description": "50 Free Spins sur Big Bass Bonanza + 10% Cashback chaque lundi",
+            "color": "linear-gradient(to right, #e63946, #3a86ff)",
+            "logo": "https://images.pexels.com/photos/6990348/pexels-photo-6990348.jpeg?auto=compress&cs=tinysrgb&w=100&h=100&dpr=1",
+            "link": "http://bit.ly/SkrymiX7",
+            "tags": ["Crypto", "CB"],
+            "clicks": 0,
+            "created_at": datetime.now(),
+            "updated_at": datetime.now()
+        }
+    ]
+    # Base sans autre offre que celles par défaut (vide, ou remplissage interrompu)
+    if await offers_collection.count_documents({"id": {"$nin": [offer["id"] for offer in default_offers]}}) == 0:
+        for offer in default_offers:
+            try:
+                await offers_collection.update_one({"id": offer["id"]}, {"$setOnInsert": offer}, upsert=True)
+            except DuplicateKeyError:
+                pass  # Upsert concurrent d'un autre worker : le document existe
+        invalidate_offers()
+    await meta_collection.update_one(
+        {"_id": "default_offers_seed"},
+        {"$setOnInsert": {"seeded_at": datetime.now(), "pid": os.getpid()}},
+        upsert=True,
+    )
+
+# Démarrage et arrêt (lifespan)
+async def seed_slots(until):
+    # Logs antérieurs au démarrage seulement : les calls acceptés depuis sont déjà comptés
+    since = until - timedelta(days=SLOT_INDEX_SEED_DAYS) if SLOT_INDEX_SEED_DAYS > 0 else None
+    seeded = await slot_index.seed_from_logs(logs_collection, storage.logs_schema, since=since, until=until)
+    leaderboard.seed_slots(seeded)
+
+async def mark_event_bus():
+    # Position du bus retenue avant le chargement des états : rien de publié entre-temps n'est sauté
+    await event_bus.setup()
+    await event_bus.mark()
+
+def warmup_steps():
+    # Dans l'ordre ; une étape réussie n'est pas rejouée si une suivante échoue
+    steps = [
+        ("mongo", lambda: readiness.ping(db)),
+        ("indexes", lambda: ensure_indexes(db, index_specs(storage))),
+        ("default_offers", init_default_offers),
+        ("call_ranks", lambda: ensure_ranks(calls_collection)),
+    ]
+    if event_bus:
+        steps.append(("event_bus_position", mark_event_bus))
+    steps += [
+        ("offer_catalog", offer_catalog.payload),
+        ("calls_queue", calls_hub.ensure_loaded),
+        ("bootstrap", bootstrap_payload.get),
+    ]
+    if event_bus:
+        steps.append(("event_bus", event_bus.start))
+    steps.append(("retention", retention.start))
+    return steps
+
+def start_background():
+    # Les tampons d'écriture démarrent aussitôt ; les routes qui les alimentent attendent le préchauffage
+    calls_queue.start()
+    click_pipeline.start()
+    log_writer.start()
+    # Autocomplétion et classement amorcés en fond : une longue agrégation des logs ne retarde pas /readyz
+    started_at = datetime.now()
+    readiness.start(warmup_steps(), [("slot_index", lambda: seed_slots(started_at))])
+
+async def stop_background():
+    # Écrire le journal des calls, les clics et logs encore en tampon avant de fermer la connexion
+    await readiness.stop()
+    await retention.stop()
+    await calls_queue.stop()
+    await click_pipeline.stop()
+    await log_writer.stop()
+    if event_bus:
+        await event_bus.stop()
+    client.close()
 
 # Routes Offres Casino
 @app.get("/api/offers", response_model=List[dict])
-async def get_offers():
-    offers = list(offers_collection.find())
-    return [convert_objectid_to_str(offer) for offer in offers]
+async def get_offers(
+    request: Request,
+    tag: Optional[List[str]] = Query(None),
+    match: str = "all",
+    sort: Optional[str] = None,
+):
+    body, etag = await offer_catalog.payload()
+    if tag or sort:
+        # Requête filtrée : index inversé des tags, ETag dérivé de celui du catalogue
+        tags = [part for value in tag or [] for part in value.split(",")]
+        try:
+            offers = await offer_catalog.query(tags, match, sort)
+        except ValueError as error:
+            raise HTTPException(status_code=400, detail=str(error))
+        etag = '"%s"' % hashlib.sha1(f"{etag}|{request.url.query}".encode("utf-8")).hexdigest()
+        headers = {"ETag": etag, "Cache-Control": "no-cache"}
+        if etag_matches(request.headers.get("if-none-match"), etag):
+            return Response(status_code=304, headers=headers)
+        return ORJSONResponse(offers, headers=headers)
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.get("/api/bootstrap")
+async def get_bootstrap(request: Request):
+    body, encoding, etag = await bootstrap_payload.get(request.headers.get("accept-encoding"))
+    headers = {"ETag": etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return Response(content=body, media_type="application/json", headers=headers)
 
 @app.post("/api/offers", response_model=dict)
 async def create_offer(offer: OfferBase, is_admin: bool = Depends(get_current_user)):
@@ -193,7 +527,9 @@ async def create_offer(offer: OfferBase, is_admin: bool = Depends(get_current_us
     offer_data["created_at"] = datetime.now()
     offer_data["updated_at"] = datetime.now()
     
-    result = offers_collection.insert_one(offer_data)
+    result = await offers_collection.insert_one(offer_data)
+    offer_catalog.upsert({key: value for key, value in offer_data.items() if key != "_id"})
+    publish_offers_changed()
     offer_data["_id"] = result.inserted_id
     return convert_objectid_to_str(offer_data)
 
@@ -205,62 +541,128 @@ async def update_offer(offer_id: str, offer: OfferBase, is_admin: bool = Depends
     offer_data = offer.dict()
     offer_data["updated_at"] = datetime.now()
     
-    result = offers_collection.update_one({"id": offer_id}, {"$set": offer_data})
+    result = await offers_collection.update_one({"id": offer_id}, {"$set": offer_data})
     if result.matched_count == 0:
         raise HTTPException(status_code=404, detail="Offer not found")
     
-    updated_offer = offers_collection.find_one({"id": offer_id})
-    return convert_objectid_to_str(updated_offer)
+    updated_offer = convert_objectid_to_str(await offers_collection.find_one({"id": offer_id}, projection=OFFER_PROJECTION))
+    if updated_offer is None:
+        raise HTTPException(status_code=404, detail="Offer not found")
+    offer_catalog.upsert(dict(updated_offer))
+    publish_offers_changed()
+    return updated_offer
 
 @app.delete("/api/offers/{offer_id}")
 async def delete_offer(offer_id: str, is_admin: bool = Depends(get_current_user)):
     if not is_admin:
         raise HTTPException(status_code=403, detail="Unauthorized")
     
-    result = offers_collection.delete_one({"id": offer_id})
+    result = await offers_collection.delete_one({"id": offer_id})
     if result.deleted_count == 0:
         raise HTTPException(status_code=404, detail="Offer not found")
+    offer_catalog.remove(offer_id)
+    publish_offers_changed()
     
     return {"message": "Offer deleted successfully"}
 
 # Routes Calls
-@app.get("/api/calls")
+@app.exception_handler(JournalFull)
+async def journal_full_handler(request: Request, exc: JournalFull):
+    return JSONResponse(status_code=503, content={"detail": "Trop de modifications en attente, réessayez"})
+
+@app.get("/api/calls", response_class=ORJSONResponse)
 async def get_calls():
-    calls = list(calls_collection.find().sort("created_at", 1))
-    calls_data = [convert_objectid_to_str(call) for call in calls]
-    return {"calls": [{"slot": call["slot"], "user": call["username"]} for call in calls_data]}
+    # Lecture de la file en mémoire : aucune requête Mongo
+    await calls_queue.ensure_loaded()
+    return ORJSONResponse({"calls": calls_queue.snapshot()})
+
+@app.get("/api/calls/stream")
+async def stream_calls(request: Request):
+    return StreamingResponse(
+        calls_hub.stream(request.headers.get("last-event-id")),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-@app.post("/api/calls")
+@app.post("/api/calls", dependencies=[Depends(rate_limit(calls_limiter, client_ip))])
 async def create_call(call: CallBase, request: Request):
-    call_data = call.dict()
-    call_data["id"] = str(uuid.uuid4())
-    call_data["created_at"] = datetime.now()
+    # Journal plein : 503 avant tout effet (ni doublon retenu, ni log, ni comptage)
+    calls_queue.reserve(1)
+    
+    # Même pseudo + même slot (à la casse et aux accents près) dans la fenêtre : doublon ignoré
+    reject_duplicate(call_duplicates, (call.username.strip().lower(), slot_key(call.slot)))
     
-    # Log pour analytics
+    # Graphie canonique d'un slot déjà connu ("big bass" -> "Big Bass"), puis comptage ;
+    # aucun await depuis reserve() : l'ajout ne peut plus échouer
+    slot = slot_index.canonical(call.slot)
+    record = calls_queue.add(slot, call.username)
+    slot_index.add(call.slot)
+    leaderboard.record(slot, call.username)
+    
+    # Log pour analytics (écrit en tâche de fond, hors du chemin de la requête)
     log_data = {
         "id": str(uuid.uuid4()),
         "timestamp": datetime.now(),
-        "ip": request.client.host,
-        "slot": call.slot,
+        "ip": client_ip(request),
+        "slot": slot,
         "username": call.username,
         "action": "call_created"
     }
-    logs_collection.insert_one(log_data)
+    await log_writer.enqueue(log_data)
     
-    result = calls_collection.insert_one(call_data)
+    publish_calls_event("add", {"call": record.to_event()}, {record.id: record.rank})
     return {"success": True, "message": "Call ajouté avec succès"}
 
+@app.get("/api/slots/suggest", response_class=ORJSONResponse)
+async def suggest_slots(q: str = "", limit: int = 10):
+    # Index en mémoire : ni Mongo ni tri de la collection
+    suggestions = slot_index.suggest(q, max(1, min(limit, SLOT_SUGGEST_MAX)))
+    return ORJSONResponse({"suggestions": suggestions})
+
+@app.get("/api/leaderboard", response_class=ORJSONResponse)
+async def get_leaderboard(window: str = "hour", limit: int = 10):
+    if window not in WINDOWS:
+        raise HTTPException(status_code=400, detail=f"Fenêtre invalide : {window} ({', '.join(WINDOWS)})")
+    return ORJSONResponse(leaderboard.top(window, max(1, min(limit, LEADERBOARD_CAPACITY))))
+
+@app.delete("/api/calls/by-id/{call_id}")
+async def delete_call_by_id(call_id: str, is_admin: bool = Depends(get_current_user)):
+    if not is_admin:
+        raise HTTPException(status_code=403, detail="Unauthorized")
+    
+    if calls_queue.delete(call_id) is None:
+        raise HTTPException(status_code=404, detail="Call introuvable")
+    
+    publish_calls_event("delete", {"id": call_id})
+    return {"success": True}
+
+@app.post("/api/calls/by-id/{call_id}/move")
+async def move_call(call_id: str, move: MoveCallRequest, is_admin: bool = Depends(get_current_user)):
+    if not is_admin:
+        raise HTTPException(status_code=403, detail="Unauthorized")
+    if move.after_id == call_id:
+        raise HTTPException(status_code=400, detail="Déplacement invalide")
+    
+    if move.after_id is not None and move.after_id not in calls_queue:
+        raise HTTPException(status_code=404, detail="Call de référence introuvable")
+    if call_id not in calls_queue:
+        raise HTTPException(status_code=404, detail="Call introuvable")
+    
+    ranks = calls_queue.move(call_id, move.after_id)
+    publish_calls_event("move", {"id": call_id, "after_id": move.after_id}, ranks)
+    return {"success": True}
+
+# Compatibilité : suppression par position dans la file en mémoire
 @app.delete("/api/calls/{call_index}")
 async def delete_call(call_index: int, is_admin: bool = Depends(get_current_user)):
     if not is_admin:
         raise HTTPException(status_code=403, detail="Unauthorized")
     
-    calls = list(calls_collection.find().sort("created_at", 1))
-    if call_index < 0 or call_index >= len(calls):
+    call_to_delete = calls_queue.delete_at(call_index)
+    if call_to_delete is None:
         raise HTTPException(status_code=400, detail="Index invalide")
     
-    call_to_delete = calls[call_index]
-    calls_collection.delete_one({"_id": call_to_delete["_id"]})
+    publish_calls_event("delete", {"id": call_to_delete.id})
     return {"success": True}
 
 @app.post("/api/calls/reset")
@@ -268,79 +670,223 @@ async def reset_calls(is_admin: bool = Depends(get_current_user)):
     if not is_admin:
         raise HTTPException(status_code=403, detail="Unauthorized")
     
-    calls_collection.delete_many({})
+    calls_queue.reset()
+    # Nouvelle file : nouvelle session pour le classement
+    leaderboard.reset_session()
+    publish_calls_event("reset", {})
     return {"success": True}
 
 @app.post("/api/calls/reorder")
-async def reorder_calls(new_order: List[dict], is_admin: bool = Depends(get_current_user)):
+async def reorder_calls(new_order: Union[List[ReorderItem], ReorderDiff], is_admin: bool = Depends(get_current_user)):
     if not is_admin:
         raise HTTPException(status_code=403, detail="Unauthorized")
     
-    # Vider la collection et réinsérer dans le nouvel ordre
-    calls_collection.delete_many({})
-    for call_data in new_order:
-        new_call = {
-            "id": str(uuid.uuid4()),
-            "slot": call_data["slot"],
-            "username": call_data["user"],
-            "created_at": datetime.now()
-        }
-        calls_collection.insert_one(new_call)
+    # Diff : seuls les calls déplacés sont réécrits
+    if isinstance(new_order, ReorderDiff):
+        applied = calls_queue.apply_moves([(move.id, move.after_id) for move in new_order.moves])
+        for call_id, after_id, ranks in applied:
+            publish_calls_event("move", {"id": call_id, "after_id": after_id}, ranks)
+        return {"success": True, "moved": len(applied)}
     
+    # Liste complète : un seul lot du journal, les ids existants sont conservés
+    items = [{"id": item.id, "slot": item.slot, "username": item.user} for item in new_order]
+    try:
+        records = calls_queue.replace(items)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    publish_calls_event("reorder", {"calls": [record.to_event() for record in records]},
+                        {record.id: record.rank for record in records})
     return {"success": True}
 
 # Routes Tracking
-@app.post("/api/click")
+@app.post("/api/click", dependencies=[Depends(rate_limit(clicks_limiter, client_ip))])
 async def track_click(click_data: ClickData, request: Request):
-    # Vérifier que l'offre existe
-    offer = offers_collection.find_one({"id": click_data.offer_id})
-    if not offer:
+    # Vérifier que l'offre existe (ensemble en mémoire, sans requête Mongo)
+    if not await offer_catalog.has_offer(click_data.offer_id):
         raise HTTPException(status_code=404, detail="Offer not found")
     
-    # Incrémenter le compteur de clics
-    offers_collection.update_one(
-        {"id": click_data.offer_id},
-        {"$inc": {"clicks": 1}}
-    )
-    
-    # Enregistrer le clic
+    # Mettre le clic en tampon : insertion et $inc sont faits par lots
     click_record = {
         "id": str(uuid.uuid4()),
         "offer_id": click_data.offer_id,
-        "user_ip": request.client.host,
+        "user_ip": client_ip(request),
         "timestamp": datetime.now()
     }
-    clicks_collection.insert_one(click_record)
+    if not click_pipeline.submit(click_record):
+        raise HTTPException(status_code=503, detail="Trop de clics, réessayez")
+    offer_catalog.apply_clicks(click_data.offer_id)
     
     return {"success": True}
 
-@app.get("/api/analytics")
-async def get_analytics(is_admin: bool = Depends(get_current_user)):
+@app.get("/go/{offer_id}")
+@app.get("/api/go/{offer_id}")
+async def go_to_offer(offer_id: str, request: Request):
+    # Redirection immédiate vers le lien en mémoire ; le clic part dans le pipeline sans attendre Mongo
+    link = await offer_catalog.link_for(offer_id)
+    if not link:
+        raise HTTPException(status_code=404, detail="Offer not found")
+    host = client_ip(request)
+    # Au-delà de la limite ou pipeline plein, le clic n'est pas compté mais l'utilisateur est redirigé
+    if clicks_limiter is None or clicks_limiter.acquire(host)[0]:
+        click_record = {
+            "id": str(uuid.uuid4()),
+            "offer_id": offer_id,
+            "user_ip": host,
+            "timestamp": datetime.now()
+        }
+        if click_pipeline.submit(click_record):
+            offer_catalog.apply_clicks(offer_id)
+    return RedirectResponse(link, status_code=302, headers={"Cache-Control": "no-store"})
+
+@app.get("/api/analytics", response_class=ORJSONResponse)
+async def get_analytics(days: int = 1, is_admin: bool = Depends(get_current_user)):
     if not is_admin:
         raise HTTPException(status_code=403, detail="Unauthorized")
     
+    if days < 1:
+        raise HTTPException(status_code=400, detail="days doit être au moins 1")
+    days = min(days, MAX_WINDOW_DAYS)
+    
+    # Visiteurs uniques estimés (HyperLogLog) sur les `days` derniers jours
+    now = datetime.now()
+    visitors_by_offer, unique_total = await unique_visitors(visitor_sketches_collection, days_window(now, days), now)
+    
     # Statistiques des offres
-    offers = list(offers_collection.find())
+    offers = await offers_collection.find(
+        {}, projection={"_id": 0, "id": 1, "title": 1, "clicks": 1}
+    ).to_list(length=None)
     offers_stats = []
     
     for offer in offers:
-        offer_data = convert_objectid_to_str(offer)
         offers_stats.append({
-            "title": offer_data["title"],
-            "clicks": offer_data.get("clicks", 0),
-            "id": offer_data["id"]
+            "title": offer["title"],
+            "clicks": offer.get("clicks", 0),
+            "unique_visitors": visitors_by_offer.get(offer["id"], 0),
+            "id": offer["id"]
         })
     
     # Statistiques globales
     total_clicks = sum(offer.get("clicks", 0) for offer in offers)
-    total_calls = calls_collection.count_documents({})
+    total_calls = len(calls_queue)
     
-    return {
+    return ORJSONResponse({
         "offers_stats": offers_stats,
         "total_clicks": total_clicks,
-        "total_calls": total_calls
+        "total_calls": total_calls,
+        "unique_visitors": unique_total,
+        "unique_visitors_days": days
+    })
+
+@app.get("/api/admin/pipelines")
+async def get_pipelines(is_admin: bool = Depends(get_current_user)):
+    if not is_admin:
+        raise HTTPException(status_code=403, detail="Unauthorized")
+    
+    return {
+        "clicks": click_pipeline.metrics(),
+        "logs": log_writer.metrics(),
+        "calls_journal": calls_queue.metrics(),
+        "retention": retention.status(),
+    }
+
+@app.get("/api/admin/query-plans")
+async def get_query_plans(is_admin: bool = Depends(get_current_user)):
+    if not is_admin:
+        raise HTTPException(status_code=403, detail="Unauthorized")
+    
+    report = await explain_hot_queries(db, storage)
+    return {"queries": report, "collscan": [entry["query"] for entry in report if entry["collscan"]]}
+
+def _analytics_range(start: Optional[datetime], end: Optional[datetime]):
+    # "…Z" ou "+02:00" : ramené à l'heure locale naïve des tranches
+    start, end = naive_local(start), naive_local(end)
+    end = end or datetime.now()
+    start = start or end - timedelta(days=1)
+    if start >= end:
+        raise HTTPException(status_code=400, detail="Intervalle invalide")
+    return start, end
+
+@app.get("/api/analytics/range")
+async def get_analytics_range(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    offer_id: Optional[str] = None,
+    is_admin: bool = Depends(get_current_user),
+):
+    if not is_admin:
+        raise HTTPException(status_code=403, detail="Unauthorized")
+    
+    start, end = _analytics_range(start, end)
+    clicks_by_offer = await range_totals(click_rollups_collection, start, end, offer_id)
+    titles = {offer["id"]: offer["title"] for offer in await offer_catalog.offers()}
+    return {
+        "start": start,
+        "end": end,
+        "offers_stats": [
+            {"id": oid, "title": titles.get(oid), "clicks": clicks}
+            for oid, clicks in sorted(clicks_by_offer.items(), key=lambda item: -item[1])
+        ],
+        "total_clicks": sum(clicks_by_offer.values())
     }
 
+@app.get("/api/analytics/timeseries")
+async def get_analytics_timeseries(
+    start: Optional[datetime] = None,
+    end: Optional[datetime] = None,
+    granularity: str = "hour",
+    offer_id: Optional[str] = None,
+    is_admin: bool = Depends(get_current_user),
+):
+    if not is_admin:
+        raise HTTPException(status_code=403, detail="Unauthorized")
+    if granularity not in GRANULARITIES:
+        raise HTTPException(status_code=400, detail="Granularité invalide (minute, hour, day)")
+    
+    start, end = _analytics_range(start, end)
+    try:
+        series = await timeseries(click_rollups_collection, start, end, granularity, offer_id)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+    return {"start": start, "end": end, "granularity": granularity, "series": series}
+
+background_queue_depth = metrics_registry.gauge(
+    "background_queue_depth", "Éléments en attente dans les tampons d'écriture", ("worker",))
+background_dropped = metrics_registry.gauge(
+    "background_dropped_total", "Éléments rejetés par les tampons d'écriture (tampon plein)", ("worker",))
+sse_subscribers = metrics_registry.gauge("sse_subscribers", "Spectateurs connectés au flux des calls")
+
+def mongo_status():
+    return {"pools": mongo_pool_metrics.stats(), "max_pool_size": MONGO_MAX_POOL_SIZE,
+            "last_ping_ms": readiness.last_ping_ms}
+
+@app.get("/healthz", response_class=ORJSONResponse)
+async def healthz():
+    # Vivant : aucune requête Mongo, même pendant le préchauffage
+    return ORJSONResponse({"status": "ok", **readiness.status(), "mongo": mongo_status()})
+
+@app.get("/readyz", response_class=ORJSONResponse)
+async def readyz():
+    # Prêt : préchauffage terminé et Mongo joignable maintenant
+    if not readiness.ready:
+        return ORJSONResponse({"status": "starting", **readiness.status(), "mongo": mongo_status()},
+                              status_code=503, headers={"Retry-After": "1"})
+    try:
+        await readiness.ping(db)
+    except Exception as error:
+        return ORJSONResponse({"status": "mongo_unavailable", "error": repr(error), **readiness.status(),
+                               "mongo": mongo_status()}, status_code=503)
+    return ORJSONResponse({"status": "ready", **readiness.status(), "mongo": mongo_status()})
+
+@app.get("/metrics")
+async def get_metrics():
+    # Les jauges des tampons et du hub sont lues au moment du scrape
+    for name, worker in (("clicks", click_pipeline), ("logs", log_writer), ("calls_journal", calls_queue)):
+        worker_metrics = worker.metrics()
+        background_queue_depth.set(worker_metrics["queue_depth"], (name,))
+        background_dropped.set(worker_metrics["dropped"], (name,))
+    sse_subscribers.set(calls_hub.subscriber_count)
+    return PlainTextResponse(metrics_registry.render(), media_type="text/plain; version=0.0.4")
+
 # Routes Authentification
 @app.post("/api/login")
 async def login(login_request: LoginRequest):
@@ -366,14 +912,69 @@ async def logout():
     response.delete_cookie("admin")
     return response
 
-@app.get("/api/logs")
-async def get_logs(is_admin: bool = Depends(get_current_user)):
+LOGS_PAGE_MAX = 1000
+
+def _logs_filter(action, slot, username, ip, cursor=None):
+    try:
+        return build_filter(action=action, slot=slot, username=username, ip=ip, cursor=cursor)
+    except ValueError as error:
+        raise HTTPException(status_code=400, detail=str(error))
+
+@app.get("/api/logs", response_class=ORJSONResponse)
+async def get_logs(
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    action: Optional[str] = None,
+    slot: Optional[str] = None,
+    username: Optional[str] = None,
+    ip: Optional[str] = None,
+    is_admin: bool = Depends(get_current_user),
+):
+    if not is_admin:
+        raise HTTPException(status_code=403, detail="Non autorisé")
+    
+    # Pagination par clé (timestamp, _id) : la page suivante est dans X-Next-Cursor
+    limit = max(1, min(limit, LOGS_PAGE_MAX))
+    query = _logs_filter(action, slot, username, ip, cursor)
+    logs, next_cursor = await fetch_page(logs_collection, query, limit, storage.logs_schema)
+    response = ORJSONResponse([convert_objectid_to_str(log) for log in logs])
+    if next_cursor:
+        response.headers["X-Next-Cursor"] = next_cursor
+    return response
+
+@app.get("/api/logs/export")
+async def export_logs(
+    format: str = "ndjson",
+    action: Optional[str] = None,
+    slot: Optional[str] = None,
+    username: Optional[str] = None,
+    ip: Optional[str] = None,
+    is_admin: bool = Depends(get_current_user),
+):
     if not is_admin:
         raise HTTPException(status_code=403, detail="Non autorisé")
+    if format not in ("ndjson", "csv"):
+        raise HTTPException(status_code=400, detail="Format invalide (ndjson, csv)")
     
-    logs = list(logs_collection.find().sort("timestamp", -1).limit(100))
-    return [convert_objectid_to_str(log) for log in logs]
+    query = _logs_filter(action, slot, username, ip)
+    filename = f"logs-{datetime.now():%Y%m%d-%H%M%S}.{format}"
+    if format == "csv":
+        body, media_type = export_csv(logs_collection, query, storage.logs_schema), "text/csv; charset=utf-8"
+    else:
+        body, media_type = export_ndjson(logs_collection, query, storage.logs_schema), "application/x-ndjson"
+    return StreamingResponse(
+        body,
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8001)
\ No newline at end of file
+    host = os.environ.get('HOST', '0.0.0.0')
+    port = int(os.environ.get('PORT', '8001'))
+    if WEB_CONCURRENCY > 1:
+        # Plusieurs processus : uvicorn a besoin du chemin d'import de l'application
+        uvicorn.run("server:app", host=host, port=port, workers=WEB_CONCURRENCY,
+                    app_dir=os.path.dirname(os.path.abspath(__file__)))
+    else:
+        uvicorn.run(app, host=host, port=port)
\ No newline at end of file
@@ -0,0 +1,147 @@
+"""Index de préfixes des noms de slots, pour l'autocomplétion et la normalisation.
+
+Un nom est réduit à une clé sans casse, sans accents, sans espaces ni
+ponctuation (« Big Bass Bonanza », « big bass bonanza » et « bigbassbonanza »
+partagent la clé ``bigbassbonanza``). Chaque clé garde ses graphies et leur
+nombre d'occurrences ; la graphie la plus fréquente est le nom canonique.
+
+Les clés vivent dans un tableau trié, parcouru par bissection : chaque mot du
+nom y entre aussi (à partir de sa position), si bien que « bonanza » propose
+« Big Bass Bonanza ». Un préfixe qui couvre au plus ``SCAN_LIMIT`` clés est
+classé en parcourant toutes ses clés. Au-delà (« b », « bo »…), son classement
+est calculé une fois puis gardé à jour à chaque ajout : les comptes ne font que
+croître, une entrée n'entre donc dans un classement qu'en y dépassant la
+dernière. Les suggestions sont ainsi toujours les plus demandées.
+"""
+import heapq
+import unicodedata
+from bisect import bisect_left, insort
+
+SCAN_LIMIT = 256
+# Au-delà de tous les caractères d'une clé : borne de fin de l'intervalle d'un préfixe
+_AFTER_PREFIX = "\U0010ffff"
+
+
+def _words(name):
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(char for char in decomposed if not unicodedata.combining(char)).casefold()
+    return "".join(char if char.isalnum() else " " for char in stripped).split()
+
+
+def slot_key(name):
+    """Clé de normalisation d'un nom de slot ("" s'il ne contient ni lettre ni chiffre)."""
+    return "".join(_words(name))
+
+
+def _rank(entry):
+    return -entry.count, entry.key
+
+
+class SlotEntry:
+    __slots__ = ("key", "display", "count", "variants", "sub_keys")
+
+    def __init__(self, key, sub_keys):
+        self.key = key
+        self.sub_keys = sub_keys
+        self.display = None
+        self.count = 0
+        self.variants = {}
+
+    def add(self, name, count):
+        self.count += count
+        self.variants[name] = self.variants.get(name, 0) + count
+        if self.display is None or self.variants[name] > self.variants[self.display]:
+            self.display = name
+
+
+class SlotIndex:
+    def __init__(self, max_slots=200000, max_suggestions=50):
+        self.max_slots = max_slots
+        self.max_suggestions = max_suggestions
+        self._entries = {}  # clé -> SlotEntry
+        self._keys = []  # clés de recherche triées : (sous-clé, clé de l'entrée)
+        self._top = {}  # préfixe couvrant plus de SCAN_LIMIT clés -> entrées les plus demandées
+
+    def __len__(self):
+        return len(self._entries)
+
+    def add(self, name, count=1):
+        """Compte ``count`` occurrences de ``name`` ; renvoie son entrée (None si ignoré)."""
+        name = " ".join(name.split())
+        key = slot_key(name)
+        if not key:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            if len(self._entries) >= self.max_slots:
+                return None
+            words = _words(name)
+            entry = self._entries[key] = SlotEntry(key, ["".join(words[i:]) for i in range(len(words))])
+            for sub_key in entry.sub_keys:
+                insort(self._keys, (sub_key, key))
+        entry.add(name, count)
+        if self._top:
+            self._promote(entry)
+        return entry
+
+    def _promote(self, entry):
+        """Reporte le nouveau compte de ``entry`` dans les classements des préfixes qui la couvrent."""
+        seen = set()
+        for sub_key in entry.sub_keys:
+            for length in range(1, len(sub_key) + 1):
+                prefix = sub_key[:length]
+                top = self._top.get(prefix)
+                if top is None or prefix in seen:
+                    continue
+                seen.add(prefix)
+                if entry in top:
+                    top.sort(key=_rank)
+                elif len(top) < self.max_suggestions or _rank(entry) < _rank(top[-1]):
+                    insort(top, entry, key=_rank)
+                    del top[self.max_suggestions:]
+
+    def canonical(self, name):
+        """Graphie la plus fréquente d'un nom de même clé, sinon le nom tel quel (espaces réduits)."""
+        name = " ".join(name.split())
+        entry = self._entries.get(slot_key(name))
+        return entry.display if entry is not None else name
+
+    def suggest(self, query, limit=10):
+        """Slots dont un mot commence par ``query``, les plus demandés d'abord."""
+        prefix = slot_key(query)
+        if not prefix or limit <= 0:
+            return []
+        top = self._top.get(prefix)
+        if top is None:
+            start = bisect_left(self._keys, (prefix, ""))
+            end = bisect_left(self._keys, (prefix + _AFTER_PREFIX, ""), start)
+            keys = {key for _, key in self._keys[start:end]}
+            top = heapq.nsmallest(self.max_suggestions, (self._entries[key] for key in keys), key=_rank)
+            if end - start > SCAN_LIMIT:
+                self._top[prefix] = top
+        return [{"slot": entry.display, "count": entry.count} for entry in top[:limit]]
+
+    async def seed_from_logs(self, collection, schema, since=None, until=None):
+        """Compte les slots des ``call_created`` de [since, until[ (une agrégation côté Mongo).
+
+        Les lignes sont toutes lues avant d'être comptées : un échec de lecture ne
+        laisse pas de comptes partiels (l'appel peut être rejoué). Renvoie les
+        comptes ajoutés, ``(graphie canonique, nombre)`` par slot.
+        """
+        query = {"action": "call_created"}
+        if since is not None or until is not None:
+            query["timestamp"] = {
+                **({"$gte": since} if since is not None else {}),
+                **({"$lt": until} if until is not None else {}),
+            }
+        pipeline = [
+            {"$match": schema.filter(query)},
+            {"$group": {"_id": f"${schema.field('slot')}", "count": {"$sum": 1}}},
+        ]
+        rows = [row async for row in collection.aggregate(pipeline) if isinstance(row["_id"], str)]
+        seeded = {}
+        for row in rows:
+            entry = self.add(row["_id"], row["count"])
+            if entry is not None:
+                seeded[entry] = seeded.get(entry, 0) + row["count"]
+        return [(entry.display, count) for entry, count in seeded.items()]
@@ -0,0 +1,79 @@
+"""Index inversé des tags d'offres : tag -> ensemble de bits.
+
+Chaque offre occupe un emplacement (bit) stable tant qu'elle existe ; les
+emplacements libérés sont réutilisés. Pour chaque tag, un entier Python sert
+d'ensemble de bits des offres qui le portent : une requête ET / OU sur
+plusieurs tags se réduit à quelques ``&`` / ``|`` sur des entiers, quel que
+soit le nombre d'offres. Les tags sont comparés sans casse ni espaces autour.
+"""
+
+MATCH_MODES = ("all", "any")
+
+
+def normalize_tag(tag):
+    return tag.strip().casefold()
+
+
+class TagIndex:
+    def __init__(self, offers=()):
+        self._offers = []  # emplacement -> offre (None si libre)
+        self._slots = {}  # id d'offre -> emplacement
+        self._free = []
+        self._tags = {}  # tag normalisé -> ensemble de bits
+        self._all = 0
+        for offer in offers:
+            self.add(offer)
+
+    def __len__(self):
+        return len(self._slots)
+
+    def add(self, offer):
+        """Indexe ``offer`` (la remplace si son id est déjà présent)."""
+        self.remove(offer["id"])
+        slot = self._free.pop() if self._free else len(self._offers)
+        if slot == len(self._offers):
+            self._offers.append(offer)
+        else:
+            self._offers[slot] = offer
+        self._slots[offer["id"]] = slot
+        bit = 1 << slot
+        self._all |= bit
+        for tag in {normalize_tag(tag) for tag in offer.get("tags") or ()}:
+            self._tags[tag] = self._tags.get(tag, 0) | bit
+
+    def remove(self, offer_id):
+        slot = self._slots.pop(offer_id, None)
+        if slot is None:
+            return
+        mask = ~(1 << slot)
+        self._all &= mask
+        for tag in {normalize_tag(tag) for tag in self._offers[slot].get("tags") or ()}:
+            bits = self._tags[tag] & mask
+            if bits:
+                self._tags[tag] = bits
+            else:
+                del self._tags[tag]
+        self._offers[slot] = None
+        self._free.append(slot)
+
+    def match(self, tags, mode="all"):
+        """Offres portant tous (``all``) ou au moins un (``any``) des tags ; toutes si ``tags`` est vide."""
+        if mode not in MATCH_MODES:
+            raise ValueError(f"Mode invalide : {mode} (all, any)")
+        wanted = {normalize_tag(tag) for tag in tags if tag.strip()}
+        if not wanted:
+            bits = self._all
+        elif mode == "all":
+            bits = self._all
+            for tag in wanted:
+                bits &= self._tags.get(tag, 0)
+        else:
+            bits = 0
+            for tag in wanted:
+                bits |= self._tags.get(tag, 0)
+        offers = []
+        while bits:
+            low = bits & -bits
+            offers.append(self._offers[low.bit_length() - 1])
+            bits ^= low
+        return offers
@@ -0,0 +1,87 @@
+"""Visiteurs uniques par offre et par jour, persistés sous forme de sketches HyperLogLog.
+
+Chaque processus accumule les IP d'un lot de clics dans des sketches locaux,
+puis les fusionne dans ``visitor_sketches`` (un document par offre et par
+jour, registres en binaire). La fusion se fait par compare-and-swap sur un
+numéro de version : plusieurs workers peuvent écrire le même document sans
+perdre de visiteurs.
+"""
+from datetime import timedelta
+
+from bson.binary import Binary
+from pymongo.errors import DuplicateKeyError
+
+from analytics import floor_bucket
+from hyperloglog import DEFAULT_PRECISION, HyperLogLog
+
+MAX_MERGE_ATTEMPTS = 10
+# Fenêtre maximale des visiteurs uniques (un sketch de 4 Kio par offre et par jour est lu)
+MAX_WINDOW_DAYS = 366
+
+
+def sketches_for_clicks(clicks, precision=DEFAULT_PRECISION):
+    """Sketches locaux {(offer_id, jour): HyperLogLog} pour un lot de clics."""
+    sketches = {}
+    for click in clicks:
+        key = (click["offer_id"], floor_bucket(click["timestamp"], "day"))
+        sketch = sketches.get(key)
+        if sketch is None:
+            sketch = sketches[key] = HyperLogLog(precision)
+        sketch.add(click["user_ip"])
+    return sketches
+
+
+async def _merge_one(collection, offer_id, bucket, sketch):
+    key = {"offer_id": offer_id, "granularity": "day", "bucket": bucket}
+    for _ in range(MAX_MERGE_ATTEMPTS):
+        doc = await collection.find_one(key, projection={"registers": 1, "precision": 1, "version": 1})
+        if doc is None:
+            try:
+                await collection.insert_one({
+                    **key,
+                    "precision": sketch.precision,
+                    "registers": Binary(sketch.to_bytes()),
+                    "version": 1,
+                })
+                return
+            except DuplicateKeyError:
+                continue  # Un autre worker vient de créer le document : on fusionne
+        merged = HyperLogLog.from_bytes(doc["registers"], doc["precision"]).merge(sketch)
+        result = await collection.update_one(
+            {"_id": doc["_id"], "version": doc["version"]},
+            {"$set": {"registers": Binary(merged.to_bytes())}, "$inc": {"version": 1}},
+        )
+        if result.matched_count:
+            return
+    raise RuntimeError(f"Fusion du sketch {offer_id} / {bucket} abandonnée après {MAX_MERGE_ATTEMPTS} essais")
+
+
+async def merge_sketches(collection, sketches):
+    for (offer_id, bucket), sketch in sketches.items():
+        await _merge_one(collection, offer_id, bucket, sketch)
+
+
+async def unique_visitors(collection, start, end):
+    """Estimations {offer_id: visiteurs} et total toutes offres confondues sur les jours de [start, end]."""
+    docs = await collection.find(
+        {"granularity": "day", "bucket": {"$gte": floor_bucket(start, "day"), "$lte": end}},
+        projection={"_id": 0, "offer_id": 1, "registers": 1, "precision": 1},
+    ).to_list(length=None)
+    per_offer = {}
+    overall = None
+    for doc in docs:
+        sketch = HyperLogLog.from_bytes(doc["registers"], doc["precision"])
+        if doc["offer_id"] in per_offer:
+            per_offer[doc["offer_id"]].merge(sketch)
+        else:
+            per_offer[doc["offer_id"]] = HyperLogLog.from_bytes(doc["registers"], doc["precision"])
+        overall = sketch if overall is None else overall.merge(sketch)
+    return (
+        {offer_id: sketch.count() for offer_id, sketch in per_offer.items()},
+        overall.count() if overall is not None else 0,
+    )
+
+
+def days_window(now, days):
+    """Début de la fenêtre couvrant les ``days`` derniers jours (aujourd'hui inclus, 1 à ``MAX_WINDOW_DAYS``)."""
+    return floor_bucket(now, "day") - timedelta(days=min(max(days, 1), MAX_WINDOW_DAYS) - 1)
@@ -0,0 +1,83 @@
+"""Démarrage à froid : du lancement du processus au premier 200.
+
+Lance ``backend/server.py`` ``--runs`` fois (MONGO_URL doit pointer vers un
+mongod accessible) et mesure, depuis le ``Popen`` :
+
+- le premier 200 de /healthz (processus à l'écoute) ;
+- le premier 200 de /readyz (préchauffage terminé) ;
+- le premier 200 de GET /api/offers.
+
+    python benchmarks/bench_cold_start.py --runs 5
+
+La durée de chaque étape du préchauffage est relevée dans la réponse de /readyz.
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import print_summary, summarize  # noqa: E402
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+PROBES = (("healthz", "/healthz"), ("readyz", "/readyz"), ("offers", "/api/offers"))
+
+
+def first_200(session, url, deadline):
+    while time.monotonic() < deadline:
+        try:
+            if session.get(url, timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.01)
+    raise RuntimeError(f"Pas de 200 sur {url} avant l'échéance")
+
+
+def measure(port, timeout):
+    env = dict(os.environ, PORT=str(port), WEB_CONCURRENCY="1")
+    start = time.monotonic()
+    server = subprocess.Popen(
+        [sys.executable, "server.py"], cwd=BACKEND_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}"
+    session = requests.Session()
+    try:
+        deadline = start + timeout
+        timings = {}
+        # Sondes dans l'ordre où elles passent à 200 : chaque mesure part du lancement
+        for name, path in PROBES:
+            first_200(session, f"{base_url}{path}", deadline)
+            timings[name] = time.monotonic() - start
+        return timings, session.get(f"{base_url}/readyz").json()
+    finally:
+        server.terminate()
+        server.wait(timeout=15)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--port", type=int, default=8011)
+    parser.add_argument("--timeout", type=float, default=60.0, help="échéance par lancement (s)")
+    args = parser.parse_args()
+
+    samples = {name: [] for name, _ in PROBES}
+    steps = None
+    for run in range(args.runs):
+        timings, ready = measure(args.port, args.timeout)
+        steps = ready["steps"]
+        print(f"lancement {run + 1:<22} " + " ".join(f"{name}_s={value:.3f}" for name, value in timings.items()))
+        for name, value in timings.items():
+            samples[name].append(value)
+    for name, _ in PROBES:
+        print_summary(f"premier 200 {name}", summarize(samples[name]))
+    print("préchauffage (dernier lancement) : " + " ".join(f"{name}={seconds}s" for name, seconds in steps.items()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Latence de GET /api/go/{offer_id} (redirection 302 avec comptage du clic).
+
+Lance le serveur (``cd backend && uvicorn server:app --port 8001``) puis :
+
+    python benchmarks/bench_go_redirect.py --requests 2000
+
+Avec ``CLICKS_RATE_PER_MINUTE=0`` côté serveur, tous les clics sont comptés.
+Le script suit les redirections sans les exécuter et affiche :
+- la latence vue par le client (réseau local et HTTP compris) ;
+- le temps passé dans le serveur, lu dans l'histogramme Prometheus de
+  ``/metrics`` (moyenne et part des réponses sous 1 ms). L'objectif est une
+  moyenne inférieure à la milliseconde : ni Mongo ni sérialisation sur ce chemin.
+"""
+import argparse
+import os
+import sys
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import BASE_URL, print_summary, summarize, timed  # noqa: E402
+
+ROUTE = "/api/go/{offer_id}"
+METRICS_URL = BASE_URL.rsplit("/api", 1)[0] + "/metrics"
+
+
+def server_histogram(session):
+    """(somme, nombre, nombre <= 1 ms) de l'histogramme de latence de la route."""
+    total = count = under_ms = 0.0
+    label = f'method="GET",route="{ROUTE}"'
+    for line in session.get(METRICS_URL).text.splitlines():
+        if label not in line:
+            continue
+        name, _, value = line.rpartition(" ")
+        if name.startswith("http_request_duration_seconds_sum"):
+            total = float(value)
+        elif name.startswith("http_request_duration_seconds_count"):
+            count = float(value)
+        elif name.startswith("http_request_duration_seconds_bucket") and 'le="0.001"' in name:
+            under_ms = float(value)
+    return total, count, under_ms
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000, help="nombre de redirections mesurées")
+    args = parser.parse_args()
+
+    session = requests.Session()
+    offers = session.get(f"{BASE_URL}/offers").json()
+    if not offers:
+        sys.exit("Aucune offre : démarrer le serveur sur une base initialisée")
+    offer_ids = [offer["id"] for offer in offers]
+
+    before = server_histogram(session)
+    samples = []
+    for i in range(args.requests):
+        url = f"{BASE_URL}/go/{offer_ids[i % len(offer_ids)]}"
+        response, elapsed = timed(session.get, url, allow_redirects=False)
+        if response.status_code != 302:
+            sys.exit(f"Réponse inattendue {response.status_code} pour {url}")
+        samples.append(elapsed)
+    after = server_histogram(session)
+
+    print_summary("GET /api/go (client)", summarize(samples))
+    count = after[1] - before[1]
+    if count:
+        mean_ms = (after[0] - before[0]) / count * 1000
+        share = (after[2] - before[2]) / count
+        print(f"{'GET /api/go (serveur)':<32} count={count:.0f} mean_ms={mean_ms:.3f} under_1ms={share:.1%}")
+    else:
+        print("Histogramme serveur indisponible (/metrics)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Latence de GET /api/offers pendant une rafale concurrente de POST /api/click.
+
+Lance le serveur sans limitation de débit des clics (sinon la rafale ne mesure
+que des 429 et le script s'arrête) :
+
+    cd backend && CLICKS_RATE_PER_MINUTE=0 uvicorn server:app --port 8001
+    python benchmarks/bench_offers_under_click_load.py --clickers 32 --duration 15
+
+Le script mesure d'abord GET /api/offers au repos, puis pendant que ``--clickers``
+threads envoient des clics en continu. Avec un driver bloquant, le p99 sous charge
+explose car chaque requête Mongo gèle la boucle d'événements ; avec motor il doit
+rester proche de la valeur au repos.
+"""
+import argparse
+import os
+import sys
+import threading
+import time
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import BASE_URL, print_summary, summarize, timed  # noqa: E402
+
+
+def measure_offers(session, duration):
+    samples = []
+    deadline = time.perf_counter() + duration
+    while time.perf_counter() < deadline:
+        response, elapsed = timed(session.get, f"{BASE_URL}/offers")
+        response.raise_for_status()
+        samples.append(elapsed)
+    return samples
+
+
+def click_loop(offer_ids, stop, counter, failures):
+    session = requests.Session()
+    i = 0
+    while not stop.is_set():
+        offer_id = offer_ids[i % len(offer_ids)]
+        response = session.post(f"{BASE_URL}/click", json={"offer_id": offer_id, "user_ip": "bench"})
+        if not response.ok:
+            # Une 429 ou une 503 fausserait la mesure : on arrête la phase
+            failures.append(response.status_code)
+            stop.set()
+            return
+        counter.append(1)
+        i += 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clickers", type=int, default=32, help="threads envoyant des clics")
+    parser.add_argument("--duration", type=float, default=10.0, help="durée de chaque phase (s)")
+    args = parser.parse_args()
+
+    session = requests.Session()
+    offers = session.get(f"{BASE_URL}/offers").json()
+    if not offers:
+        sys.exit("Aucune offre : démarrer le serveur sur une base initialisée")
+    offer_ids = [offer["id"] for offer in offers]
+
+    idle = measure_offers(session, args.duration)
+    print_summary("GET /api/offers (repos)", summarize(idle))
+
+    stop = threading.Event()
+    clicks = []
+    failures = []
+    workers = [
+        threading.Thread(target=click_loop, args=(offer_ids, stop, clicks, failures), daemon=True)
+        for _ in range(args.clickers)
+    ]
+    for worker in workers:
+        worker.start()
+    try:
+        loaded = measure_offers(session, args.duration)
+    finally:
+        stop.set()
+        for worker in workers:
+            worker.join(timeout=5)
+    if failures:
+        sys.exit(f"POST /api/click a répondu {failures[0]} (CLICKS_RATE_PER_MINUTE=0 côté serveur ?)")
+
+    print_summary(f"GET /api/offers ({args.clickers} clickers)", summarize(loaded))
+    print(f"{'POST /api/click':<32} rps={len(clicks) / args.duration:.1f}")
+
+
+if __name__ == "__main__":
+    main()
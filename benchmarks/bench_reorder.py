@@ -0,0 +1,67 @@
+"""Coût de POST /api/calls/reorder sur une file de 500 calls.
+
+Lance le serveur sans limitation de débit (sinon seuls les premiers calls sont
+créés et le script s'arrête sur la première 429) :
+
+    cd backend && CALLS_RATE_PER_MINUTE=0 CALL_DUPLICATE_WINDOW_SECONDS=0 uvicorn server:app --port 8001
+    python benchmarks/bench_reorder.py --size 500 --rounds 20
+
+Le script vide la file, crée ``--size`` calls, puis mesure :
+- un réordonnancement complet (liste inversée, ids conservés) ;
+- un diff de ``--moves`` déplacements.
+La file est vidée à la fin.
+"""
+import argparse
+import os
+import random
+import sys
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import BASE_URL, print_summary, summarize, timed  # noqa: E402
+
+ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD", "admin123")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--size", type=int, default=500, help="taille de la file")
+    parser.add_argument("--rounds", type=int, default=20, help="mesures par scénario")
+    parser.add_argument("--moves", type=int, default=10, help="déplacements par diff")
+    args = parser.parse_args()
+
+    session = requests.Session()
+    session.post(f"{BASE_URL}/login", json={"password": ADMIN_PASSWORD}).raise_for_status()
+    session.post(f"{BASE_URL}/calls/reset").raise_for_status()
+    for i in range(args.size):
+        session.post(f"{BASE_URL}/calls", json={"slot": f"Slot {i}", "username": f"bench{i}"}).raise_for_status()
+    calls = session.get(f"{BASE_URL}/calls").json()["calls"]
+    if len(calls) != args.size:
+        sys.exit(f"File de {len(calls)} calls au lieu de {args.size}")
+
+    full = []
+    for _ in range(args.rounds):
+        calls.reverse()
+        response, elapsed = timed(session.post, f"{BASE_URL}/calls/reorder", json=calls)
+        response.raise_for_status()
+        full.append(elapsed)
+    print_summary(f"reorder complet ({len(calls)})", summarize(full))
+
+    diff = []
+    ids = [call["id"] for call in calls]
+    for _ in range(args.rounds):
+        moves = [
+            {"id": random.choice(ids), "after_id": random.choice(ids + [None])}
+            for _ in range(args.moves)
+        ]
+        response, elapsed = timed(session.post, f"{BASE_URL}/calls/reorder", json={"moves": moves})
+        response.raise_for_status()
+        diff.append(elapsed)
+    print_summary(f"reorder diff ({args.moves} moves)", summarize(diff))
+
+    session.post(f"{BASE_URL}/calls/reset").raise_for_status()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""Micro-benchmark de sérialisation JSON : encodeur de FastAPI contre orjson.
+
+Aucun serveur n'est nécessaire :
+
+    python benchmarks/bench_serialization.py --offers 50 --calls 500 --logs 1000
+
+Pour chaque charge utile (offres, file des calls, page de logs), compare :
+- ``before`` : ``jsonable_encoder`` + ``json.dumps``, le chemin par défaut
+  d'une route FastAPI qui renvoie un dict ;
+- ``after`` : ``orjson.dumps`` sur les documents projetés, comme le font
+  désormais ``OfferCatalog`` et les routes en ``ORJSONResponse``.
+"""
+import argparse
+import json
+import os
+import sys
+import uuid
+from datetime import datetime, timedelta
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import print_summary, summarize, timed  # noqa: E402
+
+
+def make_offers(count):
+    now = datetime.now()
+    return [{
+        "id": str(uuid.uuid4()),
+        "title": f"Casino {i}",
+        "image": f"https://example.com/offers/{i}.png",
+        "bonus": "100% jusqu'à 500€ + 200 free spins",
+        "link": f"https://example.com/go/{i}",
+        "tags": ["Nouveau", "Crypto", "Sans wager"][: i % 3 + 1],
+        "clicks": i * 37,
+        "created_at": now - timedelta(days=i),
+    } for i in range(count)]
+
+
+def make_calls(count):
+    return {"calls": [{"id": str(uuid.uuid4()), "slot": f"Slot {i}", "user": f"viewer{i}"} for i in range(count)]}
+
+
+def make_logs(count):
+    now = datetime.now()
+    return [{
+        "id": str(uuid.uuid4()),
+        "timestamp": now - timedelta(seconds=i),
+        "ip": f"10.0.{i % 256}.{i % 7}",
+        "slot": f"Slot {i % 300}",
+        "username": f"viewer{i % 1000}",
+        "action": "create_call",
+    } for i in range(count)]
+
+
+def before(payload):
+    return json.dumps(jsonable_encoder(payload), ensure_ascii=False, allow_nan=False,
+                      separators=(",", ":")).encode("utf-8")
+
+
+def after(payload):
+    return orjson.dumps(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--offers", type=int, default=50)
+    parser.add_argument("--calls", type=int, default=500)
+    parser.add_argument("--logs", type=int, default=1000)
+    parser.add_argument("--rounds", type=int, default=200, help="mesures par cas")
+    args = parser.parse_args()
+
+    payloads = {
+        "offers": make_offers(args.offers),
+        "calls": make_calls(args.calls),
+        "logs": make_logs(args.logs),
+    }
+    for name, payload in payloads.items():
+        # Les deux chemins doivent produire le même JSON
+        assert json.loads(before(payload)) == json.loads(after(payload)), name
+        medians = {}
+        for label, fn in (("before", before), ("after", after)):
+            samples = [timed(fn, payload)[1] for _ in range(args.rounds)]
+            summary = summarize(samples)
+            medians[label] = summary["p50_ms"]
+            print_summary(f"{name} {label}", summary)
+        if medians["after"]:
+            print(f"{name}: x{medians['before'] / medians['after']:.1f}")
+
+
+if __name__ == "__main__":
+    main()
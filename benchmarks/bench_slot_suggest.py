@@ -0,0 +1,72 @@
+"""Latence de l'autocomplétion des slots (``SlotIndex.suggest``) à 50k slots distincts.
+
+Aucun serveur n'est nécessaire :
+
+    python benchmarks/bench_slot_suggest.py --slots 50000 --queries 5000
+
+Le script remplit un index avec ``--slots`` noms synthétiques (popularités
+inégales, accents et casse variés), puis mesure des recherches de préfixes de
+1 à 8 caractères, deux fois : le premier passage calcule au premier accès le
+classement des préfixes très couverts (« b », « bo »…), le second mesure le
+régime établi. Objectif : p99 sous la milliseconde en régime établi. Avec
+``--base-url``, il mesure aussi GET /api/slots/suggest sur un serveur démarré.
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend"))
+from common import print_summary, summarize, timed  # noqa: E402
+from slot_index import SlotIndex  # noqa: E402
+
+WORDS = [
+    "big", "bass", "bonanza", "sweet", "bonanza", "gates", "olympus", "sugar", "rush", "wanted",
+    "dead", "wild", "book", "dead", "fire", "joker", "mega", "moolah", "starlight", "princess",
+    "dog", "house", "money", "train", "légende", "trésor", "éclair", "dragon", "gold", "fruit",
+]
+
+
+def make_names(count, rng):
+    names = set()
+    while len(names) < count:
+        words = rng.sample(WORDS, rng.randint(2, 4))
+        names.add(" ".join(words).title() + f" {rng.randint(1, 9999)}")
+    return list(names)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--slots", type=int, default=50000)
+    parser.add_argument("--queries", type=int, default=5000)
+    parser.add_argument("--base-url", help="mesurer aussi l'API (ex. http://localhost:8001/api)")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    names = make_names(args.slots, rng)
+    index = SlotIndex()
+    _, build = timed(lambda: [index.add(name, rng.randint(1, 50)) for name in names])
+    print(f"{'construction':<32} slots={len(index)} durée_s={build:.2f}")
+
+    prefixes = []
+    for _ in range(args.queries):
+        name = rng.choice(names)
+        word = rng.choice(name.split())
+        prefixes.append(word[:rng.randint(1, 8)].lower())
+    # Premier passage : classement des préfixes courants calculé au premier accès
+    for label in ("SlotIndex.suggest (à froid)", "SlotIndex.suggest"):
+        samples = [timed(index.suggest, prefix)[1] for prefix in prefixes]
+        print_summary(label, summarize(samples))
+
+    if args.base_url:
+        import requests
+
+        session = requests.Session()
+        http = [timed(session.get, f"{args.base_url}/slots/suggest", params={"q": prefix})[1]
+                for prefix in prefixes[:1000]]
+        print_summary("GET /api/slots/suggest", summarize(http))
+
+
+if __name__ == "__main__":
+    main()
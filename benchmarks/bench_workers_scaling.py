@@ -0,0 +1,102 @@
+"""Débit de l'API selon le nombre de workers uvicorn.
+
+Démarre ``backend/server.py`` avec WEB_CONCURRENCY = 1, 2, 4… jusqu'au nombre
+de cœurs (MONGO_URL doit pointer vers un mongod accessible), puis mesure le
+débit de GET /api/offers et GET /api/calls générés par ``--clients`` processus
+clients :
+
+    python benchmarks/bench_workers_scaling.py --duration 10 --clients 16
+
+Les limites de débit par IP sont désactivées pendant la mesure.
+"""
+import argparse
+import multiprocessing
+import os
+import subprocess
+import sys
+import time
+
+import requests
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+
+
+def wait_until_ready(base_url, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{base_url}/offers", timeout=1).status_code == 200:
+                return
+        except requests.RequestException:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("Le serveur n'a pas démarré à temps")
+
+
+def client_loop(base_url, duration, results):
+    session = requests.Session()
+    done = 0
+    paths = ("/offers", "/calls")
+    deadline = time.monotonic() + duration
+    while time.monotonic() < deadline:
+        session.get(f"{base_url}{paths[done % 2]}").raise_for_status()
+        done += 1
+    results.put(done)
+
+
+def measure(workers, port, clients, duration):
+    env = dict(
+        os.environ,
+        WEB_CONCURRENCY=str(workers),
+        PORT=str(port),
+        CALLS_RATE_PER_MINUTE="0",
+        CLICKS_RATE_PER_MINUTE="0",
+    )
+    server = subprocess.Popen(
+        [sys.executable, "server.py"], cwd=BACKEND_DIR, env=env,
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    base_url = f"http://127.0.0.1:{port}/api"
+    try:
+        wait_until_ready(base_url)
+        results = multiprocessing.Queue()
+        processes = [
+            multiprocessing.Process(target=client_loop, args=(base_url, duration, results))
+            for _ in range(clients)
+        ]
+        for process in processes:
+            process.start()
+        total = sum(results.get() for _ in processes)
+        for process in processes:
+            process.join()
+        return total / duration
+    finally:
+        server.terminate()
+        server.wait(timeout=15)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--duration", type=float, default=10.0, help="durée de chaque mesure (s)")
+    parser.add_argument("--clients", type=int, default=16, help="processus clients")
+    parser.add_argument("--port", type=int, default=8101, help="port du serveur de test")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    counts = []
+    workers = 1
+    while workers <= args.max_workers:
+        counts.append(workers)
+        workers *= 2
+    if counts[-1] != args.max_workers:
+        counts.append(args.max_workers)
+
+    baseline = None
+    for workers in counts:
+        rps = measure(workers, args.port, args.clients, args.duration)
+        baseline = baseline or rps
+        print(f"workers={workers:<3} rps={rps:9.1f} scaling={rps / baseline:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
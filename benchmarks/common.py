@@ -0,0 +1,41 @@
+"""Outils partagés par les scripts de benchmark (mesure de latence, percentiles)."""
+import math
+import os
+import time
+
+BASE_URL = os.environ.get("BENCH_BASE_URL", "http://localhost:8001/api")
+
+
+def percentile(samples, pct):
+    """Percentile par rang le plus proche sur une liste de durées (en secondes)."""
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(0, min(len(ordered) - 1, math.ceil(pct / 100.0 * len(ordered)) - 1))
+    return ordered[rank]
+
+
+def summarize(samples, elapsed=None):
+    """Résumé en millisecondes : count, p50, p95, p99, max (+ rps si elapsed est fourni)."""
+    summary = {
+        "count": len(samples),
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "max_ms": round(max(samples) * 1000, 3) if samples else 0.0,
+    }
+    if elapsed:
+        summary["rps"] = round(len(samples) / elapsed, 1)
+    return summary
+
+
+def timed(fn, *args, **kwargs):
+    """Exécute fn et renvoie (résultat, durée en secondes)."""
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def print_summary(label, summary):
+    parts = " ".join(f"{key}={value}" for key, value in summary.items())
+    print(f"{label:<32} {parts}")
@@ -0,0 +1,258 @@
+"""Suite de charge de l'API : mélange réaliste de trafic, percentiles par route, baseline.
+
+Démarre ``backend/server.py`` sur une base dédiée (``BENCH_DB_NAME``, par
+défaut casino_calls_bench ; le serveur n'utilise la variable que pour ça) puis
+simule pendant ``--duration`` secondes :
+- des spectateurs qui interrogent GET /api/offers et GET /api/calls ;
+- des rafales de clics sur POST /api/click ;
+- un admin qui réordonne la file des calls.
+
+Base Mongo : ``--mongo-url`` (mongod local), ou ``--inmemory`` pour lancer un
+mongod jetable via le paquet optionnel ``pymongo_inmemory`` (il télécharge le
+binaire au premier lancement). ``--base-url`` vise un serveur déjà démarré.
+
+    python benchmarks/suite.py --inmemory --output results.json
+    python benchmarks/suite.py --baseline benchmarks/baseline.json --check
+    python benchmarks/suite.py --baseline benchmarks/baseline.json --update-baseline
+
+Avec ``--check``, le code de sortie vaut 1 si une route régresse au-delà de la
+tolérance de la baseline (débit plus bas, p95/p99 plus hauts).
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import threading
+import time
+from collections import defaultdict
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+from common import print_summary, summarize  # noqa: E402
+
+BACKEND_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "backend")
+ADMIN_PASSWORD = os.environ.get("ADMIN_PASSWORD", "admin123")
+DEFAULT_TOLERANCE = 0.2
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def call(self, route, method, url, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = method(url, **kwargs)
+            ok = response.status_code < 400
+        except requests.RequestException:
+            response, ok = None, False
+        elapsed = time.perf_counter() - start
+        with self._lock:
+            if ok:
+                self.samples[route].append(elapsed)
+            else:
+                self.errors[route] += 1
+        return response
+
+
+def viewer(base_url, stop, recorder, poll_interval):
+    session = requests.Session()
+    while not stop.is_set():
+        recorder.call("GET /api/offers", session.get, f"{base_url}/offers")
+        recorder.call("GET /api/calls", session.get, f"{base_url}/calls")
+        if poll_interval:
+            stop.wait(poll_interval)
+
+
+def clicker(base_url, stop, recorder, offer_ids, burst_size, burst_pause):
+    session = requests.Session()
+    i = 0
+    while not stop.is_set():
+        for _ in range(burst_size):
+            offer_id = offer_ids[i % len(offer_ids)]
+            recorder.call("POST /api/click", session.post, f"{base_url}/click",
+                          json={"offer_id": offer_id, "user_ip": "bench"})
+            i += 1
+        stop.wait(burst_pause)
+
+
+def admin(base_url, stop, recorder, reorder_interval):
+    session = requests.Session()
+    session.post(f"{base_url}/login", json={"password": ADMIN_PASSWORD}).raise_for_status()
+    while not stop.is_set():
+        calls = session.get(f"{base_url}/calls").json()["calls"]
+        calls.reverse()
+        recorder.call("POST /api/calls/reorder", session.post, f"{base_url}/calls/reorder", json=calls)
+        stop.wait(reorder_interval)
+
+
+def prepare(base_url, queue_size):
+    session = requests.Session()
+    session.post(f"{base_url}/login", json={"password": ADMIN_PASSWORD}).raise_for_status()
+    session.post(f"{base_url}/calls/reset").raise_for_status()
+    for i in range(queue_size):
+        session.post(f"{base_url}/calls", json={"slot": f"Slot {i}", "username": f"viewer{i}"})
+    return [offer["id"] for offer in session.get(f"{base_url}/offers").json()]
+
+
+def run_mix(base_url, args):
+    offer_ids = prepare(base_url, args.queue_size)
+    recorder = Recorder()
+    stop = threading.Event()
+    threads = [threading.Thread(target=viewer, args=(base_url, stop, recorder, args.poll_interval))
+               for _ in range(args.viewers)]
+    threads += [threading.Thread(target=clicker, args=(base_url, stop, recorder, offer_ids,
+                                                       args.burst_size, args.burst_pause))
+                for _ in range(args.clickers)]
+    threads += [threading.Thread(target=admin, args=(base_url, stop, recorder, args.reorder_interval))
+                for _ in range(args.admins)]
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.duration)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    routes = {}
+    for route in sorted(set(recorder.samples) | set(recorder.errors)):
+        routes[route] = summarize(recorder.samples[route], elapsed)
+        routes[route]["errors"] = recorder.errors[route]
+    return {
+        "duration_s": round(elapsed, 1),
+        "mix": {"viewers": args.viewers, "clickers": args.clickers, "admins": args.admins,
+                "queue_size": args.queue_size},
+        "routes": routes,
+    }
+
+
+def compare(results, baseline):
+    """Régressions de ``results`` par rapport à ``baseline`` (liste de messages)."""
+    tolerance = baseline.get("tolerance", DEFAULT_TOLERANCE)
+    regressions = []
+    for route, expected in baseline.get("routes", {}).items():
+        actual = results["routes"].get(route)
+        if actual is None:
+            regressions.append(f"{route}: absente des résultats")
+            continue
+        if "rps" in expected and actual.get("rps", 0) < expected["rps"] * (1 - tolerance):
+            regressions.append(f"{route}: rps {actual.get('rps')} < {expected['rps']} (-{tolerance:.0%})")
+        for key in ("p95_ms", "p99_ms"):
+            if key in expected and actual[key] > expected[key] * (1 + tolerance):
+                regressions.append(f"{route}: {key} {actual[key]} > {expected[key]} (+{tolerance:.0%})")
+    return regressions
+
+
+def start_server(mongo_url, port):
+    env = dict(
+        os.environ,
+        MONGO_URL=mongo_url,
+        BENCH_DB_NAME=os.environ.get("BENCH_DB_NAME", "casino_calls_bench"),
+        PORT=str(port),
+        CALLS_RATE_PER_MINUTE="0",
+        CLICKS_RATE_PER_MINUTE="0",
+        CALL_DUPLICATE_WINDOW_SECONDS="0",
+    )
+    process = subprocess.Popen([sys.executable, "server.py"], cwd=BACKEND_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}/api"
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            if requests.get(f"{base_url}/offers", timeout=1).status_code == 200:
+                return process, base_url
+        except requests.RequestException:
+            pass
+        if process.poll() is not None:
+            break
+        time.sleep(0.2)
+    process.terminate()
+    raise RuntimeError("Le serveur n'a pas démarré (MONGO_URL joignable ?)")
+
+
+def start_inmemory_mongo():
+    try:
+        from pymongo_inmemory import Context, Mongod
+    except ImportError:
+        sys.exit("--inmemory nécessite le paquet pymongo_inmemory (pip install pymongo_inmemory)")
+    mongod = Mongod(Context())
+    mongod.start()
+    return mongod
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    target = parser.add_mutually_exclusive_group()
+    target.add_argument("--base-url", help="serveur déjà démarré (ex. http://localhost:8001/api)")
+    target.add_argument("--inmemory", action="store_true", help="mongod jetable via pymongo_inmemory")
+    parser.add_argument("--mongo-url", default=os.environ.get("MONGO_URL", "mongodb://localhost:27017/"))
+    parser.add_argument("--port", type=int, default=8102)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--viewers", type=int, default=32)
+    parser.add_argument("--poll-interval", type=float, default=0.0, help="pause entre deux sondages (s)")
+    parser.add_argument("--clickers", type=int, default=4)
+    parser.add_argument("--burst-size", type=int, default=20)
+    parser.add_argument("--burst-pause", type=float, default=0.5)
+    parser.add_argument("--admins", type=int, default=1)
+    parser.add_argument("--reorder-interval", type=float, default=2.0)
+    parser.add_argument("--queue-size", type=int, default=50)
+    parser.add_argument("--output", help="fichier JSON des résultats")
+    parser.add_argument("--baseline", default=os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json"))
+    parser.add_argument("--check", action="store_true", help="échouer si régression par rapport à la baseline")
+    parser.add_argument("--update-baseline", action="store_true", help="écrire les résultats comme nouvelle baseline")
+    args = parser.parse_args()
+
+    mongod = server = None
+    try:
+        if args.base_url:
+            base_url = args.base_url
+        else:
+            if args.inmemory:
+                mongod = start_inmemory_mongo()
+                args.mongo_url = mongod.connection_string
+            server, base_url = start_server(args.mongo_url, args.port)
+        results = run_mix(base_url, args)
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait(timeout=15)
+        if mongod is not None:
+            mongod.stop()
+
+    for route, summary in results["routes"].items():
+        print_summary(route, summary)
+    if args.output:
+        with open(args.output, "w") as handle:
+            json.dump(results, handle, indent=2)
+
+    if args.update_baseline:
+        baseline = {
+            "tolerance": DEFAULT_TOLERANCE,
+            "mix": results["mix"],
+            "routes": {
+                route: {key: summary[key] for key in ("rps", "p50_ms", "p95_ms", "p99_ms")}
+                for route, summary in results["routes"].items()
+            },
+        }
+        with open(args.baseline, "w") as handle:
+            json.dump(baseline, handle, indent=2)
+        print(f"Baseline écrite dans {args.baseline}")
+    elif args.check:
+        if not os.path.exists(args.baseline):
+            sys.exit(f"Baseline introuvable : {args.baseline} (la créer avec --update-baseline)")
+        with open(args.baseline) as handle:
+            regressions = compare(results, json.load(handle))
+        for message in regressions:
+            print(f"RÉGRESSION {message}")
+        if regressions:
+            sys.exit(1)
+        print("Aucune régression par rapport à la baseline")
+
+
+if __name__ == "__main__":
+    main()
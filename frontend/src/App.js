@@ -26,16 +26,44 @@ const App = () => {
     slot: '',
     username: ''
   });
+  const [slotSuggestions, setSlotSuggestions] = useState([]);
 
   const BACKEND_URL = process.env.REACT_APP_BACKEND_URL || 'http://localhost:8001';
 
   useEffect(() => {
-    loadOffers();
-    loadCalls();
+    loadBootstrap();
     checkAdminStatus();
     setupEventSource();
   }, []);
 
+  // Offres et calls en une seule requête (réponse pré-compressée côté serveur)
+  const loadBootstrap = async () => {
+    try {
+      const response = await fetch(`${BACKEND_URL}/api/bootstrap`);
+      const data = await response.json();
+      setOffers(data.offers);
+      setCalls(data.calls);
+    } catch (error) {
+      console.error('Erreur lors du chargement initial:', error);
+    }
+  };
+
+  // Autocomplétion du nom de slot (index de préfixes côté serveur)
+  const handleSlotChange = async (value) => {
+    setCallForm((form) => ({...form, slot: value}));
+    if (value.trim().length < 2) {
+      setSlotSuggestions([]);
+      return;
+    }
+    try {
+      const response = await fetch(`${BACKEND_URL}/api/slots/suggest?q=${encodeURIComponent(value)}&limit=8`);
+      const data = await response.json();
+      setSlotSuggestions(data.suggestions.map((suggestion) => suggestion.slot));
+    } catch (error) {
+      console.error('Erreur lors de la suggestion de slots:', error);
+    }
+  };
+
   const loadOffers = async () => {
     try {
       const response = await fetch(`${BACKEND_URL}/api/offers`);
@@ -62,11 +90,31 @@ const App = () => {
   };
 
   const setupEventSource = () => {
-    const eventSource = new EventSource(`${BACKEND_URL}/api/calls`);
-    eventSource.onmessage = (event) => {
-      const data = JSON.parse(event.data);
-      setCalls(data.calls);
-    };
+    // Flux SSE : instantané initial puis événements incrémentaux
+    // (le navigateur renvoie Last-Event-ID tout seul à la reconnexion)
+    const eventSource = new EventSource(`${BACKEND_URL}/api/calls/stream`);
+    const replaceCalls = (event) => setCalls(JSON.parse(event.data).calls);
+    eventSource.addEventListener('snapshot', replaceCalls);
+    eventSource.addEventListener('reorder', replaceCalls);
+    eventSource.addEventListener('reset', () => setCalls([]));
+    eventSource.addEventListener('add', (event) => {
+      const { call } = JSON.parse(event.data);
+      setCalls(prev => [...prev, call]);
+    });
+    eventSource.addEventListener('delete', (event) => {
+      const { id } = JSON.parse(event.data);
+      setCalls(prev => prev.filter(call => call.id !== id));
+    });
+    eventSource.addEventListener('move', (event) => {
+      const { id, after_id } = JSON.parse(event.data);
+      setCalls(prev => {
+        const moved = prev.filter(call => call.id === id);
+        const rest = prev.filter(call => call.id !== id);
+        const index = after_id ? rest.findIndex(call => call.id === after_id) : -1;
+        const at = after_id && index === -1 ? rest.length : index + 1;
+        return [...rest.slice(0, at), ...moved, ...rest.slice(at)];
+      });
+    });
     return () => eventSource.close();
   };
 
@@ -160,22 +208,11 @@ const App = () => {
     }
   };
 
-  const handleOfferClick = async (offerId) => {
-    try {
-      await fetch(`${BACKEND_URL}/api/click`, {
-        method: 'POST',
-        headers: { 'Content-Type': 'application/json' },
-        body: JSON.stringify({ offer_id: offerId, user_ip: 'web' })
-      });
-    } catch (error) {
-      console.error('Erreur lors du tracking du clic:', error);
-    }
-  };
-
-  const deleteCall = async (index) => {
+  const deleteCall = async (call, index) => {
     if (!isAdmin) return;
     try {
-      await fetch(`${BACKEND_URL}/api/calls/${index}`, {
+      const url = call.id ? `${BACKEND_URL}/api/calls/by-id/${call.id}` : `${BACKEND_URL}/api/calls/${index}`;
+      await fetch(url, {
         method: 'DELETE',
         credentials: 'include'
       });
@@ -290,8 +327,8 @@ const App = () => {
               className="rounded-xl shadow-2xl p-6 transform hover:scale-105 transition-all duration-300 cursor-pointer"
               style={{ background: offer.color }}
               onClick={() => {
-                handleOfferClick(offer.id);
-                window.open(offer.link, '_blank');
+                // Le backend compte le clic et redirige (302) vers le lien de l'offre
+                window.open(`${BACKEND_URL}/api/go/${offer.id}`, '_blank');
               }}
             >
               <div className="flex items-center gap-3 mb-4">
@@ -364,10 +401,17 @@ const App = () => {
                 type="text"
                 placeholder="Nom de la slot"
                 value={callForm.slot}
-                onChange={(e) => setCallForm({...callForm, slot: e.target.value})}
+                onChange={(e) => handleSlotChange(e.target.value)}
+                list="slot-suggestions"
+                maxLength={100}
                 className="w-full pl-10 pr-4 py-3 rounded-lg bg-gray-800 text-white border border-gray-700 focus:ring-2 focus:ring-blue-500 focus:border-transparent"
                 required
               />
+              <datalist id="slot-suggestions">
+                {slotSuggestions.map((slot) => (
+                  <option key={slot} value={slot} />
+                ))}
+              </datalist>
               <span className="absolute left-3 top-3 text-lg">🎰</span>
             </div>
             <div className="relative flex-1">
@@ -376,6 +420,7 @@ const App = () => {
                 placeholder="Ton pseudo"
                 value={callForm.username}
                 onChange={(e) => setCallForm({...callForm, username: e.target.value})}
+                maxLength={50}
                 className="w-full pl-10 pr-4 py-3 rounded-lg bg-gray-800 text-white border border-gray-700 focus:ring-2 focus:ring-blue-500 focus:border-transparent"
                 required
               />
@@ -413,7 +458,7 @@ const App = () => {
               </div>
               {isAdmin && (
                 <button
-                  onClick={() => deleteCall(index)}
+                  onClick={() => deleteCall(call, index)}
                   className="bg-red-600 hover:bg-red-700 px-4 py-2 rounded-lg text-white font-bold transition"
                 >
                   Supprimer
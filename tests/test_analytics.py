@@ -0,0 +1,65 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from analytics import GRANULARITIES, cover_range, floor_bucket, naive_local, rollup_operations
+
+
+@pytest.mark.parametrize("start, end", [
+    (datetime(2026, 10, 17, 23, 58, 30), datetime(2026, 10, 19, 1, 2, 15)),
+    (datetime(2026, 10, 17, 10, 0), datetime(2026, 10, 17, 10, 45)),
+    (datetime(2026, 10, 17), datetime(2026, 10, 20)),
+    (datetime(2026, 10, 17, 10, 5), datetime(2026, 10, 17, 10, 5, 30)),
+])
+def test_cover_range_is_contiguous_and_aligned(start, end):
+    segments = cover_range(start, end)
+    assert segments[0][1] == start and segments[-1][2] == end
+    for (_, _, previous_end), (_, next_start, _) in zip(segments, segments[1:]):
+        assert previous_end == next_start
+    # Au plus : minutes, heures, jours, heures, minutes
+    assert len(segments) <= 5
+    for granularity, segment_start, segment_end in segments[1:-1]:
+        assert floor_bucket(segment_start, granularity) == segment_start
+        assert floor_bucket(segment_end, granularity) == segment_end
+
+
+def test_cover_range_uses_the_coarsest_granularity():
+    start, end = datetime(2026, 10, 17, 22, 30), datetime(2026, 10, 19, 2, 0)
+    assert cover_range(start, end) == [
+        ("minute", start, datetime(2026, 10, 17, 23, 0)),
+        ("hour", datetime(2026, 10, 17, 23, 0), datetime(2026, 10, 18)),
+        ("day", datetime(2026, 10, 18), datetime(2026, 10, 19)),
+        ("hour", datetime(2026, 10, 19), end),
+    ]
+
+
+def test_cover_range_empty_interval():
+    moment = datetime(2026, 10, 17, 12)
+    assert cover_range(moment, moment) == []
+    assert cover_range(moment, moment - timedelta(minutes=1)) == []
+
+
+def test_naive_local_converts_aware_datetimes():
+    aware = datetime(2026, 10, 17, tzinfo=timezone.utc)
+    assert naive_local(aware) == datetime.fromtimestamp(aware.timestamp())
+    assert naive_local(aware).tzinfo is None
+    naive = datetime(2026, 10, 17, 8)
+    assert naive_local(naive) is naive
+    assert naive_local(None) is None
+
+
+def test_rollup_operations_count_each_granularity():
+    clicks = [
+        {"offer_id": "a", "timestamp": datetime(2026, 10, 17, 10, 1, 5)},
+        {"offer_id": "a", "timestamp": datetime(2026, 10, 17, 10, 1, 50)},
+        {"offer_id": "a", "timestamp": datetime(2026, 10, 17, 10, 2)},
+    ]
+    increments = {
+        (op._filter["granularity"], op._filter["bucket"]): op._doc["$inc"]["count"]
+        for op in rollup_operations(clicks)
+    }
+    assert len(increments) == 2 + 1 + 1
+    assert increments[("minute", datetime(2026, 10, 17, 10, 1))] == 2
+    assert increments[("hour", datetime(2026, 10, 17, 10))] == 3
+    assert increments[("day", datetime(2026, 10, 17))] == 3
+    assert set(GRANULARITIES) == {granularity for granularity, _ in increments}
@@ -0,0 +1,173 @@
+import asyncio
+
+import pytest
+from pymongo.errors import AutoReconnect, DocumentTooLarge
+
+import batching
+from calls_order import MIN_RANK_GAP, RANK_STEP
+from calls_queue import CallRecord, CallsQueue, JournalFull
+
+
+def make_queue(records=(), queue_size=10000):
+    queue = CallsQueue(None, queue_size=queue_size)
+    queue._replace_records(list(records))
+    return queue
+
+
+def ids(queue):
+    return [call["id"] for call in queue.snapshot()]
+
+
+def test_add_appends_with_increasing_ranks():
+    queue = make_queue()
+    first = queue.add("Big Bass", "a")
+    second = queue.add("Sweet Bonanza", "b")
+    assert second.rank == first.rank + RANK_STEP
+    assert ids(queue) == [first.id, second.id]
+    assert queue.queue_depth == 2
+
+
+def test_concurrent_adds_on_two_workers_converge():
+    # Deux workers ajoutent au même moment : même rank, l'id départage
+    worker_a, worker_b = make_queue(), make_queue()
+    x = worker_a.add("X", "a")
+    y = worker_b.add("Y", "b")
+    assert x.rank == y.rank
+    worker_a.apply_remote("add", {"call": y.to_event()}, {y.id: y.rank})
+    worker_b.apply_remote("add", {"call": x.to_event()}, {x.id: x.rank})
+    assert ids(worker_a) == ids(worker_b) == sorted([x.id, y.id])
+    assert worker_a.delete_at(0).id == worker_b.delete_at(0).id
+
+
+def test_move_takes_midpoint_and_journals_one_operation():
+    queue = make_queue()
+    a, b, c = (queue.add(slot, "u") for slot in "abc")
+    depth = queue.queue_depth
+    ranks = queue.move(c.id, a.id)
+    assert ids(queue) == [a.id, c.id, b.id]
+    assert ranks == {c.id: (a.rank + b.rank) / 2}
+    assert queue.queue_depth == depth + 1
+
+
+def test_move_renumbers_when_gap_is_exhausted():
+    a, b, c = (CallRecord(call_id, call_id, "u", rank) for call_id, rank in
+               (("a", 1.0), ("b", 1.0 + MIN_RANK_GAP / 2), ("c", 2.0)))
+    queue = make_queue([a, b, c])
+    ranks = queue.move("c", "a")
+    assert ids(queue) == ["a", "c", "b"]
+    assert ranks == {"a": RANK_STEP, "c": 2 * RANK_STEP, "b": 3 * RANK_STEP}
+    assert queue.queue_depth == 3
+
+
+def test_move_rejected_by_full_journal_leaves_queue_unchanged():
+    queue = make_queue(queue_size=3)
+    a, b, c = (queue.add(slot, "u") for slot in "abc")
+    with pytest.raises(JournalFull):
+        queue.move(c.id, None)
+    assert ids(queue) == [a.id, b.id, c.id]
+    assert c.rank == 3 * RANK_STEP
+
+
+def test_replace_keeps_known_ids_and_generates_the_others():
+    queue = make_queue()
+    kept = queue.add("a", "u")
+    records = queue.replace([
+        {"id": "inconnu", "slot": "b", "username": "v"},
+        {"id": kept.id, "slot": "a", "username": "u"},
+        {"slot": "c", "username": "w"},
+    ])
+    assert records[1].id == kept.id and records[1].created_at == kept.created_at
+    assert records[0].id != "inconnu" and records[2].id
+    assert [record.rank for record in records] == [RANK_STEP, 2 * RANK_STEP, 3 * RANK_STEP]
+    assert len(queue) == 3 and all(record.id in queue for record in records)
+
+
+def test_replace_rejects_duplicate_ids():
+    queue = make_queue()
+    call = queue.add("a", "u")
+    depth = queue.queue_depth
+    with pytest.raises(ValueError):
+        queue.replace([{"id": call.id, "slot": "a", "username": "u"}] * 2)
+    assert ids(queue) == [call.id]
+    assert queue.queue_depth == depth
+
+
+class FlakyCollection:
+    """``bulk_write`` qui lève ``failures`` erreurs transitoires, puis refuse les opérations ``rejected``."""
+
+    def __init__(self, failures=0, rejected=(), docs=()):
+        self.failures = failures
+        self.rejected = set(rejected)
+        self.docs = list(docs)
+        self.batches = []
+
+    async def bulk_write(self, batch, ordered):
+        if self.failures:
+            self.failures -= 1
+            raise AutoReconnect("mongo indisponible")
+        if self.rejected.intersection(batch):
+            raise DocumentTooLarge("document trop grand")
+        self.batches.append(batch)
+
+    def find(self, *args, **kwargs):
+        return Cursor(self.docs)
+
+
+class Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, *args):
+        return self
+
+    async def to_list(self, length=None):
+        return list(self.docs)
+
+
+@pytest.fixture
+def no_sleep(monkeypatch):
+    async def sleep(seconds):
+        pass
+    monkeypatch.setattr(batching.asyncio, "sleep", sleep)
+
+
+def test_journal_batch_is_retried_until_written(no_sleep):
+    collection = FlakyCollection(failures=batching.STOP_FLUSH_RETRIES * 3)
+    queue = CallsQueue(collection)
+    asyncio.run(queue._safe_flush(["op"]))
+    assert collection.batches == [["op"]]
+
+
+def test_journal_gives_up_only_when_stopping(no_sleep):
+    collection = FlakyCollection(failures=batching.STOP_FLUSH_RETRIES)
+    queue = CallsQueue(collection)
+    queue._stopping = True
+    asyncio.run(queue._safe_flush(["op"]))
+    assert collection.batches == []
+    assert queue.metrics()["failed_batches"] == 1
+
+
+def test_rejected_operation_is_dropped_and_queue_resynced():
+    resynced = []
+    collection = FlakyCollection(rejected={"trop-grand"},
+                                 docs=[{"id": "a", "slot": "Big Bass", "username": "u", "rank": RANK_STEP}])
+    queue = CallsQueue(collection, on_resync=resynced.append)
+    queue._replace_records([CallRecord("a", "Big Bass", "u", RANK_STEP), CallRecord("b", "x" * 100, "v", 2 * RANK_STEP)])
+    asyncio.run(queue._safe_flush(["op-1", "trop-grand", "op-2"]))
+    # Les autres opérations du lot sont écrites, la file revient à l'état de Mongo
+    assert collection.batches == [["op-1"], ["op-2"]]
+    assert ids(queue) == ["a"]
+    assert [record.id for record in resynced[0]] == ["a"]
+    assert queue.metrics()["rejected_operations"] == 1
+    assert queue.metrics()["failed_batches"] == 0
+
+
+def test_resync_waits_for_an_empty_journal():
+    collection = FlakyCollection(rejected={"trop-grand"})
+    queue = make_queue([CallRecord("a", "Big Bass", "u", RANK_STEP)])
+    queue.collection = collection
+    queue.add("Sweet Bonanza", "v")
+    asyncio.run(queue._safe_flush(["trop-grand"]))
+    # Le call ajouté n'est pas encore écrit : la relecture l'aurait effacé
+    assert len(queue) == 2
+    assert queue._resync_pending
@@ -0,0 +1,60 @@
+import asyncio
+
+from calls_stream import CallsHub
+
+
+class Calls:
+    def __init__(self):
+        self.calls = [{"id": "a"}]
+
+    async def ensure_loaded(self):
+        pass
+
+    def snapshot(self):
+        return list(self.calls)
+
+
+def first_messages(hub, last_event_id, count):
+    """Messages envoyés à la connexion, avant tout événement publié ensuite."""
+    async def collect():
+        stream = hub.stream(last_event_id)
+        messages = [await stream.__anext__() for _ in range(count)]
+        await stream.aclose()
+        return messages
+
+    return asyncio.run(collect())
+
+
+def events(messages):
+    return [message.split(b"\n")[1].decode() for message in messages if message.startswith(b"id: ")]
+
+
+def test_reconnection_replays_only_missed_events():
+    hub = CallsHub(Calls())
+    hub.publish("add", {"call": {"id": "b"}})
+    last_seen = hub.last_event_id
+    hub.publish("delete", {"id": "a"})
+    hub.publish("move", {"id": "b"})
+    retry, *missed = first_messages(hub, last_seen, 3)
+    assert retry == b"retry: 3000\n\n"
+    assert events(missed) == ["event: delete", "event: move"]
+    assert missed[-1].startswith(f"id: {hub.last_event_id}\n".encode())
+
+
+def test_up_to_date_client_receives_nothing_before_new_events():
+    hub = CallsHub(Calls(), heartbeat_interval=0.01)
+    hub.publish("add", {"call": {"id": "b"}})
+    assert first_messages(hub, hub.last_event_id, 2) == [b"retry: 3000\n\n", b": ping\n\n"]
+
+
+def test_unknown_or_expired_event_id_gets_a_snapshot():
+    hub = CallsHub(Calls(), history_size=2)
+    first = hub.last_event_id
+    for _ in range(3):
+        hub.publish("reorder", {"calls": []})
+    # Trop en retard, autre processus (époque différente), identifiant absent ou invalide
+    for last_event_id in (first, "autre:1", None, "n'importe quoi"):
+        _, message = first_messages(hub, last_event_id, 2)
+        assert events([message]) == ["event: snapshot"]
+        assert message.startswith(f"id: {hub.last_event_id}\n".encode())
+        assert b'"calls":[{"id":"a"}]' in message
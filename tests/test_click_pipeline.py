@@ -0,0 +1,115 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+import batching
+from batching import DUPLICATE_KEY, bulk_write_once, insert_many_once
+from click_pipeline import ClickPipeline
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    real_sleep = asyncio.sleep
+
+    async def sleep(seconds):
+        await real_sleep(0)
+    monkeypatch.setattr(batching.asyncio, "sleep", sleep)
+
+
+class Collection:
+    """Collection factice : enregistre les appels, lève ``failures`` erreurs avant de réussir."""
+
+    def __init__(self, failures=()):
+        self.failures = list(failures)
+        self.calls = []
+
+    def _call(self, name, payload):
+        self.calls.append((name, payload))
+        if self.failures:
+            raise self.failures.pop(0)
+
+    async def insert_many(self, docs, ordered=True):
+        self._call("insert_many", docs)
+
+    async def bulk_write(self, operations, ordered=True):
+        self._call("bulk_write", operations)
+
+    async def find_one(self, *args, **kwargs):
+        self._call("find_one", args)
+
+    async def insert_one(self, doc):
+        self._call("insert_one", doc)
+
+
+def duplicate_error(*indexes):
+    return BulkWriteError({"writeErrors": [{"index": index, "code": DUPLICATE_KEY} for index in indexes]})
+
+
+def clicks(count, offer_id="a"):
+    return [{"id": f"click-{i}", "offer_id": offer_id, "user_ip": "10.0.0.1", "timestamp": datetime(2024, 5, 1, 12)}
+            for i in range(count)]
+
+
+def make_pipeline(rollups_failures=(), **kwargs):
+    collections = {
+        "clicks": Collection(),
+        "offers": Collection(),
+        "rollups": Collection(rollups_failures),
+        "sketches": Collection(),
+    }
+    flushed = []
+    pipeline = ClickPipeline(collections["clicks"], collections["offers"], collections["rollups"],
+                             collections["sketches"], on_flushed=flushed.append, **kwargs)
+    return pipeline, collections, flushed
+
+
+def test_transient_failure_resumes_at_the_failed_step():
+    pipeline, collections, flushed = make_pipeline(rollups_failures=[AutoReconnect("élection")])
+    asyncio.run(pipeline._safe_flush(clicks(3)))
+    # Insertion et $inc des offres ne sont pas rejoués ; seul le bulk_write des tranches l'est
+    assert len(collections["clicks"].calls) == 1
+    assert len(collections["offers"].calls) == 1
+    assert len(collections["rollups"].calls) == 2
+    assert flushed == [{"a": 3}]
+    assert pipeline.metrics()["retries"] == 1
+    assert pipeline.metrics()["failed_batches"] == 0
+
+
+def test_writes_are_keyed_by_the_batch():
+    pipeline, collections, _ = make_pipeline()
+    batch = clicks(2)
+    asyncio.run(pipeline._safe_flush(batch))
+    inserted = collections["clicks"].calls[0][1]
+    assert all("_id" in doc for doc in inserted)
+    (update,) = collections["offers"].calls[0][1]
+    assert update._filter == {"id": "a", "click_batches": {"$ne": "click-0"}}
+    assert update._doc["$inc"] == {"clicks": 2}
+    assert all(op._filter["click_batches"] == {"$ne": "click-0"} for op in collections["rollups"].calls[0][1])
+
+
+def test_other_errors_drop_the_batch_and_notify():
+    dropped = []
+    pipeline, _, flushed = make_pipeline(rollups_failures=[ValueError("document invalide")],
+                                         on_dropped=dropped.append)
+    batch = clicks(1)
+    asyncio.run(pipeline._safe_flush(batch))
+    assert dropped == [batch]
+    assert flushed == []
+    assert pipeline.metrics()["failed_batches"] == 1
+
+
+def test_insert_many_once_ignores_documents_already_inserted():
+    collection = Collection([duplicate_error(0, 2)])
+    asyncio.run(insert_many_once(collection, [{"_id": 1}, {"_id": 2}, {"_id": 3}]))
+    with pytest.raises(BulkWriteError):
+        asyncio.run(insert_many_once(Collection([BulkWriteError({"writeErrors": [{"index": 0, "code": 121}]})]),
+                                     [{"_id": 1}]))
+
+
+def test_bulk_write_once_replays_duplicate_upserts_once():
+    collection = Collection([duplicate_error(1), duplicate_error(0)])
+    asyncio.run(bulk_write_once(collection, ["a", "b", "c"]))
+    # Second refus : le lot était déjà appliqué à ce document
+    assert [operations for _, operations in collection.calls] == [["a", "b", "c"], ["b"]]
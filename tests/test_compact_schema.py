@@ -0,0 +1,72 @@
+import uuid
+
+from bson.binary import UUID_SUBTYPE, Binary
+
+from compact_schema import CLICKS_COMPACT, LEGACY, LOGS_COMPACT, StorageSettings
+
+CLICK_ID = "0b5ad2de-8e1a-4c55-9c6e-2f0e4e3c8a11"
+OFFER_ID = "6f1c2a44-3b7d-4e0f-8a5b-91c2d3e4f5a6"
+
+
+def click(**overrides):
+    return {"_id": 1, "id": CLICK_ID, "offer_id": OFFER_ID, "user_ip": "203.0.113.7",
+            "timestamp": "2024-06-01T12:00:00", **overrides}
+
+
+def test_click_round_trips_through_the_compact_format():
+    stored = CLICKS_COMPACT.encode(click())
+    assert set(stored) == {"_id", "i", "o", "ip", "t"}
+    assert isinstance(stored["i"], Binary) and stored["i"].subtype == UUID_SUBTYPE
+    assert stored["ip"] == bytes([203, 0, 113, 7])
+    # pymongo relit un Binary de sous-type 0 en bytes : le décodage part de là
+    assert CLICKS_COMPACT.decode(stored) == click()
+
+
+def test_log_round_trips_with_an_ipv6_address():
+    log = {"_id": 2, "id": CLICK_ID, "timestamp": "2024-06-01T12:00:00", "action": "call_created",
+           "slot": "Big Bass", "username": "bob", "ip": "2001:db8::1"}
+    stored = LOGS_COMPACT.encode(log)
+    assert len(stored["ip"]) == 16
+    assert stored["a"] == "call_created"
+    assert LOGS_COMPACT.decode(stored) == log
+
+
+def test_values_that_do_not_pack_losslessly_stay_text():
+    # id non UUID, UUID en majuscules, IP invalide, IPv6 non canonique
+    odd = click(id="legacy-42", offer_id=OFFER_ID.upper(), user_ip="unknown")
+    stored = CLICKS_COMPACT.encode(odd)
+    assert (stored["i"], stored["o"], stored["ip"]) == ("legacy-42", OFFER_ID.upper(), "unknown")
+    assert CLICKS_COMPACT.decode(stored) == odd
+    assert LOGS_COMPACT.encode({"ip": "2001:DB8::1"})["ip"] == "2001:DB8::1"
+
+
+def test_legacy_documents_are_decoded_unchanged():
+    assert CLICKS_COMPACT.decode(click()) == click()
+    assert LEGACY.encode(click()) == LEGACY.decode(click()) == click()
+
+
+def test_filter_translates_fields_and_encodes_values():
+    query = CLICKS_COMPACT.filter({
+        "offer_id": OFFER_ID,
+        "timestamp": {"$gte": "2024-06-01"},
+        "$or": [{"user_ip": {"$in": ["203.0.113.7", "unknown"]}}, {"id": CLICK_ID}],
+    })
+    assert query == {
+        "o": Binary.from_uuid(uuid.UUID(OFFER_ID)),
+        "t": {"$gte": "2024-06-01"},
+        "$or": [{"ip": {"$in": [bytes([203, 0, 113, 7]), "unknown"]}},
+                {"i": CLICKS_COMPACT.encode({"id": CLICK_ID})["i"]}],
+    }
+    assert LEGACY.filter({"offer_id": OFFER_ID}) == {"offer_id": OFFER_ID}
+
+
+def test_sort_and_projection_use_stored_names():
+    assert LOGS_COMPACT.sort([("timestamp", -1), ("_id", -1)]) == [("t", -1), ("_id", -1)]
+    assert LOGS_COMPACT.projection({"_id": 0, "username": 1}) == {"_id": 0, "u": 1}
+    assert LEGACY.sort([("timestamp", -1)]) == [("timestamp", -1)]
+
+
+def test_storage_settings_pick_the_schemas():
+    settings = StorageSettings("compact", "clicks_compact", "logs_compact")
+    assert (settings.clicks_schema, settings.logs_schema) == (CLICKS_COMPACT, LOGS_COMPACT)
+    assert StorageSettings().clicks_schema is LEGACY
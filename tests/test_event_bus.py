@@ -0,0 +1,103 @@
+import asyncio
+
+from calls_queue import CallRecord, CallsQueue
+from event_bus import EventBus
+
+
+class TailableCursor:
+    """Curseur « tailable » factice : relit les documents ajoutés depuis son dernier passage."""
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.position = 0
+        self.alive = True
+
+    def sort(self, *args):
+        return self
+
+    def limit(self, count):
+        return self
+
+    async def to_list(self, length=None):
+        # Seule utilisation hors suivi : le dernier message en ordre naturel inverse
+        return self.docs[-1:]
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        if self.position >= len(self.docs):
+            raise StopAsyncIteration
+        self.position += 1
+        return self.docs[self.position - 1]
+
+
+class CappedCollection:
+    def __init__(self):
+        self.docs = [{"_id": 0, "topic": "init", "origin": "autre"}]
+
+    def find(self, *args, **kwargs):
+        return TailableCursor(self.docs)
+
+    async def find_one(self, query=None, projection=None):
+        return next((doc for doc in self.docs if doc["_id"] == (query or {}).get("_id")), None)
+
+    async def insert_many(self, docs, ordered=True):
+        self.docs.extend(docs)
+
+    def append(self, topic, payload):
+        self.docs.append({"_id": len(self.docs), "topic": topic, "origin": "autre", "payload": payload})
+
+
+async def wait_for(condition):
+    for _ in range(1000):
+        if condition():
+            return
+        await asyncio.sleep(0)
+    raise AssertionError("condition jamais atteinte")
+
+
+def test_message_published_during_state_load_is_applied():
+    collection = CappedCollection()
+    queue = CallsQueue(None)
+    received = []
+
+    async def scenario():
+        bus = EventBus(collection)
+        bus.subscribe("calls", lambda payload: received.append(
+            queue.apply_remote(payload["type"], payload["data"], payload["ranks"])))
+        await bus.mark()
+        # Chargement de la file, puis publication d'un autre worker avant le démarrage du bus
+        queue._replace_records([CallRecord("a", "Big Bass", "u", 1.0)])
+        collection.append("calls", {"type": "add", "data": {"call": {"id": "b", "slot": "Sugar Rush", "user": "v"}},
+                                    "ranks": {"b": 2.0}})
+        bus.start()
+        await wait_for(lambda: received)
+        await bus.stop()
+
+    asyncio.run(scenario())
+    assert received == [True]
+    assert [call["id"] for call in queue.snapshot()] == ["a", "b"]
+
+
+def test_message_already_reflected_by_the_load_is_not_applied_twice():
+    collection = CappedCollection()
+    queue = CallsQueue(None)
+    received = []
+
+    async def scenario():
+        bus = EventBus(collection)
+        bus.subscribe("calls", lambda payload: received.append(
+            queue.apply_remote(payload["type"], payload["data"], payload["ranks"])))
+        await bus.mark()
+        collection.append("calls", {"type": "add", "data": {"call": {"id": "a", "slot": "Big Bass", "user": "u"}},
+                                    "ranks": {"a": 1.0}})
+        # La file relue dans Mongo contient déjà le call publié
+        queue._replace_records([CallRecord("a", "Big Bass", "u", 1.0)])
+        bus.start()
+        await wait_for(lambda: received)
+        await bus.stop()
+
+    asyncio.run(scenario())
+    assert received == [False]
+    assert [call["id"] for call in queue.snapshot()] == ["a"]
@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+import health
+from health import Readiness, ReadinessGate
+
+
+@pytest.fixture(autouse=True)
+def no_sleep(monkeypatch):
+    real_sleep = asyncio.sleep
+
+    async def sleep(seconds):
+        await real_sleep(0)
+    monkeypatch.setattr(health.asyncio, "sleep", sleep)
+
+
+async def run_until(readiness, condition):
+    for _ in range(1000):
+        if condition():
+            return
+        await asyncio.sleep(0)
+    raise AssertionError("condition jamais atteinte")
+
+
+def test_failed_step_is_retried_without_replaying_completed_ones():
+    calls = []
+
+    def step(name, failures=0):
+        def run():
+            calls.append(name)
+            if calls.count(name) <= failures:
+                raise ConnectionError("mongo indisponible")
+        return run
+
+    async def scenario():
+        readiness = Readiness()
+        readiness.start([("a", step("a")), ("b", step("b", failures=2)), ("c", step("c"))])
+        await run_until(readiness, lambda: readiness.ready)
+        await readiness.stop()
+        return readiness
+
+    readiness = asyncio.run(scenario())
+    assert calls == ["a", "b", "b", "b", "c"]
+    assert readiness.attempts == 3 and readiness.last_error is None
+    assert list(readiness.status()["steps"]) == ["a", "b", "c"]
+
+
+def test_background_steps_run_after_ready():
+    order = []
+
+    async def scenario():
+        readiness = Readiness()
+        release = asyncio.Event()
+
+        async def slow_seed():
+            await release.wait()
+            order.append("seed")
+
+        readiness.start([("load", lambda: order.append("load"))], [("seed", slow_seed)])
+        await run_until(readiness, lambda: readiness.ready)
+        assert readiness.status()["background_pending"] == ["seed"]
+        release.set()
+        await run_until(readiness, lambda: "seed" in readiness.durations)
+        await readiness.stop()
+        return readiness
+
+    readiness = asyncio.run(scenario())
+    assert order == ["load", "seed"]
+    assert readiness.status()["background_pending"] == []
+
+
+def call_gate(readiness, path):
+    messages = []
+
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": []})
+
+    async def send(message):
+        messages.append(message)
+
+    asyncio.run(ReadinessGate(app, readiness)({"type": "http", "path": path}, None, send))
+    return messages[0]["status"]
+
+
+def test_gate_answers_503_until_ready_except_probes():
+    readiness = Readiness()
+    assert call_gate(readiness, "/api/offers") == 503
+    assert call_gate(readiness, "/healthz") == 200
+    readiness.ready = True
+    assert call_gate(readiness, "/api/offers") == 200
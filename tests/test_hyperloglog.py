@@ -0,0 +1,69 @@
+from datetime import datetime
+
+import pytest
+
+from hyperloglog import HyperLogLog
+from visitor_sketches import MAX_WINDOW_DAYS, days_window, sketches_for_clicks
+
+
+def sketch_of(values, precision=12):
+    sketch = HyperLogLog(precision)
+    for value in values:
+        sketch.add(value)
+    return sketch
+
+
+def test_empty_sketch_counts_zero():
+    assert HyperLogLog().count() == 0
+
+
+@pytest.mark.parametrize("cardinality", [10, 1000, 50000])
+def test_count_within_expected_error(cardinality):
+    sketch = sketch_of(f"10.0.{i // 256}.{i % 256}-{i}" for i in range(cardinality))
+    # Erreur type ~1,6 % à p=12 : 5 % laisse une large marge
+    assert abs(sketch.count() - cardinality) <= max(1, 0.05 * cardinality)
+
+
+def test_duplicates_are_not_counted_twice():
+    assert sketch_of(["1.2.3.4"] * 1000).count() == 1
+
+
+def test_merge_is_a_union():
+    first = sketch_of(f"ip{i}" for i in range(0, 6000))
+    second = sketch_of(f"ip{i}" for i in range(3000, 9000))
+    union = sketch_of(f"ip{i}" for i in range(9000))
+    assert first.merge(second).registers == union.registers
+
+
+def test_bytes_round_trip_and_precision_checks():
+    sketch = sketch_of(["a", "b"], precision=10)
+    assert HyperLogLog.from_bytes(sketch.to_bytes(), 10).registers == sketch.registers
+    with pytest.raises(ValueError):
+        HyperLogLog.from_bytes(sketch.to_bytes(), 12)
+    with pytest.raises(ValueError):
+        HyperLogLog(10).merge(HyperLogLog(12))
+    with pytest.raises(ValueError):
+        HyperLogLog(3)
+
+
+def test_sketches_for_clicks_groups_by_offer_and_day():
+    clicks = [
+        {"offer_id": "a", "user_ip": "1", "timestamp": datetime(2026, 10, 17, 9)},
+        {"offer_id": "a", "user_ip": "2", "timestamp": datetime(2026, 10, 17, 23)},
+        {"offer_id": "a", "user_ip": "1", "timestamp": datetime(2026, 10, 18, 1)},
+        {"offer_id": "b", "user_ip": "1", "timestamp": datetime(2026, 10, 17, 9)},
+    ]
+    counts = {key: sketch.count() for key, sketch in sketches_for_clicks(clicks).items()}
+    assert counts == {
+        ("a", datetime(2026, 10, 17)): 2,
+        ("a", datetime(2026, 10, 18)): 1,
+        ("b", datetime(2026, 10, 17)): 1,
+    }
+
+
+def test_days_window_is_bounded():
+    now = datetime(2026, 10, 17, 15, 30)
+    assert days_window(now, 1) == datetime(2026, 10, 17)
+    assert days_window(now, 0) == datetime(2026, 10, 17)
+    assert days_window(now, 7) == datetime(2026, 10, 11)
+    assert days_window(now, 10 ** 9) == days_window(now, MAX_WINDOW_DAYS)
@@ -0,0 +1,101 @@
+import random
+from collections import Counter
+
+import pytest
+
+from leaderboard import Leaderboard, SpaceSaving
+
+
+def zipf_stream(size, seed):
+    rng = random.Random(seed)
+    return [f"k{int(rng.paretovariate(1.1))}" for _ in range(size)]
+
+
+def assert_bounds(summary, true_counts, total):
+    assert summary.total == total
+    assert len(summary) <= summary.capacity
+    for key, count in summary.counts.items():
+        assert count - summary.errors[key] <= true_counts[key] <= count
+    # Toute clé plus fréquente que N / capacity est suivie
+    for key, count in true_counts.items():
+        if count > total / summary.capacity:
+            assert key in summary.counts
+
+
+def test_space_saving_is_exact_below_capacity():
+    summary = SpaceSaving(10)
+    for key in "abacab":
+        summary.add(key)
+    assert summary.top(2) == [{"name": "a", "count": 3, "error": 0}, {"name": "b", "count": 2, "error": 0}]
+
+
+def test_space_saving_error_bounds():
+    stream = zipf_stream(20000, seed=1)
+    summary = SpaceSaving(50)
+    for key in stream:
+        summary.add(key)
+    assert_bounds(summary, Counter(stream), len(stream))
+
+
+def test_merge_keeps_error_bounds():
+    first, second = zipf_stream(10000, seed=2), zipf_stream(15000, seed=3)
+    merged, other = SpaceSaving(50), SpaceSaving(50)
+    for key in first:
+        merged.add(key)
+    for key in second:
+        other.add(key)
+    merged.merge(other)
+    assert_bounds(merged, Counter(first) + Counter(second), len(first) + len(second))
+
+
+def test_merge_into_empty_summary_is_a_copy():
+    summary = SpaceSaving(3)
+    for key in "aabbbcd":
+        summary.add(key)
+    merged = SpaceSaving(3)
+    merged.merge(summary)
+    assert (merged.counts, merged.errors, merged.total) == (summary.counts, summary.errors, summary.total)
+
+
+def test_hour_window_expires_old_minutes():
+    board = Leaderboard(capacity=10, window_minutes=60)
+    board.record("Ancien", "a", now=0)
+    board.record("Récent", "b", now=30 * 60)
+    board.record("Récent", "b", now=59 * 60)
+    assert [entry["name"] for entry in board.top("hour", now=59 * 60)["slots"]] == ["Récent", "Ancien"]
+    top = board.top("hour", now=60 * 60)
+    assert top["calls"] == 2
+    assert top["slots"] == [{"name": "Récent", "count": 2, "error": 0}]
+    assert board.top("hour", now=200 * 60)["calls"] == 0
+    assert board.top("all")["calls"] == 3
+
+
+def test_hour_window_matches_a_full_recount():
+    board = Leaderboard(capacity=1000, window_minutes=10)
+    rng = random.Random(4)
+    events = [(minute * 60 + second, f"s{rng.randint(0, 20)}") for minute in range(35) for second in range(0, 60, 7)]
+    for now, slot in events:
+        board.record(slot, "u", now=now)
+        if now % 120 == 0:
+            expected = Counter(key for at, key in events if at <= now and at // 60 > now // 60 - 10)
+            top = board.top("hour", limit=1000, now=now)
+            assert {entry["name"]: entry["count"] for entry in top["slots"]} == expected
+
+
+def test_session_reset_and_seed():
+    board = Leaderboard(capacity=2)
+    board.seed_slots([("a", 5), ("b", 1), ("c", 9)])
+    board.record("b", " pseudo ", now=0)
+    board.reset_session()
+    board.record("c", "", now=0)
+    assert board.top("session")["slots"] == [{"name": "c", "count": 1, "error": 0}]
+    assert board.top("session")["users"] == []
+    # « b » remplace « a », le moins compté, et hérite de son compte en erreur
+    assert board.top("all")["slots"] == [{"name": "c", "count": 10, "error": 0},
+                                         {"name": "b", "count": 6, "error": 5}]
+    assert board.top("all")["users"] == [{"name": "pseudo", "count": 1, "error": 0}]
+
+
+def test_unknown_window():
+    with pytest.raises(ValueError):
+        Leaderboard().top("day")
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import pytest
+from bson import ObjectId
+
+from logs_query import build_filter, decode_cursor, encode_cursor
+
+
+def matches(doc, query):
+    # Évaluateur minimal des filtres produits par build_filter (égalité, $lt, $and, $or)
+    for field, condition in query.items():
+        if field == "$and":
+            if not all(matches(doc, clause) for clause in condition):
+                return False
+        elif field == "$or":
+            if not any(matches(doc, clause) for clause in condition):
+                return False
+        elif isinstance(condition, dict):
+            if not doc[field] < condition["$lt"]:
+                return False
+        elif doc.get(field) != condition:
+            return False
+    return True
+
+
+def paginate(docs, limit, **filters):
+    """Parcourt ``docs`` page par page comme fetch_page (tri timestamp, _id décroissants)."""
+    ordered = sorted(docs, key=lambda doc: (doc["timestamp"], doc["_id"]), reverse=True)
+    pages, cursor = [], None
+    while True:
+        query = build_filter(cursor=cursor, **filters)
+        page = [doc for doc in ordered if matches(doc, query)][:limit + 1]
+        pages.append(page[:limit])
+        if len(page) <= limit:
+            return pages
+        cursor = encode_cursor(page[limit - 1])
+
+
+def test_cursor_round_trip():
+    doc = {"timestamp": datetime(2024, 5, 1, 12, 30, 15, 123456), "_id": ObjectId()}
+    assert decode_cursor(encode_cursor(doc)) == (doc["timestamp"], doc["_id"])
+
+
+@pytest.mark.parametrize("cursor", ["", "pas-un-curseur", "MjAyNC0wNS0wMXx4eXo=", "é"])
+def test_decode_rejects_invalid_cursors(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_build_filter_shapes():
+    assert build_filter() == {}
+    assert build_filter(action="call", slot="") == {"action": "call"}
+    assert build_filter(action="call", username="bob") == {"$and": [{"action": "call"}, {"username": "bob"}]}
+
+
+def test_pages_cover_every_doc_once_despite_equal_timestamps():
+    start = datetime(2024, 5, 1)
+    # Plusieurs documents par timestamp : le _id départage les égalités
+    docs = [{"timestamp": start + timedelta(seconds=i // 3), "_id": ObjectId(), "action": "call"} for i in range(20)]
+    pages = paginate(docs, limit=4)
+    seen = [doc["_id"] for page in pages for doc in page]
+    assert len(seen) == len(set(seen)) == 20
+    assert [len(page) for page in pages] == [4, 4, 4, 4, 4]
+
+
+def test_cursor_combines_with_filters():
+    start = datetime(2024, 5, 1)
+    docs = [
+        {"timestamp": start + timedelta(minutes=i), "_id": ObjectId(), "action": "call" if i % 2 else "click"}
+        for i in range(10)
+    ]
+    pages = paginate(docs, limit=2, action="call")
+    assert [doc["timestamp"].minute for page in pages for doc in page] == [9, 7, 5, 3, 1]
@@ -0,0 +1,72 @@
+import asyncio
+
+from compact_schema import CLICKS_COMPACT
+from migrate_storage import copy_collection
+
+
+class Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def batch_size(self, size):
+        return self
+
+    async def to_list(self, length=None):
+        return list(self.docs)
+
+    def __aiter__(self):
+        self._iter = iter(list(self.docs))
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._iter)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class Collection:
+    def __init__(self, name, docs=()):
+        self.name = name
+        self.docs = list(docs)
+        self.queries = []
+
+    async def count_documents(self, query):
+        return len(self.docs)
+
+    def find(self, query, projection=None):
+        self.queries.append(query)
+        if not query:
+            return Cursor(self.docs)
+        ids = set(query["_id"]["$in"])
+        return Cursor([{"_id": doc["_id"]} for doc in self.docs if doc["_id"] in ids])
+
+    async def insert_many(self, docs, ordered=True):
+        # Cible time-series : aucun index unique sur _id, un doublon passerait
+        self.docs.extend(docs)
+
+
+def click(number):
+    return {"_id": number, "id": f"click-{number}", "offer_id": "offer", "user_ip": "203.0.113.7",
+            "timestamp": f"2024-06-01T12:00:{number:02d}"}
+
+
+def test_rerun_copies_documents_with_smaller_ids_without_duplicates():
+    source = Collection("clicks", [click(number) for number in (10, 20, 30)])
+    target = Collection("clicks_compact")
+    assert asyncio.run(copy_collection(source, target, CLICKS_COMPACT, batch_size=2)) == 3
+    # Un autre worker a écrit des _id plus petits que le plus grand déjà copié
+    source.docs += [click(5), click(15)]
+    assert asyncio.run(copy_collection(source, target, CLICKS_COMPACT, batch_size=2)) == 2
+    assert sorted(doc["_id"] for doc in target.docs) == [5, 10, 15, 20, 30]
+    assert asyncio.run(copy_collection(source, target, CLICKS_COMPACT, batch_size=2)) == 0
+    assert len(target.docs) == 5
+
+
+def test_existing_ids_are_looked_up_within_the_batch_time_range():
+    source = Collection("clicks", [click(3), click(1)])
+    target = Collection("clicks_compact")
+    asyncio.run(copy_collection(source, target, CLICKS_COMPACT, batch_size=10))
+    (query,) = target.queries
+    assert query["t"] == {"$gte": "2024-06-01T12:00:01", "$lte": "2024-06-01T12:00:03"}
+    assert target.docs[0] == CLICKS_COMPACT.encode(click(3))
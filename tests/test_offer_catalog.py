@@ -0,0 +1,72 @@
+import asyncio
+
+from offer_catalog import OfferCatalog
+
+
+class Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    async def to_list(self, length=None):
+        return [dict(doc) for doc in self.docs]
+
+
+class Collection:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def find(self, *args, **kwargs):
+        return Cursor(self.docs)
+
+
+def test_upsert_keeps_clicks_still_buffered_in_memory():
+    catalog = OfferCatalog(Collection([{"id": "a", "title": "A", "clicks": 0, "tags": []}]))
+    asyncio.run(catalog.offers())
+    catalog.apply_clicks("a", 5)
+    # Document relu dans Mongo avant l'écriture des clics en tampon
+    catalog.upsert({"id": "a", "title": "A modifiée", "clicks": 0, "tags": ["vip"]})
+    offers = asyncio.run(catalog.query(["vip"]))
+    assert [(offer["title"], offer["clicks"]) for offer in offers] == [("A modifiée", 5)]
+
+
+def test_upsert_adds_new_offers_and_remove_drops_them():
+    catalog = OfferCatalog(Collection([]))
+    asyncio.run(catalog.offers())
+    catalog.upsert({"id": "b", "title": "B", "clicks": 0, "tags": ["crypto"]})
+    assert asyncio.run(catalog.has_offer("b"))
+    catalog.remove("b")
+    assert asyncio.run(catalog.query(["crypto"])) == []
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_clicks_refresh_the_cached_body_at_most_once_per_interval():
+    clock = Clock()
+    catalog = OfferCatalog(Collection([{"id": "a", "title": "A", "clicks": 0, "tags": []}]),
+                           clicks_refresh_seconds=5, clock=clock)
+    body, etag = asyncio.run(catalog.payload())
+    for _ in range(100):
+        catalog.apply_clicks("a")
+    clock.now = 4.9
+    assert asyncio.run(catalog.payload()) == (body, etag)
+    clock.now = 5.0
+    refreshed, refreshed_etag = asyncio.run(catalog.payload())
+    assert refreshed_etag != etag
+    assert b'"clicks":100' in refreshed
+
+
+def test_offer_changes_refresh_the_body_immediately():
+    clock = Clock()
+    catalog = OfferCatalog(Collection([{"id": "a", "title": "A", "clicks": 0, "tags": []}]),
+                           clicks_refresh_seconds=5, clock=clock)
+    _, etag = asyncio.run(catalog.payload())
+    catalog.upsert({"id": "a", "title": "A modifiée", "clicks": 0, "tags": []})
+    body, new_etag = asyncio.run(catalog.payload())
+    assert new_etag != etag
+    assert b"A modifi" in body
@@ -0,0 +1,89 @@
+from types import SimpleNamespace
+
+import pytest
+from starlette.datastructures import Headers
+
+from rate_limit import ClientAddress, DuplicateFilter, LRUDict, TokenBucketLimiter, parse_networks
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_bucket_allows_the_burst_then_refills_at_the_rate():
+    clock = Clock()
+    limiter = TokenBucketLimiter(rate_per_second=0.5, burst=2, clock=clock)
+    assert limiter.acquire("ip")[0]
+    assert limiter.acquire("ip")[0]
+    allowed, retry_after = limiter.acquire("ip")
+    assert not allowed
+    assert retry_after == pytest.approx(2.0)
+    clock.now = 2.0
+    assert limiter.acquire("ip")[0]
+    assert not limiter.acquire("ip")[0]
+
+
+def test_buckets_are_per_key_and_never_exceed_the_burst():
+    clock = Clock()
+    limiter = TokenBucketLimiter(rate_per_second=1, burst=1, clock=clock)
+    assert limiter.acquire("a")[0]
+    assert limiter.acquire("b")[0]
+    clock.now = 3600
+    assert limiter.acquire("a")[0]
+    assert not limiter.acquire("a")[0]
+
+
+def test_lru_evicts_the_least_recently_used_key():
+    lru = LRUDict(max_keys=2)
+    lru.touch("a", 1)
+    lru.touch("b", 2)
+    lru.touch("a", 3)
+    lru.touch("c", 4)
+    assert list(lru) == ["a", "c"]
+
+
+def test_evicted_key_starts_again_with_a_full_bucket():
+    limiter = TokenBucketLimiter(rate_per_second=0.001, burst=1, max_keys=1, clock=Clock())
+    assert limiter.acquire("a")[0]
+    assert not limiter.acquire("a")[0]
+    assert limiter.acquire("b")[0]
+    assert limiter.acquire("a")[0]
+    assert len(limiter._buckets) == 1
+
+
+def test_duplicate_filter_window():
+    clock = Clock()
+    duplicates = DuplicateFilter(window_seconds=60, clock=clock)
+    assert duplicates.check(("bob", "big bass")) == 0
+    clock.now = 45
+    assert duplicates.check(("bob", "big bass")) == pytest.approx(15)
+    assert duplicates.check(("bob", "sugar rush")) == 0
+    clock.now = 60
+    assert duplicates.check(("bob", "big bass")) == 0
+
+
+def request(host, forwarded=None):
+    headers = Headers({"x-forwarded-for": forwarded} if forwarded else {})
+    return SimpleNamespace(client=SimpleNamespace(host=host), headers=headers)
+
+
+@pytest.fixture
+def client_address():
+    return ClientAddress(parse_networks("127.0.0.1, 10.0.0.0/8"))
+
+
+def test_forwarded_for_is_read_only_behind_a_trusted_proxy(client_address):
+    assert client_address(request("10.1.2.3", "203.0.113.7")) == "203.0.113.7"
+    # Connexion directe : l'en-tête est ignoré
+    assert client_address(request("198.51.100.1", "203.0.113.7")) == "198.51.100.1"
+    assert client_address(request("10.1.2.3")) == "10.1.2.3"
+
+
+def test_forwarded_for_skips_trusted_hops_from_the_right(client_address):
+    # Le client a forgé le premier saut ; l'ingress a ajouté la vraie adresse
+    assert client_address(request("127.0.0.1", "1.1.1.1, 203.0.113.7, 10.0.0.5")) == "203.0.113.7"
+    assert client_address(request("127.0.0.1", "10.0.0.9, 10.0.0.5")) == "10.0.0.9"
@@ -0,0 +1,169 @@
+import asyncio
+import gzip
+import os
+from datetime import datetime, timedelta
+
+import orjson
+import pytest
+from pymongo.errors import DuplicateKeyError
+
+from compact_schema import LEGACY
+from retention import Retention, RetentionPolicy
+
+NOW = datetime(2024, 6, 1, 12)
+
+
+def matches(doc, query):
+    for field, condition in query.items():
+        value = doc.get(field)
+        if not isinstance(condition, dict):
+            if value != condition:
+                return False
+            continue
+        for operator, operand in condition.items():
+            if operator == "$lt" and not value < operand:
+                return False
+            if operator == "$lte" and not value <= operand:
+                return False
+            if operator == "$in" and value not in operand:
+                return False
+    return True
+
+
+class Cursor:
+    def __init__(self, docs):
+        self.docs = docs
+
+    def sort(self, spec):
+        (field, direction), = spec
+        self.docs = sorted(self.docs, key=lambda doc: doc[field], reverse=direction < 0)
+        return self
+
+    def limit(self, count):
+        self.docs = self.docs[:count]
+        return self
+
+    async def to_list(self, length=None):
+        return [dict(doc) for doc in self.docs]
+
+
+class Database:
+    def __init__(self, timeseries=(), version=(7, 0, 0)):
+        self.timeseries = set(timeseries)
+        self.version = version
+
+    async def list_collection_names(self, filter=None):
+        return [name for name in self.timeseries if name == filter["name"]]
+
+    async def command(self, name):
+        return {"version": ".".join(map(str, self.version)), "versionArray": list(self.version)}
+
+
+class Collection:
+    def __init__(self, name, docs, database=None, before_delete=None):
+        self.name = name
+        self.docs = docs
+        self.database = database or Database()
+        self.before_delete = before_delete
+        self.deletes = []
+
+    def find(self, query):
+        return Cursor([doc for doc in self.docs if matches(doc, query)])
+
+    async def delete_many(self, query):
+        if self.before_delete is not None:
+            self.before_delete(query)
+        self.deletes.append(query)
+        kept = [doc for doc in self.docs if not matches(doc, query)]
+        deleted, self.docs = len(self.docs) - len(kept), kept
+        return type("Result", (), {"deleted_count": deleted})()
+
+
+class Meta:
+    def __init__(self):
+        self.docs = {}
+
+    async def find_one_and_update(self, query, update, upsert=False):
+        doc = self.docs.get(query["_id"])
+        if doc is not None and any(matches(doc, clause) for clause in query["$or"]):
+            doc.update(update["$set"])
+            return doc
+        if doc is not None:
+            raise DuplicateKeyError("bail détenu par un autre worker")
+        self.docs[query["_id"]] = {"_id": query["_id"], **update["$set"]}
+
+
+def log(number, age_days):
+    return {"_id": number, "id": f"log-{number}", "timestamp": NOW - timedelta(days=age_days), "action": "call_created"}
+
+
+def read_archive(path):
+    with gzip.open(path, "rb") as archive:
+        return [orjson.loads(line) for line in archive.read().splitlines()]
+
+
+def test_expired_documents_are_archived_before_being_deleted(tmp_path):
+    archived_ids = set()
+
+    def before_delete(query):
+        # Chaque document supprimé figure déjà dans une archive sur disque
+        for path in tmp_path.rglob("*.ndjson.gz"):
+            archived_ids.update(doc["_id"] for doc in read_archive(path))
+        assert set(query["_id"]["$in"]) <= archived_ids
+
+    docs = [log(1, 40), log(2, 35), log(3, 31), log(4, 2)]
+    collection = Collection("logs", docs, before_delete=before_delete)
+    retention = Retention([RetentionPolicy(collection, 30, LEGACY)], str(tmp_path), batch_size=2)
+    report = asyncio.run(retention.run_once(NOW))
+    assert [doc["_id"] for doc in collection.docs] == [4]
+    assert report["logs"]["archived"] == report["logs"]["deleted"] == 3
+    assert len(collection.deletes) == 2
+
+
+def test_ndjson_archives_append_one_gzip_member_per_batch(tmp_path):
+    day = NOW - timedelta(days=40)
+    docs = [{**log(number, 40), "timestamp": day + timedelta(seconds=number)} for number in range(5)]
+    collection = Collection("logs", docs)
+    retention = Retention([RetentionPolicy(collection, 30, LEGACY)], str(tmp_path), batch_size=2)
+    report = asyncio.run(retention.run_once(NOW))
+    (path,) = report["logs"]["files"]
+    assert os.path.dirname(path).endswith(os.path.join("logs", day.strftime("%Y-%m-%d")))
+    lines = read_archive(path)
+    assert [doc["id"] for doc in lines] == [f"log-{number}" for number in range(5)]
+    assert lines[0]["timestamp"] == day.isoformat()
+
+
+def test_lease_admits_one_worker_until_it_expires():
+    meta = Meta()
+    first = Retention([], "archives", meta_collection=meta, interval_seconds=3600)
+    second = Retention([], "archives", meta_collection=meta, interval_seconds=3600)
+    assert asyncio.run(first._acquire_lease())
+    assert not asyncio.run(second._acquire_lease())
+    # Le détenteur renouvelle son bail ; une fois expiré, un autre worker le prend
+    assert asyncio.run(first._acquire_lease())
+    meta.docs["retention_lock"]["expires_at"] = datetime.now() - timedelta(seconds=1)
+    assert asyncio.run(second._acquire_lease())
+    assert not asyncio.run(first._acquire_lease())
+
+
+def test_timeseries_collections_are_purged_by_time_range(tmp_path):
+    base = NOW - timedelta(days=40)
+    # Trois documents au même instant à cheval sur la limite du lot
+    docs = [{**log(number, 40), "timestamp": base + timedelta(seconds=min(number, 1))} for number in range(4)]
+    collection = Collection("logs", docs, database=Database(timeseries={"logs"}))
+    retention = Retention([RetentionPolicy(collection, 30, LEGACY)], str(tmp_path), batch_size=2)
+    report = asyncio.run(retention.run_once(NOW))
+    assert collection.docs == []
+    assert all("_id" not in query for query in collection.deletes)
+    assert report["logs"]["archived"] == 4
+    assert sorted(doc["_id"] for doc in read_archive(report["logs"]["files"][0])) == [0, 1, 2, 3]
+
+
+@pytest.mark.parametrize("version", [(5, 0, 9), (6, 0, 14)])
+def test_timeseries_retention_is_refused_before_mongodb_7(tmp_path, version):
+    collection = Collection("logs", [log(1, 40)], database=Database(timeseries={"logs"}, version=version))
+    retention = Retention([RetentionPolicy(collection, 30, LEGACY)], str(tmp_path))
+    report = asyncio.run(retention.run_once(NOW))
+    assert "7.0" in report["logs"]["error"]
+    assert collection.deletes == []
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,122 @@
+import asyncio
+import random
+
+from slot_index import SCAN_LIMIT, SlotIndex, slot_key
+
+
+def names(suggestions):
+    return [suggestion["slot"] for suggestion in suggestions]
+
+
+def test_slot_key_ignores_case_accents_and_punctuation():
+    assert slot_key("Big Bass Bonanza") == slot_key("big-bass  BONANZA!") == "bigbassbonanza"
+    assert slot_key("Sugar Rüsh") == "sugarrush"
+    assert slot_key(" - ") == ""
+
+
+def test_canonical_is_the_most_frequent_spelling():
+    index = SlotIndex()
+    index.add("big bass bonanza")
+    index.add("Big Bass Bonanza", 2)
+    assert index.canonical("BIG  bass bonanza") == "Big Bass Bonanza"
+    assert index.canonical("  Nouveau   slot ") == "Nouveau slot"
+    assert len(index) == 1
+
+
+def test_suggest_matches_the_start_of_any_word():
+    index = SlotIndex()
+    index.add("Big Bass Bonanza", 3)
+    index.add("Sweet Bonanza", 5)
+    index.add("Gates of Olympus")
+    assert names(index.suggest("bonan")) == ["Sweet Bonanza", "Big Bass Bonanza"]
+    assert names(index.suggest("bass b")) == ["Big Bass Bonanza"]
+    assert names(index.suggest("onanza")) == []
+    assert index.suggest("") == [] and index.suggest("big", limit=0) == []
+
+
+def test_popular_slot_beyond_the_scan_limit_is_suggested_first():
+    index = SlotIndex()
+    for i in range(SCAN_LIMIT + 50):
+        index.add(f"Bo{i:03d} Rare")
+    index.add("Bonanza Megaways", 5000)
+    assert names(index.suggest("bo", limit=3))[0] == "Bonanza Megaways"
+
+
+def test_heavy_prefix_rankings_follow_later_additions():
+    index = SlotIndex(max_suggestions=5)
+    for i in range(SCAN_LIMIT + 50):
+        index.add(f"Bo{i:03d} Rare", 2)
+    assert len(index.suggest("bo")) == 5  # classement du préfixe « bo » mis en cache
+    index.add("Bonanza Megaways", 3)
+    index.add("Bo100 Rare", 2)
+    assert names(index.suggest("bo", limit=2)) == ["Bo100 Rare", "Bonanza Megaways"]
+    index.add("Bonanza Megaways", 10)
+    assert names(index.suggest("bo", limit=2)) == ["Bonanza Megaways", "Bo100 Rare"]
+    assert names(index.suggest("megaways")) == ["Bonanza Megaways"]
+
+
+def test_suggest_matches_a_full_scan():
+    rng = random.Random(5)
+    words = ["big", "bass", "bonanza", "book", "dead", "gates", "sugar", "sweet"]
+    index = SlotIndex(max_suggestions=10)
+    added = {}
+    for step in range(3000):
+        name = " ".join(rng.sample(words, 2)) + f" {rng.randint(0, 400)}"
+        index.add(name, rng.randint(1, 5))
+        entry = index._entries[slot_key(name)]
+        added[entry.key] = entry
+        if step % 500 == 499:
+            for prefix in ("b", "bo", "sweet", "dead b"):
+                matching = [entry for entry in added.values()
+                            if any(sub_key.startswith(slot_key(prefix)) for sub_key in entry.sub_keys)]
+                expected = sorted(matching, key=lambda entry: (-entry.count, entry.key))[:10]
+                assert names(index.suggest(prefix)) == [entry.display for entry in expected]
+
+
+def test_max_slots_bounds_memory():
+    index = SlotIndex(max_slots=2)
+    assert index.add("a") and index.add("b")
+    assert index.add("c") is None
+    assert index.add("A") is not None
+    assert len(index) == 2
+
+
+class Cursor:
+    def __init__(self, rows):
+        self.rows = rows
+
+    def __aiter__(self):
+        return self._iterate()
+
+    async def _iterate(self):
+        for row in self.rows:
+            yield row
+
+
+class Logs:
+    def __init__(self, rows):
+        self.rows = rows
+        self.pipelines = []
+
+    def aggregate(self, pipeline):
+        self.pipelines.append(pipeline)
+        return Cursor(self.rows)
+
+
+class Schema:
+    def field(self, name):
+        return name
+
+    def filter(self, query):
+        return query
+
+
+def test_seed_from_logs_counts_grouped_slots():
+    index = SlotIndex()
+    index.add("gates of olympus")
+    logs = Logs([{"_id": "Gates of Olympus", "count": 4}, {"_id": "GATES of olympus", "count": 2},
+                 {"_id": None, "count": 1}])
+    seeded = asyncio.run(index.seed_from_logs(logs, Schema(), until="t1"))
+    assert seeded == [("Gates of Olympus", 6)]
+    assert index.suggest("gates") == [{"slot": "Gates of Olympus", "count": 7}]
+    assert logs.pipelines[0][0] == {"$match": {"action": "call_created", "timestamp": {"$lt": "t1"}}}
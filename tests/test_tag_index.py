@@ -0,0 +1,53 @@
+import pytest
+
+from tag_index import TagIndex, normalize_tag
+
+
+def offer(offer_id, *tags):
+    return {"id": offer_id, "tags": list(tags)}
+
+
+def ids(offers):
+    return sorted(offer["id"] for offer in offers)
+
+
+@pytest.fixture
+def index():
+    return TagIndex([offer("a", "Crypto", "VIP"), offer("b", "crypto"), offer("c", "CB", " vip ")])
+
+
+def test_normalize_tag_ignores_case_and_surrounding_spaces():
+    assert normalize_tag("  Retrait en 1h ") == "retrait en 1h"
+
+
+def test_match_all_and_any(index):
+    assert ids(index.match(["crypto", "vip"], "all")) == ["a"]
+    assert ids(index.match(["CRYPTO", "cb"], "any")) == ["a", "b", "c"]
+    assert ids(index.match(["crypto", "inconnu"], "all")) == []
+
+
+def test_empty_tags_match_every_offer(index):
+    assert ids(index.match([], "all")) == ["a", "b", "c"]
+    assert ids(index.match(["  "], "any")) == ["a", "b", "c"]
+
+
+def test_invalid_mode(index):
+    with pytest.raises(ValueError):
+        index.match(["crypto"], "none")
+
+
+def test_add_replaces_and_remove_frees_the_slot(index):
+    index.add(offer("a", "cb"))
+    assert ids(index.match(["vip"])) == ["c"]
+    assert ids(index.match(["cb"])) == ["a", "c"]
+    index.remove("b")
+    assert len(index) == 2
+    assert ids(index.match(["crypto"])) == []
+    index.add(offer("d", "crypto"))
+    assert ids(index.match(["crypto"])) == ["d"]
+    assert ids(index.match([])) == ["a", "c", "d"]
+
+
+def test_remove_unknown_offer_is_a_no_op(index):
+    index.remove("inconnu")
+    assert len(index) == 3